@@ -0,0 +1,107 @@
+"""
+블로그 HTML 추출 벤치마크
+저장해 둔 블로그 페이지(fixtures/blog_pages/*.html)로 예전 방식(전체 파싱)과 지금 방식(필요한 컨테이너만 파싱)을 비교합니다.
+
+실행 ("Good DBMgr" 폴더에서):
+    python -m benchmarks.html_extraction
+    python -m benchmarks.html_extraction --rounds 20 --corpus 저장한_페이지_폴더
+    python -m benchmarks.html_extraction --save https://blog.naver.com/아이디/글번호 ...   # 실제 페이지를 코퍼스에 추가
+"""
+import os
+import time
+import argparse
+import tracemalloc
+from urllib.parse import urlparse
+from creator_api.html_extractor import extract_naver_blog, extract_naver_blog_full, HTML_PARSER
+
+DEFAULT_CORPUS = os.path.join(os.path.dirname(__file__), "fixtures", "blog_pages")
+
+
+def load_corpus(corpus_dir):
+    pages = []
+    for file_name in sorted(os.listdir(corpus_dir)):
+        if file_name.endswith(".html"):
+            with open(os.path.join(corpus_dir, file_name), encoding="utf-8") as f:
+                pages.append((file_name, f.read()))
+    return pages
+
+
+def save_pages(urls, corpus_dir):
+    """
+    블로그 글의 모바일 페이지를 받아서 코퍼스 폴더에 저장합니다.
+    """
+    import requests
+    from creator_api.naver_service import NaverService
+
+    os.makedirs(corpus_dir, exist_ok=True)
+    for url in urls:
+        mobile_url = NaverService.add_mobile_prefix(url)
+        response = requests.get(mobile_url, timeout=10)
+        response.raise_for_status()
+        file_name = urlparse(url).path.strip("/").replace("/", "_") + ".html"
+        with open(os.path.join(corpus_dir, file_name), "w", encoding="utf-8") as f:
+            f.write(response.text)
+        print(f"저장: {file_name}")
+
+
+def as_tuple(data):
+    if data is None:
+        return None
+    return (data.name, data.address, data.img_src, " ".join(data.content.split()))
+
+
+def measure(extract, pages, rounds):
+    """
+    :return: (초당 페이지 수, 최대 메모리 사용량 MB)
+    """
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for file_name, html in pages:
+            extract(file_name, html)
+    elapsed = time.perf_counter() - start
+
+    # 메모리는 시간 측정과 따로 잰다 (tracemalloc이 속도를 떨어뜨림)
+    tracemalloc.start()
+    for file_name, html in pages:
+        extract(file_name, html)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return len(pages) * rounds / elapsed, peak / (1024 * 1024)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="블로그 HTML 추출 벤치마크")
+    parser.add_argument("--corpus", default=DEFAULT_CORPUS, help="블로그 페이지(.html) 폴더")
+    parser.add_argument("--rounds", type=int, default=10, help="코퍼스를 반복하는 횟수")
+    parser.add_argument("--save", nargs="+", metavar="URL", help="블로그 글을 받아서 코퍼스에 추가")
+    args = parser.parse_args()
+
+    if args.save:
+        save_pages(args.save, args.corpus)
+        return
+
+    pages = load_corpus(args.corpus)
+    if not pages:
+        print(f"코퍼스가 비어 있습니다: {args.corpus}")
+        return
+
+    # 두 방식의 추출 결과가 같은지 먼저 확인
+    for file_name, html in pages:
+        if as_tuple(extract_naver_blog(file_name, html)) != as_tuple(extract_naver_blog_full(file_name, html)):
+            print(f"추출 결과가 다릅니다: {file_name}")
+
+    modes = [
+        ("전체 파싱 (html.parser)", extract_naver_blog_full),
+        (f"컨테이너만 파싱 ({HTML_PARSER})", extract_naver_blog),
+    ]
+    print(f"페이지 {len(pages)}개 x {args.rounds}회")
+    baseline = None
+    for label, extract in modes:
+        pages_per_sec, peak_mb = measure(extract, pages, args.rounds)
+        baseline = baseline or pages_per_sec
+        print(f"{label:<32} {pages_per_sec:8.1f} pages/s  x{pages_per_sec / baseline:4.1f}  최대 메모리 {peak_mb:6.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
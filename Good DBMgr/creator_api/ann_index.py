@@ -0,0 +1,178 @@
+import os
+import json
+import time
+import math
+import numpy as np
+import faiss
+from .datas.constants import FAISS_INDEX_DEFAULT_PARAMS
+
+# 코드 설명 요약:
+# Faiss 인덱스 종류(Flat, IVF-Flat, IVF-PQ, HNSW)를 만들고 학습시키는 함수 모음입니다.
+# 인덱스 파라미터는 인덱스 파일 옆 <인덱스 이름>.params.json에 저장해서 웹 검색(nprobe/efSearch)에서도 그대로 씁니다.
+# evaluate_index로 Flat(전수 검색) 대비 recall@k와 검색 시간을 비교합니다.
+
+
+def index_params_path(index_file):
+    return f"{os.path.splitext(index_file)[0]}.params.json"
+
+
+def load_index_params(index_file):
+    path = index_params_path(index_file)
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_index_params(index_file, params):
+    path = index_params_path(index_file)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(params, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+
+
+def detect_index_type(index):
+    """
+    읽어온 인덱스 객체로 인덱스 종류 이름을 알아냅니다.
+    """
+    if index is None:
+        return None
+    index = faiss.downcast_index(index)
+    if isinstance(index, faiss.IndexIVFPQ):
+        return "IVF-PQ"
+    if isinstance(index, faiss.IndexIVFFlat):
+        return "IVF-Flat"
+    if isinstance(index, faiss.IndexHNSWFlat):
+        return "HNSW"
+    return "Flat"
+
+
+def resolve_params(index_type, n_vectors, dim, params=None):
+    """
+    기본값과 사용자 값을 합치고, 자동(None) 값은 벡터 개수/차원에 맞춰 정합니다.
+    :param index_type: 인덱스 종류
+    :param n_vectors: 학습에 쓸 벡터 개수
+    :param dim: 벡터 차원
+    :param params: 사용자 지정 파라미터 (없으면 기본값)
+    """
+    resolved = dict(FAISS_INDEX_DEFAULT_PARAMS.get(index_type, {}))
+    resolved.update({key: value for key, value in (params or {}).items() if value is not None})
+
+    if index_type in ("IVF-Flat", "IVF-PQ"):
+        # 클러스터당 학습 벡터가 39개 이상 되도록 nlist 상한을 둠 (Faiss 권장)
+        max_nlist = max(1, n_vectors // 39)
+        nlist = resolved.get("nlist") or int(4 * math.sqrt(max(n_vectors, 1)))
+        resolved["nlist"] = max(1, min(nlist, max_nlist))
+        resolved["nprobe"] = max(1, min(resolved.get("nprobe", 10), resolved["nlist"]))
+
+    if index_type == "IVF-PQ":
+        # m은 차원을 나눠떨어지게 해야 함 (서브벡터 하나당 8~16차원 정도)
+        m = resolved.get("m") or max(1, dim // 16)
+        while dim % m:
+            m -= 1
+        resolved["m"] = m
+        # PQ 코드북 하나에 2^nbits개의 중심점을 학습하므로 (중심점당 39개 이상) 벡터가 적으면 nbits를 줄임
+        max_nbits = max(1, int(math.log2(max(n_vectors // 39, 2))))
+        resolved["nbits"] = min(resolved.get("nbits", 8), max_nbits, 8)
+
+    return resolved
+
+
+def create_index(index_type, vectors, params=None):
+    """
+    벡터로 인덱스를 학습시키고 추가합니다.
+    :param index_type: "Flat", "IVF-Flat", "IVF-PQ", "HNSW"
+    :param vectors: (N, D) float32 배열
+    :param params: 인덱스 파라미터 (None 값은 자동)
+    :return: (인덱스, 실제로 사용한 파라미터)
+    """
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    n_vectors, dim = vectors.shape
+    params = resolve_params(index_type, n_vectors, dim, params)
+
+    if index_type == "Flat":
+        index = faiss.IndexFlatL2(dim)
+    elif index_type == "IVF-Flat":
+        quantizer = faiss.IndexFlatL2(dim)
+        index = faiss.IndexIVFFlat(quantizer, dim, params["nlist"], faiss.METRIC_L2)
+    elif index_type == "IVF-PQ":
+        quantizer = faiss.IndexFlatL2(dim)
+        index = faiss.IndexIVFPQ(quantizer, dim, params["nlist"], params["m"], params["nbits"])
+    elif index_type == "HNSW":
+        index = faiss.IndexHNSWFlat(dim, params["M"])
+        index.hnsw.efConstruction = params["ef_construction"]
+    else:
+        raise ValueError(f"지원하지 않는 인덱스 타입입니다: {index_type}")
+
+    if not index.is_trained:
+        index.train(vectors)
+    index.add(vectors)
+    apply_search_params(index, params)
+    return index, params
+
+
+def apply_search_params(index, params):
+    """
+    저장된 파라미터의 검색 설정(nprobe, efSearch)을 인덱스에 적용합니다.
+    """
+    index = faiss.downcast_index(index)
+    if isinstance(index, faiss.IndexIVF) and params.get("nprobe"):
+        index.nprobe = params["nprobe"]
+    if isinstance(index, faiss.IndexHNSW) and params.get("ef_search"):
+        index.hnsw.efSearch = params["ef_search"]
+
+
+def extract_vectors(index):
+    """
+    인덱스에 들어 있는 벡터를 모두 꺼냅니다. (IVF-PQ는 압축된 값이라 근사치)
+    """
+    if index is None or index.ntotal == 0:
+        return np.zeros((0, index.d if index is not None else 0), dtype=np.float32)
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None:
+        ivf.make_direct_map()
+    return index.reconstruct_n(0, index.ntotal)
+
+
+def evaluate_index(index, vectors, k=10, n_queries=200, seed=0):
+    """
+    Flat(전수 검색) 결과를 정답으로 보고 recall@k와 쿼리당 검색 시간을 비교합니다.
+    쿼리는 저장된 벡터에서 뽑아 약간의 잡음을 섞어 만듭니다.
+    :return: 보고서 딕셔너리
+    """
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    n_vectors, dim = vectors.shape
+    k = min(k, n_vectors)
+    if k == 0:
+        return {}
+    rng = np.random.default_rng(seed)
+    queries = vectors[rng.choice(n_vectors, size=min(n_queries, n_vectors), replace=False)]
+    queries = queries + rng.normal(scale=0.01, size=queries.shape).astype(np.float32)
+
+    flat = faiss.IndexFlatL2(dim)
+    flat.add(vectors)
+
+    def timed_search(target):
+        latencies = []
+        results = []
+        for query in queries:
+            start = time.perf_counter()
+            _, ids = target.search(query.reshape(1, -1), k)
+            latencies.append(time.perf_counter() - start)
+            results.append(ids[0])
+        return np.array(results), np.array(latencies) * 1000
+
+    truth, flat_latencies = timed_search(flat)
+    found, ann_latencies = timed_search(index)
+    hits = sum(len(np.intersect1d(t, f[f >= 0])) for t, f in zip(truth, found))
+
+    return {
+        "k": k,
+        "queries": len(queries),
+        "recall": round(hits / truth.size, 4),
+        "flat_p50_ms": round(float(np.percentile(flat_latencies, 50)), 3),
+        "flat_p99_ms": round(float(np.percentile(flat_latencies, 99)), 3),
+        "ann_p50_ms": round(float(np.percentile(ann_latencies, 50)), 3),
+        "ann_p99_ms": round(float(np.percentile(ann_latencies, 99)), 3),
+    }
@@ -1,7 +1,9 @@
 import tkinter as tk
 from tkinter import ttk
 from .naver_service import NaverService
-from .datas.constants import TEST_MODE, GATHER_MODE
+from .seen_urls import SeenUrlStore
+from .datas.constants import TEST_MODE, GATHER_MODE, PAGINATED_MODE
+from vdb_data.common_constants import SEEN_URLS_PATH
 from configuration import load_module_config, save_module_config
 
 class CrawlingModule:
@@ -13,6 +15,8 @@ class CrawlingModule:
         self.recent_regions = self.config.get('recent_regions', [])
         self.recent_keywords = self.config.get('recent_keywords', [])
         self.crawling_tool = NaverService()
+        self.seen_urls = SeenUrlStore(SEEN_URLS_PATH)
+        self.pending_seen_urls = []  # 이번 실행에서 받았지만 가게 정보가 없는 링크 (VDB 저장이 끝나면 seen_urls에 기록)
         self.create_widgets()
     
     def create_widgets(self):
@@ -43,6 +47,10 @@ class CrawlingModule:
         ttk.Radiobutton(self.main_frame, text=GATHER_MODE, 
                         variable=self.crawling_mode, value=GATHER_MODE).grid(row=2, column=2, padx=(0,5), pady=5, sticky='w')
 
+        # 페이지 수집 모드 라디오 버튼 (검색 결과 최대 1000개, 이전에 크롤링한 링크 제외)
+        ttk.Radiobutton(self.main_frame, text=PAGINATED_MODE,
+                        variable=self.crawling_mode, value=PAGINATED_MODE).grid(row=2, column=3, padx=(0,5), pady=5, sticky='w')
+
     def load_config(self):
         crawling_config = load_module_config('crawling')
         self.region = crawling_config.get('region', '')
@@ -115,7 +123,8 @@ class CrawlingModule:
             # 모드에 따라 display 값 설정
             display = 10 if mode == TEST_MODE else 100         
 
-            results = self.crawling_tool.crawling_naver_blog_data(query=keyword, region=region, display=display)
+            self.crawling_tool.reset_stats()
+            results = await self.crawling_tool.crawling_naver_blog_data(query=keyword, region=region, display=display)
 
             total_results = len(results)
             
@@ -123,12 +132,61 @@ class CrawlingModule:
                 status_message = f"처리 중: {result.name} ({i+1}/{total_results})"
                 self.status_module.update_status(status_message)
 
-            self.status_module.update_status("크롤링이 완료되었습니다.")
+            stats = self.crawling_tool.stats()
+            self.status_module.update_status(
+                f"크롤링이 완료되었습니다: 페이지 {stats['pages']}개 / {stats['seconds']}초 "
+                f"({stats['pages_per_sec']} 페이지/s, 실패 {stats['failed_pages']}개, 재시도 {stats['retries']}회)")
             return results
         except Exception as e:
             error_message = f"크롤링 중 오류 발생: {str(e)}"
             self.status_module.update_status(error_message)
             return None
 
+    async def stream_crawling(self, keyword: str, region: str):
+        """
+        페이지 수집 모드: 검색 결과 페이지(100개)마다 크롤링 결과를 바로 내보내는 비동기 제너레이터
+        """
+        self.status_module.update_status(f"키워드: {keyword}, 지역: {region}, 모드: {PAGINATED_MODE}(으)로 크롤링을 시작합니다 "
+                                         f"(이전에 크롤링한 링크 {self.seen_urls.count()}개 제외)")
+        self.update_recent_items("region", region)
+        self.update_recent_items("keyword", keyword)
+        self.crawling_tool.reset_stats()
+        self.pending_seen_urls = []
+
+        total_results = 0
+        async for page_number, (results, links, fetched_links) in self.aenumerate(
+                self.crawling_tool.iter_naver_blog_pages(query=keyword, region=region, seen_urls=self.seen_urls)):
+            # 가게 정보가 없는 글만 여기서 모아 둠 (가게 정보가 있는 글은 임베딩/저장까지 끝난 것만 commit_seen_urls에서 기록)
+            # 받지 못한 링크는 기록하지 않아서 다음 실행에서 다시 시도
+            result_links = {result.link for result in results}
+            self.pending_seen_urls.extend(link for link in fetched_links if link not in result_links)
+            total_results += len(results)
+            self.status_module.update_status(f"페이지 {page_number + 1}: 새 링크 {len(links)}개 "
+                                             f"(실패 {len(links) - len(fetched_links)}개), 가게 정보 {len(results)}개 "
+                                             f"(누적 {total_results}개)")
+            if results:
+                yield results
+
+        stats = self.crawling_tool.stats()
+        self.status_module.update_status(
+            f"크롤링이 완료되었습니다: 페이지 {stats['pages']}개 / {stats['seconds']}초 "
+            f"({stats['pages_per_sec']} 페이지/s, 실패 {stats['failed_pages']}개, 재시도 {stats['retries']}회)")
+
+    @staticmethod
+    async def aenumerate(async_iterable):
+        index = 0
+        async for item in async_iterable:
+            yield index, item
+            index += 1
+
+    def commit_seen_urls(self, saved_links):
+        """
+        VDB 저장이 끝난 뒤 저장한 글과 가게 정보가 없던 글의 링크를 기록합니다. (다음 실행에서 건너뜀)
+        임베딩에 실패해서 저장하지 못한 글은 기록하지 않으므로 다음 실행에서 다시 크롤링합니다.
+        :param saved_links: 임베딩해서 저장한 블로그 링크 리스트
+        """
+        self.seen_urls.add_many(self.pending_seen_urls + [link for link in saved_links if link])
+        self.pending_seen_urls = []
+
     def get_widget(self):
         return self.main_frame
\ No newline at end of file
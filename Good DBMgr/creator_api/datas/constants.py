@@ -1,6 +1,20 @@
 # 크롤링 상수
 TEST_MODE = "테스트 모드(10)"
 GATHER_MODE = "데이터 수집 모드(100)"
+PAGINATED_MODE = "페이지 수집 모드(1000)"
+
+# 네이버 블로그 검색 API 한도 (display 최대 100, start 최대 1000)
+NAVER_SEARCH_MAX_DISPLAY = 100
+NAVER_SEARCH_MAX_START = 1000
+
+# 블로그 비동기 크롤링 (aiohttp 세션 하나로 커넥션 재사용)
+CRAWL_MAX_CONCURRENCY = 16  # 동시에 진행하는 최대 요청 수
+CRAWL_PER_HOST_LIMIT = 4  # 호스트 하나에 동시에 여는 최대 커넥션 수
+CRAWL_PER_HOST_INTERVAL = 0.1  # 같은 호스트에 요청을 보내는 최소 간격 (초)
+CRAWL_TIMEOUT = 10  # 요청당 타임아웃 (초)
+CRAWL_MAX_RETRIES = 3  # 요청 한도/서버 오류/연결 오류 시 재시도 횟수
+CRAWL_RETRY_BASE_DELAY = 0.5  # 첫 재시도 대기 시간 (초), 재시도마다 두 배
+CRAWL_PARSE_WORKERS = 4  # HTML 파싱 프로세스 수
 
 """
 전처리 상수
@@ -14,11 +28,43 @@ EMBEDDING_MODEL_VERSIONS = {
     "OpenAI": ["text-embedding-3-small"]
 }
 
+# 임베딩 배치 (여러 블로그의 청크를 토큰 예산에 맞춰 묶어서 embed_documents로 요청)
+EMBEDDING_BATCH_MAX_TOKENS = 50000  # 배치 하나의 최대 토큰 수
+EMBEDDING_BATCH_MAX_ITEMS = 512  # 배치 하나의 최대 청크 수
+EMBEDDING_MAX_CONCURRENT_BATCHES = 4  # 동시에 보내는 배치 수
+EMBEDDING_MAX_RETRIES = 5  # 요청 한도/서버 오류 시 재시도 횟수
+EMBEDDING_RETRY_BASE_DELAY = 1.0  # 첫 재시도 대기 시간 (초), 재시도마다 두 배
+
 # 벡터 db
 VECTOR_DBS = [
     "Faiss"
 ]
 
+# 추가 세그먼트가 이 개수만큼 쌓이면 저장할 때 기본 인덱스로 합침 (크롤링 실행마다 세그먼트 하나)
+SEGMENT_COMPACT_THRESHOLD = 8
+
+# 중복 제거 (병합/저장할 때 같은 글, 같은 청크, 거의 같은 벡터를 뺌)
+NEAR_DUPLICATE_DISTANCE = 0.04  # L2 거리 제곱 (정규화된 임베딩에서 코사인 유사도 0.98 이상)
+DEDUP_BATCH_SIZE = 1024  # 근접 중복을 한 번에 검색하는 벡터 수
+DEDUP_EXACT_LIMIT = 50000  # 이 행 수까지는 남긴 벡터를 Flat(전수)으로 검색, 넘으면 IVF-SQ8로 근사 검색
+DEDUP_NEAR_NEIGHBORS = 8  # 근접 중복 후보 수 (이 중 같은 글/가게의 벡터만 중복으로 봄)
+
+# Faiss 인덱스 종류 (Flat: 전수 검색, 나머지: 근사 검색)
+FAISS_INDEX_TYPES = [
+    "Flat",
+    "IVF-Flat",
+    "IVF-PQ",
+    "HNSW"
+]
+
+# 인덱스 종류별 기본 파라미터 (None은 벡터 개수/차원에 맞춰 자동 설정)
+FAISS_INDEX_DEFAULT_PARAMS = {
+    "Flat": {},
+    "IVF-Flat": {"nlist": None, "nprobe": 10},
+    "IVF-PQ": {"nlist": None, "nprobe": 10, "m": None, "nbits": 8},
+    "HNSW": {"M": 32, "ef_construction": 200, "ef_search": 64}
+}
+
 # 요약 모델
 SUMMARY_MODEL_TYPES = [
     "OpenAI"
@@ -0,0 +1,459 @@
+import os
+import json
+import time
+import hashlib
+import logging
+from collections import Counter
+from urllib.parse import urlparse, parse_qs
+import numpy as np
+import faiss
+from .datas.constants import NEAR_DUPLICATE_DISTANCE, DEDUP_BATCH_SIZE, DEDUP_EXACT_LIMIT, DEDUP_NEAR_NEIGHBORS
+from .ann_index import load_index_params, apply_search_params
+from spot_store.metadataStore import load_metadata, metadata_source_path
+
+# 코드 설명 요약:
+# 같은 블로그 글/가게를 두 번 크롤링해서 생긴 중복 청크를 병합(Merger)과 저장(VdbSaveModule) 때 뺍니다.
+# 행 하나씩 순서대로 보고, 앞에서 남긴 행과 아래 중 하나라도 겹치면 뺍니다.
+# - 같은 청크: 같은 저장소의 같은 data_id + chunk_index (세그먼트가 두 번 들어간 경우 등)
+# - 같은 글: 링크가 같은데 data_id가 다름 (모바일/PC 주소, PostView 주소 차이는 같은 링크로 봄)
+# - 같은 본문: 같은 글(링크) 또는 같은 가게(이름 + 주소)에서 공백을 정리한 청크 본문이 똑같음
+# - 근접 벡터: 같은 글 또는 같은 가게의 남긴 벡터 중 L2 거리 제곱이 NEAR_DUPLICATE_DISTANCE 이하인 것이 있음
+#   (배치 단위로 남긴 벡터 인덱스에서 검색하고, 같은 배치 안에서는 range_search로 찾음)
+# 본문/근접 벡터는 같은 글이나 같은 가게 안에서만 봅니다. ("주차 가능합니다"처럼 가게마다 비슷한 청크는 남김)
+# 키는 모두 uint64 해시이고, 저장된 세그먼트의 행별 키는 <세그먼트 이름>.keys.npz에 따로 저장해 두고
+# 저장할 때는 이 키 배열만 읽어서 정렬 + searchsorted로 한꺼번에 비교합니다. (저장된 메타데이터를 행마다 읽지 않음)
+# 뺀 행은 이유와 남긴 쪽 행 번호(결과 인덱스 기준)와 함께 <인덱스 이름>.dedup.json에 기록합니다.
+
+REASON_CHUNK = "chunk"
+REASON_LINK = "link"
+REASON_CONTENT = "content"
+REASON_NEAR = "near"
+REASON_LABELS = {REASON_CHUNK: "같은 청크", REASON_LINK: "같은 글", REASON_CONTENT: "같은 본문", REASON_NEAR: "근접 벡터"}
+
+NO_KEY = np.uint64(0)  # 키가 없는 행 (링크/가게 이름/본문이 비어 있음)
+KEY_FIELDS = ("data_id", "chunk_index", "link", "place", "content")
+_MIX = np.uint64(0x9E3779B97F4A7C15)
+
+
+def dedup_report_path(index_file):
+    return f"{os.path.splitext(index_file)[0]}.dedup.json"
+
+
+def dedup_keys_path(index_file):
+    """
+    spot_index.bin -> spot_index.keys.npz (세그먼트는 000001.bin -> 000001.keys.npz)
+    """
+    return f"{os.path.splitext(index_file)[0]}.keys.npz"
+
+
+def link_key(link):
+    """
+    같은 블로그 글의 링크를 같은 키로 맞춥니다.
+    https://m.blog.naver.com/아이디/글번호/, https://blog.naver.com/PostView.naver?blogId=아이디&logNo=글번호
+    -> blog.naver.com/아이디/글번호
+    """
+    if not isinstance(link, str) or not link.strip():
+        return None
+    link = link.strip()
+    parsed = urlparse(link if "://" in link else f"https://{link}")
+    host = parsed.netloc.lower()
+    if host.startswith("m."):
+        host = host[2:]
+    query = parse_qs(parsed.query)
+    if "blogId" in query and "logNo" in query:
+        return f"{host}/{query['blogId'][0]}/{query['logNo'][0]}"
+    return f"{host}{parsed.path.rstrip('/')}"
+
+
+def place_key(name, address):
+    """
+    같은 가게 키: 공백을 정리한 가게 이름 + 주소 (이름이 없으면 None)
+    """
+    if not isinstance(name, str) or not name.strip():
+        return None
+    address = " ".join(address.split()) if isinstance(address, str) else ""
+    return f"{' '.join(name.split())}\n{address}"
+
+
+def content_key(text):
+    """
+    공백을 정리한 본문 (본문이 비어 있으면 None - 빈 청크끼리는 중복으로 보지 않음)
+    """
+    if not isinstance(text, str):
+        return None
+    normalized = " ".join(text.split())
+    return normalized or None
+
+
+def hash_key(key):
+    """
+    문자열 키 -> uint64 해시 (None이면 NO_KEY)
+    """
+    if key is None:
+        return int(NO_KEY)
+    return int.from_bytes(hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest(), "little") or 1
+
+
+def combine(left, right):
+    """
+    두 키 배열을 키 하나로 합칩니다. (둘 중 하나라도 없으면 NO_KEY)
+    """
+    left = np.asarray(left, dtype=np.uint64)
+    right = np.asarray(right, dtype=np.uint64)
+    return np.where((left != NO_KEY) & (right != NO_KEY), (left * _MIX) ^ right, NO_KEY)
+
+
+def _value(metadata, position, name):
+    if hasattr(metadata, "get_value"):
+        return metadata.get_value(position, name)
+    return metadata[position].get(name)
+
+
+def _int_value(value):
+    return value if isinstance(value, (int, np.integer)) and not isinstance(value, bool) else -1
+
+
+def row_hashes(metadata, start=0, stop=None):
+    """
+    메타데이터 행별 키 배열 (data_id/chunk_index: int64, 없으면 -1 / link/place/content: uint64 해시)
+    """
+    stop = len(metadata) if stop is None else stop
+    positions = range(start, stop)
+    keys = dict()
+    for name in ("data_id", "chunk_index"):
+        if hasattr(metadata, "int_column"):
+            keys[name] = np.array(metadata.int_column(name)[start:stop], dtype=np.int64)
+        else:
+            keys[name] = np.array([_int_value(_value(metadata, p, name)) for p in positions], dtype=np.int64)
+    keys["link"] = np.array([hash_key(link_key(_value(metadata, p, "link"))) for p in positions], dtype=np.uint64)
+    keys["place"] = np.array([hash_key(place_key(_value(metadata, p, "name"), _value(metadata, p, "address")))
+                              for p in positions], dtype=np.uint64)
+    keys["content"] = np.array([hash_key(content_key(_value(metadata, p, "chunk_content"))) for p in positions],
+                               dtype=np.uint64)
+    return keys
+
+
+def write_dedup_keys(path, keys):
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        np.savez(f, **{name: keys[name] for name in KEY_FIELDS})
+    os.replace(tmp_path, path)
+
+
+def load_dedup_keys(index_file, metadata_file, rows):
+    """
+    세그먼트의 행별 키를 읽습니다. 키 파일이 없거나 메타데이터보다 오래됐거나 행 수가 다르면
+    메타데이터에서 한 번 계산해서 키 파일로 저장합니다. (예전 저장소, 병합 결과)
+    :param rows: 세그먼트의 행 수 (매니페스트 기준)
+    """
+    path = dedup_keys_path(index_file)
+    if os.path.exists(path) and os.stat(path).st_mtime_ns >= os.stat(metadata_source_path(metadata_file)).st_mtime_ns:
+        with np.load(path, allow_pickle=False) as data:
+            keys = {name: data[name] for name in KEY_FIELDS}
+        if len(keys["data_id"]) == rows:
+            return keys
+
+    metadata = load_metadata(metadata_file)
+    try:
+        keys = row_hashes(metadata)
+    finally:
+        if hasattr(metadata, "close"):
+            metadata.close()
+    try:
+        write_dedup_keys(path, keys)
+    except OSError as e:
+        logging.warning(f"중복 검사 키 파일을 저장하지 못했습니다: {str(e)}")
+    return keys
+
+
+def open_probe_index(index_file):
+    """
+    이미 저장된 인덱스를 근접 중복 검색용으로 엽니다. (가능하면 메모리 맵, 저장된 nprobe/efSearch 적용)
+    IVF-PQ는 거리가 압축된 근사값이라 새 글을 잘못 뺄 수 있어서 None을 반환합니다. (같은 글/본문 검사만 함)
+    """
+    try:
+        index = faiss.read_index(index_file, faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY)
+    except RuntimeError:
+        index = faiss.read_index(index_file)
+    if isinstance(faiss.downcast_index(index), faiss.IndexIVFPQ):
+        return None
+    apply_search_params(index, load_index_params(index_file))
+    return index
+
+
+class KeyTable:
+    def __init__(self, keys, start):
+        """
+        키 배열 -> 그 키가 처음 나온 결과 행 번호 (정렬된 키 + searchsorted, NO_KEY는 제외)
+        :param start: keys[0]의 결과 행 번호
+        """
+        rows = np.flatnonzero(keys != NO_KEY)
+        self.keys, first = np.unique(keys[rows], return_index=True)
+        self.rows = rows[first] + start
+
+    def lookup(self, keys):
+        """
+        :return: 키별 결과 행 번호 배열 (없으면 -1)
+        """
+        found = np.full(len(keys), -1, dtype=np.int64)
+        if len(self.keys) == 0:
+            return found
+        positions = np.minimum(np.searchsorted(self.keys, keys), len(self.keys) - 1)
+        hit = (self.keys[positions] == keys) & (keys != NO_KEY)
+        found[hit] = self.rows[positions[hit]]
+        return found
+
+
+class Deduplicator:
+    def __init__(self, expected_rows=0, distance=NEAR_DUPLICATE_DISTANCE):
+        """
+        :param expected_rows: 검사할 행 수 (남긴 벡터를 Flat으로 검색할지 IVF-SQ8로 검색할지 정함, expect로 늘릴 수 있음)
+        :param distance: 이 L2 거리 제곱 이하인 벡터는 근접 중복으로 봄 (0 이하면 근접 중복 검사 안 함)
+        """
+        self.expected_rows = expected_rows
+        self.distance = distance
+        self.stored = list()  # 검사 없이 등록한 저장소 세그먼트별 (KeyTable 딕셔너리, owner 배열, 시작 행)
+        self.chunks = dict()  # 검사해서 남긴 행: 청크 키 -> 결과 행 번호
+        self.links = dict()  # 링크 키 -> (owner 키, 결과 행 번호)
+        self.contents = dict()  # (링크 또는 가게) + 본문 키 -> 결과 행 번호
+        self.row_links = np.zeros(0, dtype=np.uint64)  # 결과 행 번호 -> 링크 키 (근접 벡터가 같은 글인지 확인)
+        self.row_places = np.zeros(0, dtype=np.uint64)  # 결과 행 번호 -> 가게 키
+        self.probes = list()  # (이미 있는 저장소 인덱스, 결과 행 번호 시작)
+        self.seen = None  # 남긴 벡터를 검색하는 인덱스 (라벨 + seen_start = 결과 행 번호)
+        self.seen_start = 0
+        self.quantizer = None
+        self.rows = 0  # 지금까지 남긴 행 수 (= 다음 결과 행 번호)
+        self.counts = Counter()
+        self.removed = list()
+
+    def expect(self, rows):
+        self.expected_rows += rows
+
+    @staticmethod
+    def derive(keys, source):
+        """
+        row_hashes의 키로 검사용 키를 만듭니다.
+        :param source: data_id가 같은 글인지 구분하는 저장소 키
+        """
+        source_keys = np.full(len(keys["data_id"]), hash_key(str(source)), dtype=np.uint64)
+        owner = combine(source_keys, (keys["data_id"] + 1).astype(np.uint64))  # data_id가 없으면(-1) NO_KEY
+        return {"owner": owner,
+                "chunk": combine(owner, (keys["chunk_index"] + 1).astype(np.uint64)),
+                "link": keys["link"],
+                "place": keys["place"],
+                "link_content": combine(keys["link"], keys["content"]),
+                "place_content": combine(keys["place"], keys["content"])}
+
+    def remember_scopes(self, start, links, places):
+        """
+        결과 행 번호 start부터 남긴 행들의 링크/가게 키를 기록합니다. (배열은 두 배씩 늘림)
+        """
+        end = start + len(links)
+        if end > len(self.row_links):
+            capacity = max(end, 2 * len(self.row_links))
+            self.row_links = np.concatenate([self.row_links[:start], np.zeros(capacity - start, np.uint64)])
+            self.row_places = np.concatenate([self.row_places[:start], np.zeros(capacity - start, np.uint64)])
+        self.row_links[start:end] = links
+        self.row_places[start:end] = places
+
+    def register(self, keys, source, index=None):
+        """
+        이미 저장된 행을 검사 없이 남긴 행으로 등록합니다. (저장할 때 기존 기본/추가 세그먼트)
+        :param keys: 세그먼트의 행별 키 (load_dedup_keys)
+        :param index: 같은 행 순서의 인덱스 (open_probe_index, None이면 근접 중복 검사에서 빠짐)
+        """
+        derived = self.derive(keys, source)
+        tables = {name: KeyTable(derived[name], self.rows) for name in ("chunk", "link", "link_content", "place_content")}
+        self.stored.append((tables, derived["owner"], self.rows))
+        self.remember_scopes(self.rows, derived["link"], derived["place"])
+        if index is not None and index.ntotal:
+            self.probes.append((index, self.rows))
+        self.rows += len(derived["owner"])
+        self.seen_start = self.rows
+
+    def stored_duplicates(self, derived):
+        """
+        배치의 행을 등록된 저장소 세그먼트와 한꺼번에 비교합니다.
+        :return: {이유: 배치 행별 남긴 쪽 결과 행 번호 배열 (없으면 -1)}
+        """
+        count = len(derived["owner"])
+        found = {reason: np.full(count, -1, dtype=np.int64) for reason in (REASON_CHUNK, REASON_LINK, REASON_CONTENT)}
+        for tables, owners, start in self.stored:
+            rows = tables["chunk"].lookup(derived["chunk"])
+            found[REASON_CHUNK] = np.where(found[REASON_CHUNK] < 0, rows, found[REASON_CHUNK])
+            rows = tables["link"].lookup(derived["link"])
+            other = rows >= 0
+            other[other] = owners[rows[other] - start] != derived["owner"][other]  # 같은 링크, 다른 글
+            found[REASON_LINK] = np.where((found[REASON_LINK] < 0) & other, rows, found[REASON_LINK])
+            for name in ("link_content", "place_content"):
+                rows = tables[name].lookup(derived[name])
+                found[REASON_CONTENT] = np.where(found[REASON_CONTENT] < 0, rows, found[REASON_CONTENT])
+        return found
+
+    def exact_duplicate(self, derived, stored, i):
+        """
+        :return: (이유, 남긴 쪽 결과 행 번호) 또는 None
+        """
+        chunk, owner, link = int(derived["chunk"][i]), int(derived["owner"][i]), int(derived["link"][i])
+        if stored[REASON_CHUNK][i] >= 0:
+            return REASON_CHUNK, int(stored[REASON_CHUNK][i])
+        if chunk and chunk in self.chunks:
+            return REASON_CHUNK, self.chunks[chunk]
+        if stored[REASON_LINK][i] >= 0:
+            return REASON_LINK, int(stored[REASON_LINK][i])
+        if link and link in self.links and self.links[link][0] != owner:
+            return REASON_LINK, self.links[link][1]
+        if stored[REASON_CONTENT][i] >= 0:
+            return REASON_CONTENT, int(stored[REASON_CONTENT][i])
+        for name in ("link_content", "place_content"):
+            content = int(derived[name][i])
+            if content and content in self.contents:
+                return REASON_CONTENT, self.contents[content]
+        return None
+
+    def remember(self, derived, i, row):
+        chunk, link = int(derived["chunk"][i]), int(derived["link"][i])
+        if chunk:
+            self.chunks.setdefault(chunk, row)
+        if link:
+            self.links.setdefault(link, (int(derived["owner"][i]), row))
+        for name in ("link_content", "place_content"):
+            content = int(derived[name][i])
+            if content:
+                self.contents.setdefault(content, row)
+
+    def same_scope(self, links, places, link, place):
+        """
+        (링크 키 배열, 가게 키 배열)의 행 중 같은 글 또는 같은 가게인 행
+        """
+        return ((links == link) & (link != NO_KEY)) | ((places == place) & (place != NO_KEY))
+
+    def create_seen_index(self, vectors):
+        dim = vectors.shape[1]
+        nlist = min(int(4 * np.sqrt(max(self.expected_rows, 1))), len(vectors) // 39)
+        if self.expected_rows <= DEDUP_EXACT_LIMIT or nlist < 2:
+            return faiss.IndexFlatL2(dim)
+        # 행이 많으면 전수 검색 대신 IVF로 찾고, 벡터는 8비트로 저장해서 메모리를 줄임 (거리 오차는 기준보다 훨씬 작음)
+        self.quantizer = faiss.IndexFlatL2(dim)
+        index = faiss.IndexIVFScalarQuantizer(self.quantizer, dim, nlist, faiss.ScalarQuantizer.QT_8bit, faiss.METRIC_L2)
+        index.train(vectors)
+        index.nprobe = min(16, nlist)
+        return index
+
+    def nearest(self, vectors, k=DEDUP_NEAR_NEIGHBORS):
+        """
+        남긴 벡터(기존 저장소 + 지금까지 남긴 행) 중 가까운 것 k개
+        :return: (L2 거리 제곱 배열 (N, k), 결과 행 번호 배열 (N, k) - 없으면 -1), 가까운 순
+        """
+        distances = [np.full((len(vectors), k), np.inf, dtype=np.float32)]
+        rows = [np.full((len(vectors), k), -1, dtype=np.int64)]
+        for index, start in self.probes + [(self.seen, self.seen_start)]:
+            if index is None or index.ntotal == 0:
+                continue
+            found_distances, labels = index.search(vectors, k)
+            distances.append(np.where(labels >= 0, found_distances, np.inf).astype(np.float32))
+            rows.append(np.where(labels >= 0, labels + start, -1))
+        distances = np.hstack(distances)
+        rows = np.hstack(rows)
+        order = np.argsort(distances, axis=1, kind="stable")[:, :k]
+        return np.take_along_axis(distances, order, axis=1), np.take_along_axis(rows, order, axis=1)
+
+    def near_duplicate(self, distances, rows, link, place):
+        """
+        가까운 후보 중 기준 거리 이하이고 같은 글/가게인 첫 번째 행
+        :return: (이유, 남긴 쪽 결과 행 번호, 거리) 또는 None
+        """
+        close = (rows >= 0) & (distances <= self.distance)
+        if not close.any():
+            return None
+        candidates = rows[close]
+        match = self.same_scope(self.row_links[candidates], self.row_places[candidates], link, place)
+        if not match.any():
+            return None
+        first = int(np.flatnonzero(match)[0])
+        return REASON_NEAR, int(candidates[first]), float(distances[close][first])
+
+    def filter(self, metadata, vectors, source, label, start=0):
+        """
+        행을 순서대로 검사해서 남길 행을 고르고, 남긴 행은 다음 검사 대상에 추가합니다.
+        :param metadata: 메타데이터 (ColumnarMetadata 또는 딕셔너리 리스트)
+        :param vectors: metadata의 start번째 행부터의 벡터 (N, D)
+        :param source: data_id가 같은 글인지 구분하는 저장소 키 (같은 저장소의 세그먼트는 같은 키)
+        :param label: 보고서에 남길 입력 이름 (파일 경로 등)
+        :return: 남길 행의 bool 배열 (N,)
+        """
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        keep = np.zeros(len(vectors), dtype=bool)
+        if self.distance > 0 and self.seen is None and len(vectors):
+            self.seen = self.create_seen_index(vectors)
+
+        for batch_start in range(0, len(vectors), DEDUP_BATCH_SIZE):
+            batch = vectors[batch_start:batch_start + DEDUP_BATCH_SIZE]
+            first = start + batch_start
+            derived = self.derive(row_hashes(metadata, first, first + len(batch)), source)
+            stored = self.stored_duplicates(derived)
+            batch_rows = np.full(len(batch), -1, dtype=np.int64)  # 배치 안에서 남긴 행의 결과 행 번호
+            if self.distance > 0:
+                distances, rows = self.nearest(batch)
+                # 같은 배치 안의 근접 중복 (아직 남긴 벡터 인덱스에 없음)
+                batch_index = faiss.IndexFlatL2(batch.shape[1])
+                batch_index.add(batch)
+                lims, batch_distances, neighbors = batch_index.range_search(batch, self.distance)
+
+            batch_first_row = self.rows
+            for i in range(len(batch)):
+                link, place = derived["link"][i], derived["place"][i]
+                duplicate = self.exact_duplicate(derived, stored, i)
+                if duplicate is None and self.distance > 0:
+                    duplicate = self.near_duplicate(distances[i], rows[i], link, place)
+                    if duplicate is None:
+                        near = [(batch_distances[j], batch_rows[neighbors[j]]) for j in range(lims[i], lims[i + 1])
+                                if neighbors[j] < i and batch_rows[neighbors[j]] >= 0 and
+                                self.same_scope(derived["link"][neighbors[j]], derived["place"][neighbors[j]], link, place)]
+                        if near:
+                            distance, row = min(near)
+                            duplicate = REASON_NEAR, int(row), float(distance)
+                if duplicate is not None:
+                    self.record(metadata, first + i, label, *duplicate)
+                    continue
+                batch_rows[i] = self.rows
+                self.remember(derived, i, self.rows)
+                self.rows += 1
+                keep[batch_start + i] = True
+
+            kept = batch_rows >= 0
+            self.remember_scopes(batch_first_row, derived["link"][kept], derived["place"][kept])
+            if self.seen is not None:
+                self.seen.add(batch[kept])
+        return keep
+
+    def record(self, metadata, position, label, reason, duplicate_of, distance=None):
+        entry = {"reason": reason, "source": label, "row": int(position),
+                 "data_id": _value(metadata, position, "data_id"), "name": _value(metadata, position, "name"),
+                 "link": _value(metadata, position, "link"), "duplicate_of": duplicate_of}
+        if distance is not None:
+            entry["distance"] = round(distance, 6)
+        self.counts[reason] += 1
+        self.removed.append(entry)
+
+    def summary(self):
+        if not self.removed:
+            return "중복 없음"
+        details = ", ".join(f"{REASON_LABELS[reason]} {self.counts[reason]}" for reason in REASON_LABELS if self.counts[reason])
+        return f"중복 {len(self.removed)}행 제거 ({details})"
+
+    def write_report(self, path):
+        """
+        뺀 행 목록을 JSON으로 저장합니다. (duplicate_of: 남긴 쪽의 결과 인덱스 행 번호)
+        """
+        report = {
+            "created_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "kept": self.rows,
+            "removed": len(self.removed),
+            "counts": dict(self.counts),
+            "near_duplicate_distance": self.distance,
+            "rows": self.removed,
+        }
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        return path
@@ -0,0 +1,175 @@
+import time
+import random
+import asyncio
+from .datas.constants import (EMBEDDING_BATCH_MAX_TOKENS, EMBEDDING_BATCH_MAX_ITEMS, EMBEDDING_MAX_CONCURRENT_BATCHES,
+                              EMBEDDING_MAX_RETRIES, EMBEDDING_RETRY_BASE_DELAY)
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+# 코드 설명 요약:
+# 여러 블로그의 청크를 모아 토큰 예산에 맞는 배치로 묶고, embed_documents 한 번에 배치 하나씩 보냅니다.
+# 동시에 보내는 배치 수를 제한하고, 요청 한도(429)/서버 오류가 나면 지수 백오프로 다시 시도합니다.
+# 처리량(청크/초, 토큰/초)과 배치/재시도 횟수를 기록합니다.
+
+
+def is_retryable_error(error):
+    """
+    다시 시도할 만한 오류인지 확인합니다. (요청 한도 초과, 서버 오류, 연결/타임아웃)
+    """
+    status_code = getattr(error, "status_code", None)
+    if status_code is not None:
+        return status_code == 429 or status_code >= 500
+    return type(error).__name__ in ("RateLimitError", "APIConnectionError", "APITimeoutError", "Timeout")
+
+
+def retry_after_seconds(error):
+    """
+    응답 헤더의 Retry-After 값 (없으면 None)
+    """
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+class EmbeddingScheduler:
+    def __init__(self, embedding, max_batch_tokens=EMBEDDING_BATCH_MAX_TOKENS, max_batch_items=EMBEDDING_BATCH_MAX_ITEMS,
+                 max_concurrent_batches=EMBEDDING_MAX_CONCURRENT_BATCHES, max_retries=EMBEDDING_MAX_RETRIES,
+                 retry_base_delay=EMBEDDING_RETRY_BASE_DELAY):
+        """
+        :param embedding: EmbeddingModule (get_text_embeddings_batch, executor, store 사용)
+        :param max_batch_tokens: 배치 하나에 넣을 최대 토큰 수
+        :param max_batch_items: 배치 하나에 넣을 최대 청크 수
+        :param max_concurrent_batches: 동시에 보내는 최대 배치 수
+        :param max_retries: 배치당 최대 재시도 횟수
+        :param retry_base_delay: 첫 재시도 대기 시간 (초), 재시도마다 두 배
+        """
+        self.embedding = embedding
+        self.max_batch_tokens = max_batch_tokens
+        self.max_batch_items = max_batch_items
+        self.max_concurrent_batches = max_concurrent_batches
+        self.max_retries = max_retries
+        self.retry_base_delay = retry_base_delay
+        self.encoder = self.get_encoder(embedding.version)
+        self.reset_stats()
+
+    @staticmethod
+    def get_encoder(model_version):
+        if tiktoken is None:
+            return None
+        try:
+            return tiktoken.encoding_for_model(model_version)
+        except KeyError:
+            return tiktoken.get_encoding("cl100k_base")
+
+    def count_tokens(self, text):
+        if self.encoder is not None:
+            return len(self.encoder.encode(text, disallowed_special=()))
+        return len(text)  # tiktoken이 없으면 글자 수로 넉넉하게 추정 (한글은 보통 글자당 1토큰 이하)
+
+    def reset_stats(self):
+        self.chunks = 0
+        self.tokens = 0
+        self.batches = 0
+        self.retries = 0
+        self.failed_batches = 0
+        self.cache_hits = 0
+        self.elapsed = 0.0
+        self.last_errors = []
+
+    def pack_batches(self, texts, token_counts):
+        """
+        순서대로 토큰 예산/개수 한도를 넘지 않게 배치로 나눕니다.
+        :return: 배치별 텍스트 인덱스 리스트
+        """
+        batches = []
+        current = []
+        current_tokens = 0
+        for i, tokens in enumerate(token_counts):
+            if current and (current_tokens + tokens > self.max_batch_tokens or len(current) >= self.max_batch_items):
+                batches.append(current)
+                current = []
+                current_tokens = 0
+            current.append(i)
+            current_tokens += tokens
+        if current:
+            batches.append(current)
+        return batches
+
+    async def run_batch(self, semaphore, texts):
+        """
+        배치 하나를 embed_documents로 보냅니다. 재시도할 수 있는 오류면 백오프 후 다시 시도합니다.
+        """
+        loop = asyncio.get_running_loop()
+        async with semaphore:
+            for attempt in range(self.max_retries + 1):
+                try:
+                    return await loop.run_in_executor(self.embedding.executor, self.embedding.get_text_embeddings_batch, texts)
+                except Exception as e:
+                    if attempt >= self.max_retries or not is_retryable_error(e):
+                        raise
+                    self.retries += 1
+                    delay = retry_after_seconds(e) or self.retry_base_delay * (2 ** attempt)
+                    await asyncio.sleep(delay + random.uniform(0, delay / 4))  # 동시에 재시도가 몰리지 않도록 약간 흔듦
+
+    async def embed(self, texts):
+        """
+        텍스트 리스트의 임베딩을 반환합니다. 실패한 배치의 텍스트는 None
+        :param texts: 청크 텍스트 리스트
+        :return: texts와 같은 순서의 float32 벡터 (또는 None) 리스트
+        """
+        start = time.perf_counter()
+        store = self.embedding.store
+        keys = [store.make_key(text) for text in texts]
+
+        # 디스크 캐시에 없는 고유한 텍스트만 요청
+        unique_keys = list(dict.fromkeys(keys))
+        found = {key: vector for key, vector in zip(unique_keys, await asyncio.to_thread(store.get_many, unique_keys))
+                 if vector is not None}
+        pending = dict()
+        for key, text in zip(keys, texts):
+            if key in found:
+                self.cache_hits += 1
+            elif key not in pending:
+                pending[key] = text
+        pending_keys = list(pending)
+        pending_texts = [pending[key] for key in pending_keys]
+        token_counts = [self.count_tokens(text) for text in pending_texts]
+
+        semaphore = asyncio.Semaphore(self.max_concurrent_batches)
+        batches = self.pack_batches(pending_texts, token_counts)
+
+        async def run(batch):
+            try:
+                vectors = await self.run_batch(semaphore, [pending_texts[i] for i in batch])
+            except Exception:
+                self.failed_batches += 1
+                raise
+            batch_keys = [pending_keys[i] for i in batch]
+            found.update(zip(batch_keys, vectors))
+            await asyncio.to_thread(store.put_many, batch_keys, vectors)
+            self.batches += 1
+            self.chunks += len(batch)
+            self.tokens += sum(token_counts[i] for i in batch)
+
+        results = await asyncio.gather(*(run(batch) for batch in batches), return_exceptions=True)
+        self.elapsed += time.perf_counter() - start
+        self.last_errors = [result for result in results if isinstance(result, Exception)]
+        return [found.get(key) for key in keys]
+
+    def stats(self):
+        return {
+            "chunks": self.chunks,
+            "tokens": self.tokens,
+            "batches": self.batches,
+            "failed_batches": self.failed_batches,
+            "retries": self.retries,
+            "cache_hits": self.cache_hits,
+            "seconds": round(self.elapsed, 2),
+            "chunks_per_sec": round(self.chunks / self.elapsed, 1) if self.elapsed else 0.0,
+            "tokens_per_sec": round(self.tokens / self.elapsed, 1) if self.elapsed else 0.0,
+        }
@@ -5,7 +5,8 @@ from .api_key import get_key
 import numpy as np
 import asyncio
 from concurrent.futures import ThreadPoolExecutor
-import hashlib
+from vdb_data.common_constants import EMBEDDING_CACHE_DIR
+from spot_store.embeddingStore import EmbeddingStore
 
 class EmbeddingModule():
     def __init__(self, model_name, version, max_workers=10) -> None:
@@ -14,7 +15,8 @@ class EmbeddingModule():
         self.instance = None
         self.get_embedding_instance() # 초기화 시 한 번만 인스턴스 생성
         self.executor = ThreadPoolExecutor(max_workers=max_workers)
-        self.embedding_cache = {}
+        # 모델 버전 + 텍스트 해시 기준 디스크 캐시 (크롤링을 다시 해도 같은 청크는 다시 임베딩하지 않음)
+        self.store = EmbeddingStore(EMBEDDING_CACHE_DIR, version)
         
 
     def get_embedding_instance(self):
@@ -27,7 +29,7 @@ class EmbeddingModule():
     
     def get_text_embedding_sync(self, text): 
         """
-        동기 임베딩 생성 함수
+        동기 임베딩 생성 함수 (디스크 캐시에 있으면 캐시 사용)
         """
         if self.instance is None:
             self.get_embedding_instance()
@@ -37,21 +39,21 @@ class EmbeddingModule():
         elif not isinstance(text, str):
             text = str(text)
 
-        embedded_result = self.instance.embed_query(text)
-        return np.array(embedded_result, dtype=np.float32)
+        key = self.store.make_key(text)
+        cached = self.store.get(key)
+        if cached is not None:
+            return cached
+
+        embedding = np.array(self.instance.embed_query(text), dtype=np.float32)
+        self.store.put_many([key], [embedding])
+        return embedding
     
     async def get_text_embedding_async(self, text):
         """
         비동기 임베딩 생성 함수
         """
-        text_hash = hashlib.md5(text.encode('utf-8')).hexdigest()
-        if text_hash in self.embedding_cache:
-            return self.embedding_cache[text_hash]
-        else:
-            loop = asyncio.get_event_loop()
-            embedding = await loop.run_in_executor(self.executor, self.get_text_embedding_sync, text)
-            self.embedding_cache[text_hash] = embedding
-            return embedding
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(self.executor, self.get_text_embedding_sync, text)
 
     async def get_text_embeddings_async(self, texts):
         """
@@ -1,7 +1,13 @@
-import pickle
 import numpy as np
 import faiss
 import os
+import time
+from spot_store.metadataStore import load_metadata, metadata_exists, columnar_metadata_path, write_columnar_metadata
+from .ann_index import (create_index, detect_index_type, extract_vectors, load_index_params, save_index_params,
+                        apply_search_params)
+from .segmentStore import open_manifest, segment_files, staged_path, publish_base
+from spot_store.entityIndex import EntityIndex, entity_index_path, ensure_direct_map
+from .dedup import dedup_keys_path, row_hashes, write_dedup_keys
 
 class FaissVectorStore:
     def __init__(self, index_file="spot_index.bin", metadata_file="spot_metadata.pkl"):
@@ -15,54 +21,127 @@ class FaissVectorStore:
         self.index = None
         self.metadata = list()
         self.dim = None  
+        self.index_type = None
+        self.index_params = dict()  # 인덱스 종류/파라미터/평가 결과 (<인덱스 이름>.params.json)
+        self.manifest = None  # 기본 세그먼트 + 추가 세그먼트 목록 (segmentStore 참고)
+        self.segments = list()  # 인덱스에 같이 읽어 들인 추가 세그먼트 이름 (save_index 때 기본 세그먼트로 합침)
+        self.entities = None  # 가게 단위 인덱스 (get_entities로 필요할 때 읽거나 만듦)
         self.load_index()
 
     def load_index(self):
         """
         저장된 인덱스와 메타데이터를 로드합니다. 파일이 없으면 새 인덱스를 생성합니다.
+        추가 세그먼트가 있으면 벡터와 메타데이터를 기본 세그먼트 뒤에 이어 붙입니다. (중단된 저장은 먼저 복구)
         """
-        if os.path.exists(self.index_file) and os.path.exists(self.metadata_file):
+        self.manifest = open_manifest(self.index_file, self.metadata_file)
+        self.segments = list()
+        self.entities = None
+        if os.path.exists(self.index_file) and metadata_exists(self.metadata_file):
             self.index = faiss.read_index(self.index_file)
             self.dim = self.index.d
-            with open(self.metadata_file, 'rb') as f:
-                self.metadata = pickle.load(f)
+            # 메타데이터를 추가/저장해야 하므로 딕셔너리 리스트로 읽음 (예전 pkl이면 컬럼 파일로 변환)
+            self.metadata = load_metadata(self.metadata_file, use_mmap=False)
+            self.index_type = detect_index_type(self.index)
+            self.index_params = load_index_params(self.index_file)
+            apply_search_params(self.index, self.index_params.get("params", {}))
+            for segment in self.manifest["segments"]:
+                segment_index_file, segment_metadata_file = segment_files(self.index_file, segment["name"])
+                self.index.add(extract_vectors(faiss.read_index(segment_index_file)))
+                self.metadata.extend(load_metadata(segment_metadata_file, use_mmap=False))
+                self.segments.append(segment["name"])
         else:
             self.index = None
             self.dim = None
+            self.index_type = None
+            self.index_params = dict()
+
+    @property
+    def last_id(self):
+        """
+        저장소에 기록된 마지막 data_id (last_id.json 대신 매니페스트 기준)
+        """
+        return self.manifest["last_id"] if self.manifest else 0
 
     def save_index(self):
         """
-        현재 인덱스와 메타데이터를 파일에 저장합니다.
+        현재 인덱스와 메타데이터를 기본 세그먼트로 저장합니다. (메타데이터는 컬럼 파일 spot_metadata.cols)
+        파일은 모두 .staged 이름으로 먼저 쓰고 로그에 기록한 뒤 교체하므로, 저장 도중 중단돼도
+        다음에 열 때 이전 상태나 새 상태 중 하나로 복구됩니다. 읽어 들였던 추가 세그먼트는 기본 세그먼트에 합쳐져 정리됩니다.
         """
+        staged_index_file = staged_path(self.index_file)
         if self.index is not None:
-            faiss.write_index(self.index, self.index_file)
-            
-        with open(self.metadata_file, 'wb') as f:
-            pickle.dump(self.metadata, f)
+            faiss.write_index(self.index, staged_index_file)
+            save_index_params(staged_index_file, {**self.index_params, "index_type": self.index_type,
+                                                  "ntotal": int(self.index.ntotal), "dim": self.dim})
+        write_columnar_metadata(staged_path(columnar_metadata_path(self.metadata_file)), self.metadata)
+        write_dedup_keys(staged_path(dedup_keys_path(self.index_file)), row_hashes(self.metadata))
+        if self.index is not None:
+            self.entities = EntityIndex.from_index(self.metadata, self.index)
+            self.entities.write(staged_path(entity_index_path(self.index_file)))
 
-    def add_to_index(self, vector_dict, metadata):
+        base = None
+        if self.index is not None:
+            base = {"index_type": self.index_type, "ntotal": int(self.index.ntotal), "dim": self.dim}
+        data_ids = [meta.get("data_id") for meta in self.metadata if isinstance(meta.get("data_id"), int)]
+        self.manifest = publish_base(self.index_file, self.metadata_file, self.manifest, base, self.segments,
+                                     max(data_ids, default=0))
+        self.segments = list()
+
+    def rebuild_index(self, index_type, params=None):
         """
-        벡터 딕셔너리와 메타데이터를 인덱스에 추가합니다.
-        :param vector_dict: 추가할 벡터 데이터가 포함된 딕셔너리
-        :param metadata: 벡터와 연관된 메타데이터
+        현재 인덱스의 벡터를 모두 꺼내서 다른 종류의 인덱스로 다시 만듭니다. (IVF/PQ는 이 벡터로 학습)
+        :param index_type: "Flat", "IVF-Flat", "IVF-PQ", "HNSW"
+        :param params: 인덱스 파라미터 (None 값은 자동)
+        :return: 새 인덱스를 만드는 데 쓴 벡터 (평가용)
         """
-        combined_vectors = []
-
-        for v in vector_dict.values():
-            combined_vectors.append(v.flatten())
+        if self.index is None or self.index.ntotal == 0:
+            raise ValueError("인덱스가 초기화되지 않았습니다.")
+        vectors = extract_vectors(self.index)
+        self.index, resolved = create_index(index_type, vectors, params)
+        self.entities = None
+        self.index_type = index_type
+        self.index_params = {"params": resolved, "trained_on": int(len(vectors)),
+                             "built_at": time.strftime("%Y-%m-%d %H:%M:%S")}
+        return vectors
 
-        combined_vector = np.vstack(combined_vectors)
+    def add_vectors(self, vectors, metadata_list):
+        """
+        여러 청크를 한 번에 추가합니다. 파일 저장은 하지 않으므로 다 추가한 뒤 save_index를 한 번 호출하세요.
+        :param vectors: (N, D) 벡터 배열 또는 벡터 리스트 (행 순서 = metadata_list 순서)
+        :param metadata_list: 벡터와 연관된 메타데이터 리스트
+        """
+        if len(vectors) == 0:
+            return
+        # 연속된 float32 행렬 하나로 만들어서 index.add를 한 번만 호출
+        if isinstance(vectors, np.ndarray):
+            matrix = np.ascontiguousarray(vectors, dtype=np.float32)
+        else:
+            matrix = np.vstack([np.asarray(v, dtype=np.float32).reshape(1, -1) for v in vectors])
+        if matrix.shape[0] != len(metadata_list):
+            raise ValueError(f"벡터 개수({matrix.shape[0]})와 메타데이터 개수({len(metadata_list)})가 일치하지 않습니다.")
 
         if self.index is None:
-            self.dim = combined_vector.shape[1]  # 벡터의 차원으로 설정
+            # 근사 인덱스는 학습용 벡터가 모여야 만들 수 있으므로 처음에는 Flat으로 쌓고 저장 단계에서 rebuild_index로 변환
+            self.dim = matrix.shape[1]  # 벡터의 차원으로 설정
             self.index = faiss.IndexFlatL2(self.dim)
+            self.index_type = "Flat"
 
         # 임베딩 차원 확인
-        if combined_vector.shape[1] != self.dim:
-            raise ValueError(f"입력 벡터의 차원({combined_vector.shape[1]})이 인덱스의 차원({self.dim})과 일치하지 않습니다.")
+        if matrix.shape[1] != self.dim:
+            raise ValueError(f"입력 벡터의 차원({matrix.shape[1]})이 인덱스의 차원({self.dim})과 일치하지 않습니다.")
 
-        self.index.add(combined_vector)
-        self.metadata.append(metadata)
+        self.index.add(matrix)
+        self.metadata.extend(metadata_list)
+        self.entities = None
+
+    def add_to_index(self, vector_dict, metadata):
+        """
+        벡터 딕셔너리와 메타데이터를 인덱스에 추가하고 바로 저장합니다. (여러 개를 넣을 때는 add_vectors 사용)
+        :param vector_dict: 추가할 벡터 데이터가 포함된 딕셔너리
+        :param metadata: 벡터와 연관된 메타데이터
+        """
+        combined_vector = np.vstack([v.flatten() for v in vector_dict.values()])
+        self.add_vectors(combined_vector, [metadata] * len(combined_vector))
         self.save_index()
 
     def search(self, query_vector, k=5):
@@ -79,4 +158,41 @@ class FaissVectorStore:
             if query_vector.shape[1] != self.dim:
                 raise ValueError(f"쿼리 벡터의 차원({query_vector.shape[1]})이 인덱스의 차원({self.dim})과 일치하지 않습니다.")
             
-            return self.index.search(query_vector, k)
\ No newline at end of file
+            return self.index.search(query_vector, k)
+
+    def get_entities(self):
+        """
+        가게 단위 인덱스를 반환합니다. 저장된 파일이 지금 인덱스(추가 세그먼트 포함)와 행 수가 같으면 읽고, 아니면 새로 만듭니다.
+        """
+        if self.entities is None and self.index is not None:
+            path = entity_index_path(self.index_file)
+            if os.path.exists(path):
+                entities = EntityIndex.read(path)
+                if entities.chunk_count == self.index.ntotal:
+                    self.entities = entities
+            if self.entities is None:
+                self.entities = EntityIndex.from_index(self.metadata, self.index)
+        return self.entities
+
+    def search_entities(self, query_vector, k=5, candidates=None):
+        """
+        서로 다른 가게 k개를 찾습니다. 중심 벡터로 후보 가게를 고른 뒤 후보 가게의 청크만 다시 거리 계산합니다.
+        :param candidates: 다시 계산할 후보 가게 수 (없으면 k * 4)
+        :return: (가게별 가장 가까운 청크의 거리 배열, 청크 행 번호 배열) 거리 오름차순
+        """
+        if self.index is None:
+            raise ValueError("인덱스가 초기화되지 않았습니다.")
+        entities = self.get_entities()
+        query_vector = np.asarray(query_vector, dtype=np.float32).reshape(1, -1)
+        rows = entities.entity_rows(entities.search(query_vector, candidates or k * 4))
+        if len(rows) == 0:
+            return np.zeros(0, dtype=np.float32), rows
+        ensure_direct_map(self.index)
+        vectors = self.index.reconstruct_batch(rows)
+        distances = ((vectors - query_vector) ** 2).sum(axis=1)
+
+        # 가게별로 가장 가까운 청크 하나만 남기고 거리순으로 k개
+        order = np.argsort(distances, kind="stable")
+        _, first = np.unique(entities.row_entities[rows[order]], return_index=True)
+        best = order[np.sort(first)][:k]
+        return distances[best], rows[best]
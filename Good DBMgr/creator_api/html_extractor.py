@@ -0,0 +1,96 @@
+import re
+import html as html_lib
+from bs4 import BeautifulSoup, SoupStrainer
+from .datas.naver_data import NaverData
+
+# 코드 설명 요약:
+# 네이버 모바일 블로그 HTML에서 가게 정보(이름/주소/대표 이미지/본문)를 추출합니다.
+# lxml이 설치되어 있으면 lxml 파서를, 없으면 파이썬 내장 html.parser를 씁니다.
+# 페이지 전체로 트리를 만들지 않고 필요한 컨테이너(지도 제목/주소, 본문)만 SoupStrainer로 남기고,
+# og:image는 <meta> 태그만 정규식으로 찾아 파싱하지 않습니다. 지도 클래스가 없는 글은 파싱 없이 건너뜁니다.
+# extract_naver_blog_full은 예전 방식(전체 파싱)으로, 벤치마크 비교용으로 남겨 둡니다.
+
+try:
+    import lxml  # noqa: F401
+    HTML_PARSER = "lxml"
+except ImportError:
+    HTML_PARSER = "html.parser"
+
+# (이름 태그, 이름 클래스, 주소 클래스) - 새 에디터 지도, 옛 에디터 지도 순서로 확인
+MAP_LAYOUTS = [
+    ("strong", "se-map-title", "se-map-address"),
+    ("div", "se_title", "se-address"),
+]
+CONTENT_CLASS = "se-main-container"
+
+NEEDED_CLASSES = [cls for _, name_cls, address_cls in MAP_LAYOUTS for cls in (name_cls, address_cls)] + [CONTENT_CLASS]
+
+META_TAG_PATTERN = re.compile(r"<meta\b[^>]*>", re.IGNORECASE)
+OG_IMAGE_PATTERN = re.compile(r"""property\s*=\s*["']og:image["']""", re.IGNORECASE)
+CONTENT_ATTR_PATTERN = re.compile(r"""\bcontent\s*=\s*(?:"([^"]*)"|'([^']*)')""", re.IGNORECASE)
+
+
+def find_og_image(html: str) -> str:
+    """
+    <meta property="og:image" content="..."> 의 content를 반환합니다. 없으면 빈 문자열
+    """
+    for meta in META_TAG_PATTERN.finditer(html):
+        tag = meta.group(0)
+        if not OG_IMAGE_PATTERN.search(tag):
+            continue
+        content = CONTENT_ATTR_PATTERN.search(tag)
+        if content:
+            return html_lib.unescape(content.group(1) if content.group(1) is not None else content.group(2))
+    return str()
+
+
+def extract_naver_blog(blog_url: str, html: str, parser: str = HTML_PARSER) -> NaverData | None:
+    """
+    필요한 컨테이너만 파싱해서 가게 정보를 추출합니다. (프로세스 풀에서 실행되므로 모듈 함수로 둠)
+    지도가 없어서 추출이 안되면 None 반환
+    """
+    # 지도 클래스 이름이 문서에 아예 없으면 파싱하지 않고 건너뜀
+    if not any(name_class in html for _, name_class, _ in MAP_LAYOUTS):
+        return None
+
+    soup = BeautifulSoup(html, parser, parse_only=SoupStrainer(class_=NEEDED_CLASSES))
+    return build_naver_data(soup, blog_url, lambda: find_og_image(html))
+
+
+def extract_naver_blog_full(blog_url: str, html: str, parser: str = "html.parser") -> NaverData | None:
+    """
+    페이지 전체를 파싱해서 가게 정보를 추출합니다. (예전 방식, 벤치마크 비교용)
+    """
+    soup = BeautifulSoup(html, parser)
+
+    def og_image():
+        tag = soup.find('meta', property='og:image')
+        return tag['content'] if tag and tag.get('content') else str()
+
+    return build_naver_data(soup, blog_url, og_image)
+
+
+def build_naver_data(soup, blog_url, get_image_url) -> NaverData | None:
+    """
+    파싱된 soup에서 NaverData를 만듭니다.
+    :param get_image_url: 대표 이미지 주소를 반환하는 함수 (지도가 있을 때만 호출)
+    """
+    # 네이버 블로그에 내장된 지도에서 이름 가져오기
+    # 이름이 있을 경우, 즉 지도가 있을 경우만 크롤링 진행
+    for name_tag, name_class, address_class in MAP_LAYOUTS:
+        name = soup.find(name_tag, class_=name_class)
+        if name:
+            break
+    else:
+        return None
+
+    # 네이버 블로그에 내장된 지도에서 주소 가져오기
+    address = soup.find('p', class_=address_class)
+    refined_address = address.text if address else str()
+
+    # class="se-main-container"를 가진 <div> 태그 찾기
+    div_container = soup.find('div', class_=CONTENT_CLASS)
+    refined_content = div_container.text.replace('\n', ' ') if div_container else str()
+
+    return NaverData(name=name.text, address=refined_address, content=refined_content,
+                     src=get_image_url(), link=blog_url)
@@ -1,106 +1,228 @@
-import requests
+import json
+import time
+import random
+import asyncio
+import aiohttp
 from urllib import parse
-from typing import List
-from bs4 import BeautifulSoup
+from typing import List, Tuple
+from concurrent.futures import ProcessPoolExecutor
 from .datas.naver_data import NaverData
+from .html_extractor import extract_naver_blog
+from .datas.constants import (CRAWL_MAX_CONCURRENCY, CRAWL_PER_HOST_LIMIT, CRAWL_PER_HOST_INTERVAL, CRAWL_TIMEOUT,
+                              CRAWL_MAX_RETRIES, CRAWL_RETRY_BASE_DELAY, CRAWL_PARSE_WORKERS,
+                              NAVER_SEARCH_MAX_DISPLAY, NAVER_SEARCH_MAX_START)
 from .api_key import get_key
 from urllib.parse import urlparse, urlunparse
 
+# 코드 설명 요약:
+# 네이버 블로그 검색 API로 글 목록을 받고, 각 글의 모바일 페이지를 aiohttp로 동시에 받아옵니다.
+# 세션 하나로 커넥션을 재사용하고, 전체 동시 요청 수/호스트별 커넥션 수와 요청 간격을 제한합니다.
+# 요청 한도(429)/서버 오류/연결 오류는 지수 백오프로 다시 시도하고,
+# 받은 HTML은 이벤트 루프를 막지 않도록 프로세스 풀에서 파싱합니다. (추출은 html_extractor 참고)
+# iter_naver_blog_pages는 검색 결과를 start 오프셋으로 넘겨 가며 페이지(100개)마다 결과를 바로 내보냅니다.
+
+
+class RetryableStatus(Exception):
+    def __init__(self, status, retry_after=None):
+        super().__init__(f"HTTP {status}")
+        self.status = status
+        self.retry_after = retry_after
+
+
 class NaverService():
-    def __init__(self) -> None:
+    def __init__(self, max_concurrency=CRAWL_MAX_CONCURRENCY, per_host_limit=CRAWL_PER_HOST_LIMIT,
+                 per_host_interval=CRAWL_PER_HOST_INTERVAL, timeout=CRAWL_TIMEOUT, max_retries=CRAWL_MAX_RETRIES,
+                 retry_base_delay=CRAWL_RETRY_BASE_DELAY, parse_workers=CRAWL_PARSE_WORKERS) -> None:
+        """
+        :param max_concurrency: 동시에 진행하는 최대 요청 수
+        :param per_host_limit: 호스트 하나에 동시에 여는 최대 커넥션 수
+        :param per_host_interval: 같은 호스트에 요청을 보내는 최소 간격 (초)
+        :param timeout: 요청당 타임아웃 (초)
+        :param max_retries: 요청당 최대 재시도 횟수
+        :param retry_base_delay: 첫 재시도 대기 시간 (초), 재시도마다 두 배
+        :param parse_workers: HTML 파싱 프로세스 수
+        """
         self.naver_key = get_key("NAVER_CLIENT_ID")
         self.naver_secret = get_key("NAVER_CLIENT_SECRET")
-
-    def crawling_naver_blog_data(self,
-            query: str = "검색할 가게명", region :str = "검색할 지명", 
-            display: int = 10) :
+        self.max_concurrency = max_concurrency
+        self.per_host_limit = per_host_limit
+        self.per_host_interval = per_host_interval
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+        self.max_retries = max_retries
+        self.retry_base_delay = retry_base_delay
+        self.parse_workers = parse_workers
+        self.parse_pool = None  # 처음 파싱할 때 생성
+        self.host_locks = dict()  # 호스트 -> 요청 간격 유지용 잠금
+        self.host_last_request = dict()  # 호스트 -> 마지막 요청 시각
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.pages = 0
+        self.failed_pages = 0
+        self.retries = 0
+        self.elapsed = 0.0
+
+    def get_parse_pool(self):
+        if self.parse_pool is None:
+            self.parse_pool = ProcessPoolExecutor(max_workers=self.parse_workers)
+        return self.parse_pool
+
+    def close(self):
+        if self.parse_pool is not None:
+            self.parse_pool.shutdown(wait=False, cancel_futures=True)
+            self.parse_pool = None
+
+    def create_session(self):
+        connector = aiohttp.TCPConnector(limit=self.max_concurrency, limit_per_host=self.per_host_limit)
+        return aiohttp.ClientSession(connector=connector, timeout=self.timeout)
+
+    async def crawling_naver_blog_data(self,
+            query: str = "검색할 가게명", region :str = "검색할 지명",
+            display: int = 10) -> List[NaverData]:
         """
         네이버 블로그 데이터 최대한 많이 (최대100개) 가져오기
         display : 한 구글 지역에 매칭될 수량 10~100
         """
-        try:
-            # 지역과 검색어를 결합하여 검색
-            combined_query = f"{region} {query}"
-            enc_text = parse.quote(combined_query)
-            base_url = "https://openapi.naver.com/v1/search/blog.json"
-
-            headers = {
-                "X-Naver-Client-Id": self.naver_key,
-                "X-Naver-Client-Secret": self.naver_secret
-            }
-
-            start = 1
-            sort = "sim"
-
-            url = f"{base_url}?query={enc_text}&display={display}&start={start}&sort={sort}"
-
-            # 네이버 블로그 API 호출
-            response = requests.get(url, headers=headers)
-            response.raise_for_status()
-            items = response.json().get("items", [])
-            blogs = list()
-            for item in items:
-                link = item.get('link')
-                blog=self.bs_crawling(blog_url=link)
-
-                if blog is not None:
-                    blogs.append(blog)
-            
-            return blogs
-
-        except requests.exceptions.RequestException as e:
-            print(f"Naver API 요청 실패: {str(e)}")
-            return "네이버 블로그 설명 오류"
-        
-    def bs_crawling(self, blog_url : str) -> NaverData | None:
-        """
-        추출이 안되면 None 반환
+        start_time = time.perf_counter()
+        async with self.create_session() as session:
+            try:
+                items = await self.search_blog_items(session, query, region, display)
+            except (aiohttp.ClientError, asyncio.TimeoutError, RetryableStatus) as e:
+                print(f"Naver API 요청 실패: {str(e)}")
+                return []
+
+            links = [item.get('link') for item in items if item.get('link')]
+            blogs, _ = await self.crawl_links(session, links)
+
+        self.elapsed += time.perf_counter() - start_time
+        return blogs
+
+    async def iter_naver_blog_pages(self, query: str, region: str, seen_urls=None,
+                                    page_size: int = NAVER_SEARCH_MAX_DISPLAY, max_start: int = NAVER_SEARCH_MAX_START):
+        """
+        검색 결과를 start 오프셋으로 넘겨 가며 페이지마다 (크롤링 결과, 새 링크 리스트, 받기/파싱에 성공한 링크 리스트)를
+        내보냅니다. 같은 실행 안에서 겹치는 링크와 seen_urls에 저장된 링크는 건너뜁니다.
+        (재시도 후에도 받지 못한 링크는 성공 리스트에 없으므로 seen_urls에 기록하지 않으면 다음 실행에서 다시 받음)
+        :param seen_urls: 이전 실행에서 크롤링한 링크 집합 (SeenUrlStore, 없으면 이번 실행 안에서만 중복 제거)
+        :param page_size: 검색 API 한 번에 받을 결과 수 (최대 100)
+        :param max_start: 검색 API start 최대값 (최대 1000)
+        """
+        visited = set()
+        async with self.create_session() as session:
+            for start in range(1, max_start + 1, page_size):
+                page_start_time = time.perf_counter()
+                try:
+                    items = await self.search_blog_items(session, query, region, page_size, start=start)
+                except (aiohttp.ClientError, asyncio.TimeoutError, RetryableStatus) as e:
+                    print(f"Naver API 요청 실패 (start={start}): {str(e)}")
+                    break
+
+                links = list(dict.fromkeys(item.get('link') for item in items if item.get('link')))
+                links = [link for link in links if link not in visited]
+                visited.update(links)
+                if seen_urls is not None:
+                    links = await asyncio.to_thread(seen_urls.filter_new, links)
+
+                blogs, fetched = await self.crawl_links(session, links)
+                self.elapsed += time.perf_counter() - page_start_time
+                yield blogs, links, fetched
+
+                # 결과가 페이지 크기보다 적으면 마지막 페이지
+                if len(items) < page_size:
+                    break
+
+    async def crawl_links(self, session, links) -> Tuple[List[NaverData], List[str]]:
+        """
+        블로그 링크들을 동시에 받아서 파싱합니다. 가게 정보가 없는 글은 빠집니다.
+        :return: (가게 정보 리스트, 받기/파싱에 성공한 링크 리스트 - 가게 정보가 없는 글 포함)
+        """
+        outcomes = await asyncio.gather(*(self.crawl_blog(session, link) for link in links))
+        blogs = [blog for _, blog in outcomes if blog is not None]
+        fetched_links = [link for link, (fetched, _) in zip(links, outcomes) if fetched]
+        return blogs, fetched_links
+
+    async def search_blog_items(self, session, query, region, display, start=1, sort="sim"):
+        """
+        네이버 블로그 검색 API 결과(items)를 반환합니다.
+        """
+        # 지역과 검색어를 결합하여 검색
+        combined_query = f"{region} {query}"
+        enc_text = parse.quote(combined_query)
+        base_url = "https://openapi.naver.com/v1/search/blog.json"
+
+        headers = {
+            "X-Naver-Client-Id": self.naver_key,
+            "X-Naver-Client-Secret": self.naver_secret
+        }
+
+        url = f"{base_url}?query={enc_text}&display={display}&start={start}&sort={sort}"
+
+        # 네이버 블로그 API 호출
+        body = await self.fetch(session, url, headers=headers)
+        return json.loads(body).get("items", [])
+
+    async def crawl_blog(self, session, blog_url: str) -> Tuple[bool, NaverData | None]:
+        """
+        블로그 글 하나를 받아서 파싱합니다.
+        :return: (받기/파싱 성공 여부, 가게 정보 - 실패했거나 가게 정보가 없으면 None)
         """
         # 모바일 버전으로 변환
         mobile_url = self.add_mobile_prefix(blog_url)
-
-        # url로 request를 보내서 response를 받아온다
-        response = requests.get(mobile_url)
-        # python의 내부 html.parser로 html 전문을 파싱해서 가져온다.
-        soup = BeautifulSoup(response.text, 'html.parser')
-            
-        # 네이버 블로그에 내장된 지도에서 이름 가져오기
-        name = soup.find('strong', class_='se-map-title')
-        name2 = soup.find('div', class_='se_title')
-
-        # 이름이 있을 경우, 즉 지도가 있을 경우만 크롤링 진행
-        if name:
-            return self.get_naver_data(name, 'se-map-address', blog_url, soup)
-        elif name2:
-            return self.get_naver_data(name2, 'se-address', blog_url, soup)
-        else:
-            return None
-
-    def get_naver_data(self, name, address_class, blog_url, soup):
-        refined_name = str()
-        refined_name = name.text
-
-        # 네이버 블로그에 내장된 지도에서 주소 가져오기
-        address = soup.find('p', class_=address_class)
-        refined_address = str()
-        if address:
-            refined_address = address.text
-
-        # 네이버 블로그에 내장된 대표 이미지 찾기
-        og_image = soup.find('meta', property='og:image')
-        if og_image and og_image.get('content'):
-            image_url = og_image['content']
-
-        # class="se-main-container"를 가진 <div> 태그 찾기
-        div_container = soup.find('div', class_='se-main-container')
-        refined_content = str()
-        if div_container:   
-            refined_content = div_container.text.replace('\n', ' ')
-
-        data = NaverData(name=refined_name, address=refined_address, content=refined_content, src= image_url, link=blog_url)
-        return data
-
-    def add_mobile_prefix(self, url):
+        try:
+            html = await self.fetch(session, mobile_url)
+            self.pages += 1
+            loop = asyncio.get_running_loop()
+            return True, await loop.run_in_executor(self.get_parse_pool(), extract_naver_blog, blog_url, html)
+        except Exception as e:
+            self.failed_pages += 1
+            print(f"블로그 크롤링 실패: {blog_url} ({str(e)})")
+            return False, None
+
+    async def wait_for_host(self, url):
+        """
+        같은 호스트에 연속으로 보내는 요청 사이에 최소 간격을 둡니다.
+        """
+        host = urlparse(url).netloc
+        lock = self.host_locks.setdefault(host, asyncio.Lock())
+        async with lock:
+            wait = self.host_last_request.get(host, 0.0) + self.per_host_interval - time.monotonic()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            self.host_last_request[host] = time.monotonic()
+
+    async def fetch(self, session, url, headers=None) -> str:
+        """
+        GET 요청의 본문을 반환합니다. 요청 한도(429)/서버 오류/연결 오류는 백오프 후 다시 시도합니다.
+        """
+        for attempt in range(self.max_retries + 1):
+            await self.wait_for_host(url)
+            try:
+                async with session.get(url, headers=headers) as response:
+                    if response.status == 429 or response.status >= 500:
+                        raise RetryableStatus(response.status, response.headers.get("Retry-After"))
+                    response.raise_for_status()
+                    return await response.text(errors="replace")
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError, RetryableStatus) as e:
+                if attempt >= self.max_retries:
+                    raise
+                self.retries += 1
+                try:
+                    delay = float(getattr(e, "retry_after", None))
+                except (TypeError, ValueError):
+                    delay = self.retry_base_delay * (2 ** attempt)
+                await asyncio.sleep(delay + random.uniform(0, delay / 4))  # 동시에 재시도가 몰리지 않도록 약간 흔듦
+
+    def stats(self):
+        return {
+            "pages": self.pages,
+            "failed_pages": self.failed_pages,
+            "retries": self.retries,
+            "seconds": round(self.elapsed, 2),
+            "pages_per_sec": round(self.pages / self.elapsed, 1) if self.elapsed else 0.0,
+        }
+
+    @staticmethod
+    def add_mobile_prefix(url):
         """
         모바일 주소로 변환해서 진행함
         """
@@ -109,9 +231,5 @@ class NaverService():
         if parsed.netloc == 'blog.naver.com':
             new_netloc = 'm.' + parsed.netloc
             return urlunparse(parsed._replace(netloc=new_netloc))
-        
-        return url
-
 
-    
-    
\ No newline at end of file
+        return url
@@ -1,3 +1,4 @@
+import asyncio
 import tkinter as tk
 from tkinter import ttk
 from .datas.constants import (EMBEDDING_MODEL_TYPES, EMBEDDING_MODEL_VERSIONS,
@@ -5,7 +6,7 @@ from .datas.constants import (EMBEDDING_MODEL_TYPES, EMBEDDING_MODEL_VERSIONS,
 from langchain.schema import Document
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from .embeddings import EmbeddingModule
-import asyncio
+from .embedding_scheduler import EmbeddingScheduler
 
 class PreprocessingModule:
     def __init__(self, parent, status_module, config=None):
@@ -110,27 +111,78 @@ class PreprocessingModule:
         self.status_module.update_status("전처리 완료")
         return processed_results
 
+    async def start_preprocessing_stream(self, crawling_pages):
+        """
+        크롤링 결과가 페이지 단위로 들어오는 대로 전처리합니다.
+        다음 페이지를 크롤링하는 동안 이전 페이지를 임베딩합니다. (임베딩은 한 번에 한 페이지씩)
+        :param crawling_pages: NaverData 리스트를 내보내는 비동기 이터레이터
+        """
+        embedding_type = self.embedding_model_type.get()
+        embedding_version = self.embedding_model_version.get()
+        chunk_size = int(self.chunk_size.get())
+        overlap = int(self.overlap.get())
+
+        self.status_module.update_status("전처리 시작 (페이지 단위)")
+
+        self.embedding = EmbeddingModule(model_name=embedding_type, version=embedding_version)
+
+        processed_results = []
+        task = None
+        try:
+            async for naver_data_list in crawling_pages:
+                if task is not None:
+                    processed_results.extend(await task)
+                task = asyncio.ensure_future(self.process_naver_data_list(naver_data_list, chunk_size, overlap))
+            if task is not None:
+                processed_results.extend(await task)
+                task = None
+        finally:
+            if task is not None:
+                task.cancel()
+
+        self.status_module.update_status(f"전처리 완료: {len(processed_results)}개")
+        return processed_results
+
     async def process_naver_data_list(self, naver_data_list, chunk_size, overlap):
-        tasks = []
+        # 모든 블로그를 청킹한 뒤 청크를 한 줄로 모아서 배치 임베딩
+        targets = []
+        all_chunks = []
         for naver_data in naver_data_list:
             if naver_data.content is not None:
                 naver_data.content = self.do_chucking(naver_data.content, chunk_size, overlap)
-                tasks.append(self.process_single_naver_data(naver_data))
+                targets.append(naver_data)
+                all_chunks.extend(naver_data.content)
             else:
                 self.status_module.update_status(f"경고: Naver 데이터 '{naver_data.name}'의 내용이 없습니다.")
-        
-        processed_results = await asyncio.gather(*tasks, return_exceptions=True)
-        
-        return [result for result in processed_results if not isinstance(result, Exception)]
-    
-    async def process_single_naver_data(self, naver_data):
-        try:
-            naver_data.vectorized_content = await self.embedding.get_text_embeddings_async(naver_data.content)
-            self.status_module.update_status(f"Naver 데이터 처리 완료: {naver_data.name}")
-            return naver_data
-        except Exception as e:
-            self.status_module.update_status(f"경고: Naver 데이터 '{naver_data.name}' 처리 중 오류 발생: {e}")
-            return e
+
+        scheduler = EmbeddingScheduler(self.embedding)
+        self.status_module.update_status(f"임베딩 시작: 블로그 {len(targets)}개, 청크 {len(all_chunks)}개")
+        vectors = await scheduler.embed(all_chunks)
+        for error in scheduler.last_errors:
+            self.status_module.update_status(f"경고: 임베딩 배치 처리 중 오류 발생: {error}")
+
+        # 청크 벡터를 원래 블로그에 나눠 담음 (벡터가 하나라도 빠진 블로그는 제외)
+        processed_results = []
+        position = 0
+        for naver_data in targets:
+            chunk_vectors = vectors[position:position + len(naver_data.content)]
+            position += len(naver_data.content)
+            if any(vector is None for vector in chunk_vectors):
+                self.status_module.update_status(f"경고: Naver 데이터 '{naver_data.name}' 처리 중 오류 발생: 임베딩 실패")
+                continue
+            naver_data.vectorized_content = chunk_vectors
+            processed_results.append(naver_data)
+
+        stats = scheduler.stats()
+        self.status_module.update_status(
+            f"임베딩 완료: {stats['chunks']}개 청크 / {stats['batches']}개 배치 / {stats['seconds']}초 "
+            f"({stats['chunks_per_sec']} 청크/s, {stats['tokens_per_sec']} 토큰/s, "
+            f"재시도 {stats['retries']}회, 캐시 {stats['cache_hits']}개)")
+        store_stats = self.embedding.store.stats()
+        self.status_module.update_status(
+            f"임베딩 캐시: {store_stats['entries']}개 / {store_stats['bytes'] / (1024 * 1024):.1f}MB "
+            f"(적중률 {store_stats['hit_ratio']:.0%}, 제거 {store_stats['evictions']}개)")
+        return processed_results
         
     def do_chucking(self, data, size, overlap) -> list:
         text_splitter = RecursiveCharacterTextSplitter(chunk_size=int(size), chunk_overlap=int(overlap))
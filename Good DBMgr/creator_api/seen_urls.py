@@ -0,0 +1,51 @@
+import time
+import sqlite3
+import threading
+
+# 코드 설명 요약:
+# 이전 실행에서 이미 크롤링한 블로그 링크를 SQLite에 저장해 두는 집합입니다.
+# 페이지 수집 모드에서 이미 본 링크는 다시 받지 않습니다.
+
+
+class SeenUrlStore:
+    def __init__(self, path):
+        """
+        :param path: SQLite 파일 경로
+        """
+        self.path = path
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(self.path, check_same_thread=False)
+        with self.lock:
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS seen_urls (url TEXT PRIMARY KEY, seen_at REAL NOT NULL)"
+            )
+            self.connection.commit()
+
+    def filter_new(self, urls):
+        """
+        :param urls: 링크 리스트
+        :return: 저장된 적 없는 링크만 (순서 유지)
+        """
+        urls = list(urls)
+        seen = set()
+        with self.lock:
+            for start in range(0, len(urls), 500):  # SQLite 변수 개수 제한
+                part = urls[start:start + 500]
+                seen.update(url for url, in self.connection.execute(
+                    f"SELECT url FROM seen_urls WHERE url IN ({','.join('?' * len(part))})", part))
+        return [url for url in urls if url not in seen]
+
+    def add_many(self, urls):
+        now = time.time()
+        with self.lock:
+            self.connection.executemany("INSERT OR IGNORE INTO seen_urls (url, seen_at) VALUES (?, ?)",
+                                        [(url, now) for url in urls])
+            self.connection.commit()
+
+    def count(self):
+        with self.lock:
+            return self.connection.execute("SELECT COUNT(*) FROM seen_urls").fetchone()[0]
+
+    def close(self):
+        with self.lock:
+            self.connection.close()
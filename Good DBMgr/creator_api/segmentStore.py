@@ -0,0 +1,218 @@
+import os
+import json
+import time
+import logging
+import numpy as np
+import faiss
+from spot_store.metadataStore import (load_metadata, metadata_exists, columnar_metadata_path,
+                                      write_columnar_metadata, data_id_column)
+from .ann_index import detect_index_type, index_params_path
+from spot_store.entityIndex import entity_index_path
+from .dedup import dedup_keys_path, row_hashes, write_dedup_keys
+from spot_store.segmentStore import manifest_path, wal_path, segments_dir, segment_files, read_manifest, read_wal
+
+# 코드 설명 요약:
+# 벡터 저장소를 기본 세그먼트(spot_index.bin + spot_metadata.cols) + 추가 세그먼트로 나눠서 관리합니다.
+# 크롤링 한 번의 결과는 새 벡터만 담은 추가 세그먼트(<인덱스 이름>.segments/000001.bin/.cols, Flat)로 씁니다.
+# 어떤 세그먼트가 유효한지와 마지막 data_id는 매니페스트(<인덱스 이름>.manifest.json) 하나에 기록합니다.
+# 파일을 바꾸기 전에 할 일을 로그(<인덱스 이름>.wal.jsonl)에 먼저 남기고, 중간에 중단되면
+# 다음에 열 때 로그를 재생해서 끝까지 진행하거나(커밋된 작업) 되돌립니다(커밋 전 작업).
+# 세그먼트를 기본 인덱스로 합칠 때(compaction)는 새 기본 파일을 임시 이름(.staged)으로 다 쓴 뒤 교체합니다.
+# 파일 이름과 매니페스트/로그 읽기는 웹 앱과 같이 쓰는 spot_store/segmentStore.py에 있고, 웹 앱은 매니페스트만 읽어서 세그먼트를 엽니다.
+
+MANIFEST_VERSION = 1
+STAGED_SUFFIX = ".staged"
+
+
+def staged_path(path):
+    """
+    spot_index.bin -> spot_index.staged.bin
+    """
+    stem, ext = os.path.splitext(path)
+    return f"{stem}{STAGED_SUFFIX}{ext}"
+
+
+def staged_base_files(index_file, metadata_file):
+    """
+    기본 세그먼트를 이루는 파일 (인덱스, 인덱스 파라미터, 컬럼 메타데이터, 가게 인덱스, 중복 검사 키)의
+    (.staged 경로, 실제 경로) 리스트
+    """
+    staged_index_file = staged_path(index_file)
+    metadata_path = columnar_metadata_path(metadata_file)
+    return [(staged_index_file, index_file),
+            (index_params_path(staged_index_file), index_params_path(index_file)),
+            (staged_path(metadata_path), metadata_path),
+            (staged_path(entity_index_path(index_file)), entity_index_path(index_file)),
+            (staged_path(dedup_keys_path(index_file)), dedup_keys_path(index_file))]
+
+
+def _write_json(path, data):
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def write_manifest(index_file, manifest):
+    _write_json(manifest_path(index_file), manifest)
+
+
+def append_wal(index_file, record):
+    """
+    로그에 기록 한 줄을 추가하고 디스크에 내려갈 때까지 기다립니다.
+    """
+    with open(wal_path(index_file), 'a', encoding='utf-8') as f:
+        f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def clear_wal(index_file):
+    path = wal_path(index_file)
+    if os.path.exists(path):
+        os.remove(path)
+
+
+def _remove_files(paths):
+    for path in paths:
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def _remove_segment(index_file, name):
+    segment_index_file, segment_metadata_file = segment_files(index_file, name)
+    _remove_files([segment_index_file, segment_metadata_file, dedup_keys_path(segment_index_file)])
+
+
+def _max_data_id(metadata):
+    data_ids = data_id_column(metadata)
+    return int(data_ids.max()) if len(data_ids) else 0
+
+
+def bootstrap_manifest(index_file, metadata_file):
+    """
+    매니페스트가 없을 때 (처음 저장하거나 세그먼트 이전에 만든 저장소) 기본 파일만으로 매니페스트를 만듭니다.
+    """
+    manifest = {"version": MANIFEST_VERSION, "generation": 0, "base": None, "segments": [], "next_segment": 1,
+                "last_id": 0}
+    if os.path.exists(index_file) and metadata_exists(metadata_file):
+        try:
+            index = faiss.read_index(index_file, faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY)
+        except RuntimeError:
+            index = faiss.read_index(index_file)
+        metadata = load_metadata(metadata_file)
+        manifest["base"] = {"index_type": detect_index_type(index), "ntotal": int(index.ntotal), "dim": int(index.d)}
+        manifest["last_id"] = _max_data_id(metadata)
+        if hasattr(metadata, "close"):
+            metadata.close()
+    return manifest
+
+
+def _replay(index_file, manifest, records):
+    """
+    로그 기록을 순서대로 매니페스트에 반영합니다.
+    - segment_begin 뒤에 segment_commit이 없으면 반쯤 쓴 세그먼트 파일을 지움
+    - segment_commit이 있는데 매니페스트에 없으면 세그먼트를 추가
+    - base_commit이 매니페스트보다 새 세대면 남은 .staged 파일을 교체하고 합쳐진 세그먼트를 정리
+    """
+    committed = {record["segment"] for record in records if record["op"] == "segment_commit"}
+    listed = {segment["name"] for segment in manifest["segments"]}
+    for record in records:
+        if record["op"] == "segment_begin":
+            segment = record["segment"]
+            if segment["name"] not in committed:
+                _remove_segment(index_file, segment["name"])
+                logging.warning(f"커밋되지 않은 세그먼트를 되돌렸습니다: {segment['name']}")
+            elif segment["name"] not in listed and all(map(os.path.exists, segment_files(index_file, segment["name"]))):
+                manifest["segments"].append(segment)
+                listed.add(segment["name"])
+                manifest["last_id"] = max(manifest["last_id"], segment["last_id"])
+                logging.info(f"로그에서 세그먼트를 복구했습니다: {segment['name']}")
+            manifest["next_segment"] = max(manifest["next_segment"], int(segment["name"]) + 1)
+        elif record["op"] == "base_commit":
+            if record["generation"] > manifest["generation"]:
+                for staged, final in record["staged"]:
+                    if os.path.exists(staged):
+                        os.replace(staged, final)
+                manifest["base"] = record["base"]
+                manifest["generation"] = record["generation"]
+                manifest["segments"] = [segment for segment in manifest["segments"]
+                                        if segment["name"] not in record["folded"]]
+                manifest["last_id"] = max(manifest["last_id"], record["last_id"])
+                logging.info(f"기본 세그먼트를 교체했습니다: 세대 {record['generation']}")
+            for name in record["folded"]:
+                _remove_segment(index_file, name)
+    return manifest
+
+
+def open_manifest(index_file, metadata_file):
+    """
+    매니페스트를 읽고, 로그가 남아 있으면 (이전 저장이 중단됨) 재생해서 복구한 뒤 로그를 비웁니다.
+    """
+    manifest = read_manifest(index_file) or bootstrap_manifest(index_file, metadata_file)
+    records = read_wal(index_file)
+    if records:
+        manifest = _replay(index_file, manifest, records)
+        write_manifest(index_file, manifest)
+        clear_wal(index_file)
+    # base_commit 기록 전에 중단돼서 남은 .staged 파일 정리
+    _remove_files(staged for staged, _ in staged_base_files(index_file, metadata_file))
+    return manifest
+
+
+def append_segment(index_file, manifest, vectors, metadata_list):
+    """
+    새 벡터만 추가 세그먼트 하나로 씁니다. 기존 인덱스/메타데이터는 읽지도 다시 쓰지도 않습니다.
+    :param manifest: open_manifest로 연 매니페스트 (기본 세그먼트가 있어야 함)
+    :param vectors: (N, D) 벡터 배열 또는 벡터 리스트 (행 순서 = metadata_list 순서)
+    :param metadata_list: 벡터와 연관된 메타데이터 리스트
+    :return: 세그먼트가 추가된 매니페스트
+    """
+    matrix = np.vstack([np.asarray(v, dtype=np.float32).reshape(1, -1) for v in vectors])
+    if matrix.shape[0] != len(metadata_list):
+        raise ValueError(f"벡터 개수({matrix.shape[0]})와 메타데이터 개수({len(metadata_list)})가 일치하지 않습니다.")
+    if matrix.shape[1] != manifest["base"]["dim"]:
+        raise ValueError(f"입력 벡터의 차원({matrix.shape[1]})이 인덱스의 차원({manifest['base']['dim']})과 일치하지 않습니다.")
+
+    segment = {
+        "name": f"{manifest['next_segment']:06d}",
+        "ntotal": int(matrix.shape[0]),
+        "last_id": max(manifest["last_id"], _max_data_id(metadata_list)),
+        "created_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+    }
+    segment_index_file, segment_metadata_file = segment_files(index_file, segment["name"])
+    os.makedirs(segments_dir(index_file), exist_ok=True)
+
+    append_wal(index_file, {"op": "segment_begin", "segment": segment})
+    index = faiss.IndexFlatL2(matrix.shape[1])
+    index.add(matrix)
+    faiss.write_index(index, segment_index_file)
+    write_columnar_metadata(segment_metadata_file, metadata_list)
+    write_dedup_keys(dedup_keys_path(segment_index_file), row_hashes(metadata_list))
+    append_wal(index_file, {"op": "segment_commit", "segment": segment["name"]})
+
+    manifest = {**manifest, "segments": manifest["segments"] + [segment], "next_segment": manifest["next_segment"] + 1,
+                "last_id": segment["last_id"]}
+    write_manifest(index_file, manifest)
+    clear_wal(index_file)
+    return manifest
+
+
+def publish_base(index_file, metadata_file, manifest, base, folded, last_id):
+    """
+    .staged 이름으로 다 써 둔 새 기본 세그먼트 파일로 교체하고, 그 안에 합쳐진 추가 세그먼트를 정리합니다.
+    :param base: 새 기본 세그먼트 정보 (index_type, ntotal, dim)
+    :param folded: 새 기본 세그먼트에 합쳐진 추가 세그먼트 이름 리스트
+    :param last_id: 새 기본 세그먼트의 마지막 data_id
+    :return: 새 매니페스트
+    """
+    staged = [[staged, final] for staged, final in staged_base_files(index_file, metadata_file) if os.path.exists(staged)]
+    record = {"op": "base_commit", "generation": manifest["generation"] + 1, "base": base, "staged": staged,
+              "folded": list(folded), "last_id": max(manifest["last_id"], last_id)}
+    append_wal(index_file, record)
+    manifest = _replay(index_file, {**manifest, "segments": list(manifest["segments"])}, [record])
+    write_manifest(index_file, manifest)
+    clear_wal(index_file)
+    return manifest
@@ -7,7 +7,7 @@ from creator_api.preprocessing import PreprocessingModule
 from creator_api.vdb_save import VdbSaveModule
 from configuration import load_module_config, save_module_config
 from .status_module import StatusModule
-from .datas.constants import TEST_MODE, GATHER_MODE
+from .datas.constants import TEST_MODE, GATHER_MODE, PAGINATED_MODE
 from .logger import LoggingModule
 
 class VdbCreatorModule:
@@ -122,16 +122,22 @@ class VdbCreatorModule:
             region = self.crawling_module.region_entry.get()
             mode = self.crawling_module.crawling_mode.get()
 
-            if len(keyword) > 1 and len(region) > 1:
+            if len(keyword) < 2 or len(region) < 2:
+                raise Exception("검색어 또는 지역이 누락되었습니다.")
+
+            if mode == PAGINATED_MODE:
+                # 페이지 수집 모드: 크롤링 결과를 페이지마다 바로 전처리로 넘김
+                self.crawling_results = None
+                processed_results = await self.preprocessing_module.start_preprocessing_stream(
+                    self.crawling_module.stream_crawling(keyword, region))
+            else:
                 self.crawling_results = await self.crawling_module.start_crawling(keyword, region, mode)
                 if not self.crawling_results:
                     raise Exception("크롤링 결과가 없습니다.")
-            else:
-                raise Exception("검색어 또는 지역이 누락되었습니다.")
 
-            # 전처리 시작
-            self.status_module.update_status("데이터 전처리 시작...")
-            processed_results = await self.preprocessing_module.start_preprocessing(self.crawling_results)
+                # 전처리 시작
+                self.status_module.update_status("데이터 전처리 시작...")
+                processed_results = await self.preprocessing_module.start_preprocessing(self.crawling_results)
             if not processed_results:
                 raise Exception("전처리 결과가 없습니다.")
 
@@ -141,6 +147,8 @@ class VdbCreatorModule:
             success = await self.vdb_save_module.save_to_vdb()
             if not success:
                 raise Exception("VDB 저장에 실패했습니다.")
+            if mode == PAGINATED_MODE:
+                self.crawling_module.commit_seen_urls([data.link for data in processed_results])
 
             # 로깅
             chunk_size = self.preprocessing_module.chunk_size.get()
@@ -171,6 +179,8 @@ class VdbCreatorModule:
         })
         save_module_config('vdb_creator', self.window_config)
         self.loop.call_soon_threadsafe(self.loop.stop)  # 안전하게 이벤트 루프 중지
+        self.crawling_module.crawling_tool.close()  # HTML 파싱 프로세스 종료
+        self.crawling_module.seen_urls.close()
         self.window.destroy()
 
     def run(self):
@@ -1,9 +1,13 @@
 import os
 import json
+import numpy as np
 import tkinter as tk
 from tkinter import ttk
-from .datas.constants import VECTOR_DBS
+from .datas.constants import VECTOR_DBS, FAISS_INDEX_TYPES, SEGMENT_COMPACT_THRESHOLD
 from .faissVectorStore import FaissVectorStore
+from .ann_index import evaluate_index, load_index_params
+from .segmentStore import open_manifest, read_manifest, append_segment, segment_files
+from .dedup import Deduplicator, open_probe_index, load_dedup_keys, dedup_report_path
 
 class VdbSaveModule:
     def __init__(self, parent, status_module):
@@ -27,6 +31,18 @@ class VdbSaveModule:
                                               values=VECTOR_DBS, state="readonly", width=15)
         self.vdb_type_dropdown.pack(side=tk.LEFT)
 
+        # Faiss 인덱스 타입 선택 (Flat 외에는 저장할 때 모인 벡터로 학습)
+        # 저장 경로에 있는 기본 인덱스의 종류로 시작하고, 직접 다른 종류를 고른 경우에만 기본 인덱스를 다시 만듦
+        index_type_frame = ttk.Frame(self.main_frame)
+        index_type_frame.pack(fill=tk.X, pady=5)
+        ttk.Label(index_type_frame, text="인덱스 타입:").pack(side=tk.LEFT, padx=(0, 5))
+        self.index_type = tk.StringVar(value=FAISS_INDEX_TYPES[0])
+        self.index_type_changed = False
+        self.index_type_dropdown = ttk.Combobox(index_type_frame, textvariable=self.index_type,
+                                                values=FAISS_INDEX_TYPES, state="readonly", width=15)
+        self.index_type_dropdown.pack(side=tk.LEFT)
+        self.index_type_dropdown.bind("<<ComboboxSelected>>", self.on_index_type_selected)
+
         # 저장 경로 입력
         save_path_frame = ttk.Frame(self.main_frame)
         save_path_frame.pack(fill=tk.X, pady=5)
@@ -34,6 +50,36 @@ class VdbSaveModule:
         self.save_path = tk.StringVar(value="./Good DBMgr/vdb_data/")
         self.save_path_entry = ttk.Entry(save_path_frame, textvariable=self.save_path, width=30)
         self.save_path_entry.pack(side=tk.LEFT, expand=True, fill=tk.X)
+        self.save_path.trace_add("write", lambda *args: self.refresh_index_type())
+        self.refresh_index_type()
+
+        # 중복 제거 (저장소에 이미 있는 글/청크/본문, 거의 같은 벡터는 저장하지 않음)
+        self.dedup = tk.BooleanVar(value=True)
+        ttk.Checkbutton(self.main_frame, text="중복 제거", variable=self.dedup).pack(anchor=tk.W, pady=5)
+
+    @staticmethod
+    def stored_index_type(save_path):
+        """
+        저장 경로에 있는 기본 인덱스의 종류 (매니페스트, 없으면 params.json 기준 / 저장소가 없으면 None)
+        """
+        index_file = os.path.join(save_path, "spot_index.bin")
+        manifest = read_manifest(index_file)
+        if manifest and manifest["base"] is not None:
+            return manifest["base"]["index_type"]
+        return load_index_params(index_file).get("index_type")
+
+    def refresh_index_type(self):
+        """
+        인덱스 타입을 직접 고르지 않았으면 저장 경로의 기본 인덱스 종류로 맞춥니다.
+        """
+        if self.index_type_changed:
+            return
+        index_type = self.stored_index_type(self.save_path.get())
+        if index_type in FAISS_INDEX_TYPES:
+            self.index_type.set(index_type)
+
+    def on_index_type_selected(self, event=None):
+        self.index_type_changed = True
 
     def set_preprocessed_data(self, data):
         self.preprocessed_data = data
@@ -83,55 +129,126 @@ class VdbSaveModule:
             self.status_module.update_status(f"{vdb_type} VDB 저장은 아직 구현되지 않았습니다.")
             return False
 
-        # 마지막 ID 저장
-        self.save_last_id()
-
         if success:
+            # 마지막 ID 저장 (기준은 매니페스트, last_id.json은 병합 탭 등에서 읽는 사본)
+            self.save_last_id()
             self.status_module.update_status(f"{vdb_type} VDB 저장 완료")
         else:
             self.status_module.update_status(f"{vdb_type} VDB 저장 실패")
 
         return success
 
+    def collect_chunks(self):
+        """
+        전처리된 데이터에 data_id를 매기고 청크 벡터/메타데이터 리스트로 펼칩니다.
+        :return: (청크 벡터 리스트, 청크 메타데이터 리스트)
+        """
+        chunk_vectors = []
+        chunk_metas = []
+        for naver_data in self.preprocessed_data:
+            data_id = self.get_next_id()
+            base_meta = {
+                "data_id": data_id,
+                "name": naver_data.name,
+                "address": naver_data.address,
+                "link": naver_data.link,
+                "img": naver_data.img_src
+            }
+
+            if isinstance(naver_data.content, list) and isinstance(naver_data.vectorized_content, list):
+                for chunk_index, (chunk_vector, chunk_content) in enumerate(zip(naver_data.vectorized_content, naver_data.content)):
+                    chunk_meta = {
+                        **base_meta,
+                        "chunk_index": chunk_index,
+                        "chunk_content": chunk_content
+                    }
+                    chunk_vectors.append(chunk_vector)
+                    chunk_metas.append(chunk_meta)
+            else:
+                self.status_module.update_status(f"경고: Naver 데이터 '{naver_data.name}'의 내용이 리스트 형식이 아닙니다.")
+        return chunk_vectors, chunk_metas
+
+    def remove_duplicates(self, index_file, metadata_file, manifest, chunk_vectors, chunk_metas):
+        """
+        이번 실행의 청크 중 저장소(기본 + 추가 세그먼트)나 앞 청크와 중복인 청크를 뺍니다.
+        저장소 쪽은 세그먼트별 키 파일(.keys.npz)과 인덱스만 읽고 메타데이터는 읽지 않습니다.
+        뺀 청크 목록은 <인덱스 이름>.dedup.json에 저장합니다.
+        :return: (남은 청크 벡터 리스트, 남은 청크 메타데이터 리스트)
+        """
+        deduplicator = Deduplicator(expected_rows=len(chunk_metas))
+        parts = []
+        if manifest["base"] is not None:
+            parts = [(index_file, metadata_file, manifest["base"]["ntotal"])] + \
+                    [(*segment_files(index_file, segment["name"]), segment["ntotal"]) for segment in manifest["segments"]]
+        for part_index_file, part_metadata_file, rows in parts:
+            deduplicator.register(load_dedup_keys(part_index_file, part_metadata_file, rows), "stored",
+                                  open_probe_index(part_index_file))
+        vectors = np.vstack([np.asarray(v, dtype=np.float32).reshape(1, -1) for v in chunk_vectors])
+        keep = deduplicator.filter(chunk_metas, vectors, "new", "new")
+
+        deduplicator.write_report(dedup_report_path(index_file))
+        self.status_module.update_status(deduplicator.summary())
+        return ([vector for vector, kept in zip(chunk_vectors, keep) if kept],
+                [meta for meta, kept in zip(chunk_metas, keep) if kept])
+
     async def save_to_faiss(self, save_path):
         try:
             index_file = os.path.join(save_path, "spot_index.bin")
             metadata_file = os.path.join(save_path, "spot_metadata.pkl")
-            
-            # 기존 인덱스가 있으면 로드, 없으면 새로 생성
-            if os.path.exists(index_file) and os.path.exists(metadata_file):
+
+            # 매니페스트를 열면서 이전에 중단된 저장이 있으면 복구 (마지막 ID도 매니페스트 기준)
+            manifest = open_manifest(index_file, metadata_file)
+            self.last_id = max(self.last_id, manifest["last_id"])
+            chunk_vectors, chunk_metas = self.collect_chunks()
+            if not chunk_metas:
+                self.status_module.update_status("저장할 청크가 없습니다.")
+                return True
+            if self.dedup.get():
+                chunk_vectors, chunk_metas = self.remove_duplicates(index_file, metadata_file, manifest,
+                                                                    chunk_vectors, chunk_metas)
+                if not chunk_metas:
+                    self.status_module.update_status("새 청크가 모두 저장된 데이터와 중복입니다.")
+                    return True
+
+            index_type = self.index_type.get()
+            if manifest["base"] is not None and not self.index_type_changed:
+                index_type = manifest["base"]["index_type"]  # 직접 고르지 않았으면 저장된 종류 그대로 (다시 만들지 않음)
+            if manifest["base"] is None:
+                # 처음 저장: 모인 벡터로 기본 세그먼트를 만듦
                 vector_store = FaissVectorStore(index_file=index_file, metadata_file=metadata_file)
-                vector_store.load_index()
-                self.status_module.update_status("기존 Faiss 인덱스를 로드했습니다.")
+                self.status_module.update_status("새로운 Faiss 인덱스를 생성했습니다.")
+                vector_store.add_vectors(chunk_vectors, chunk_metas)
+                self.status_module.update_status(f"{len(chunk_metas)}개 청크를 인덱스에 추가했습니다.")
             else:
+                # 기존 인덱스는 읽지 않고 이번 실행의 벡터만 추가 세그먼트로 씀
+                manifest = append_segment(index_file, manifest, chunk_vectors, chunk_metas)
+                segment = manifest["segments"][-1]
+                self.status_module.update_status(
+                    f"{len(chunk_metas)}개 청크를 추가 세그먼트 {segment['name']}에 저장했습니다. "
+                    f"(추가 세그먼트 {len(manifest['segments'])}개)")
+                if index_type == manifest["base"]["index_type"] and len(manifest["segments"]) < SEGMENT_COMPACT_THRESHOLD:
+                    self.status_module.update_status("Faiss VDB에 데이터 저장 완료")
+                    return True
+
+                # 인덱스 종류를 바꾸거나 추가 세그먼트가 많이 쌓이면 기본 세그먼트로 합침
+                self.status_module.update_status(f"추가 세그먼트 {len(manifest['segments'])}개를 기본 인덱스로 합치는 중...")
                 vector_store = FaissVectorStore(index_file=index_file, metadata_file=metadata_file)
-                self.status_module.update_status("새로운 Faiss 인덱스를 생성했습니다.")
 
-            for naver_data in self.preprocessed_data:
-                data_id = self.get_next_id()
-                base_meta = {
-                    "data_id": data_id,
-                    "name": naver_data.name,
-                    "address": naver_data.address,
-                    "link": naver_data.link,
-                    "img": naver_data.img_src
-                }
-                
-                if isinstance(naver_data.content, list) and isinstance(naver_data.vectorized_content, list):
-                    for chunk_index, (chunk_vector, chunk_content) in enumerate(zip(naver_data.vectorized_content, naver_data.content)):
-                        chunk_meta = {
-                            **base_meta,
-                            "chunk_index": chunk_index,
-                            "chunk_content": chunk_content
-                        }
-                        vector_store.add_to_index(
-                            {f"naver_{data_id}_{chunk_index}": chunk_vector},
-                            chunk_meta
-                        )
-                else:
-                    self.status_module.update_status(f"경고: Naver 데이터 '{naver_data.name}'의 내용이 리스트 형식이 아닙니다.")
+            if vector_store.index is not None and index_type != vector_store.index_type:
+                # 모인 벡터로 선택한 종류의 인덱스를 학습시키고 Flat 대비 recall/검색 시간 보고
+                self.status_module.update_status(f"{index_type} 인덱스 학습 중... ({vector_store.index.ntotal}개 벡터)")
+                vectors = vector_store.rebuild_index(index_type)
+                self.status_module.update_status(f"{index_type} 인덱스 파라미터: {vector_store.index_params['params']}")
+                if index_type != "Flat":
+                    report = evaluate_index(vector_store.index, vectors)
+                    vector_store.index_params["report"] = report
+                    self.status_module.update_status(
+                        f"recall@{report['k']}: {report['recall']:.3f} | "
+                        f"검색 p50/p99: {report['ann_p50_ms']:.2f}/{report['ann_p99_ms']:.2f}ms "
+                        f"(Flat {report['flat_p50_ms']:.2f}/{report['flat_p99_ms']:.2f}ms)")
 
             vector_store.save_index()
+            self.index_type_changed = False  # 고른 종류로 저장됐으므로 다음 저장부터는 저장된 종류를 따름
             
             self.status_module.update_status("Faiss VDB에 데이터 저장 완료")
             return True
@@ -1,6 +1,7 @@
 """
 웹 크롤링을 통해서 Faiss DB를 만드는 프로그램 
 """
+import multiprocessing
 import tkinter as tk
 from ttkthemes import ThemedTk
 from application import Application
@@ -23,6 +24,7 @@ class MainApplication:
         self.root.destroy()
 
 if __name__ == "__main__":
+    multiprocessing.freeze_support()  # 배포(pyinstaller) 실행 파일에서 크롤링 파싱 프로세스 풀 사용
     main_app = MainApplication()
     try:
         main_app.run()
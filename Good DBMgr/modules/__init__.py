@@ -0,0 +1 @@
+import vdb_data.common_constants  # 프로젝트 루트를 import 경로에 추가 (spot_store)
@@ -1,55 +1,226 @@
 import faiss
 import numpy as np
-import pickle
 import os
+from spot_store.metadataStore import (load_metadata, write_columnar_metadata, merge_columnar_metadata,
+                                      ColumnarMetadata)
+from creator_api.ann_index import load_index_params, save_index_params
+from creator_api.segmentStore import open_manifest, segment_files
+from creator_api.dedup import dedup_report_path
+
+# 코드 설명 요약:
+# 여러 벡터DB(크롤링 결과)를 한 번에 병합합니다. 세그먼트 저장소면 추가 세그먼트까지 같이 병합합니다.
+# - 첫 DB가 IVF 인덱스면 결과도 같은 IVF 인덱스로 만들고, 같은 양자화기(중심점)를 쓰는 IVF 입력은
+#   역리스트를 그대로 옮기고(merge_from), 나머지 입력은 벡터를 블록 단위로 꺼내서 추가합니다.
+# - 그 외에는 Flat 인덱스에 블록 단위로 벡터를 복사합니다. (입력 전체를 한 번에 꺼내지 않음)
+# - 메타데이터는 컬럼 파일끼리 블록 단위로 이어 붙이고, 뒤 DB의 data_id는 앞 DB들의 최대 data_id 뒤로 밉니다.
+# - Deduplicator를 넘기면 블록마다 중복(같은 글/청크/본문, 근접 벡터)을 빼고 남은 행만 병합합니다.
+#   (이때는 역리스트를 그대로 옮기지 않고 모든 입력의 벡터를 꺼내서 검사한 뒤 추가함)
+
+MERGE_BLOCK_SIZE = 50000  # 벡터/메타데이터를 한 번에 복사하는 행 수
+
 
 class Merger:
     @staticmethod
     def merge_vdbs(vdb1_index_path, vdb1_meta_path, vdb2_index_path, vdb2_meta_path, output_dir):
-        # 첫번째 벡터DB 인덱스 가져오기
-        index1 = faiss.read_index(vdb1_index_path)
-        
-        # 두번째 벡터DB 인덱스 가져오기
-        index2 = faiss.read_index(vdb2_index_path)
-        
-        # 두 인덱스의 차원 비교
-        if index1.d != index2.d:
-            raise ValueError("차원이 서로 달라서 병합할 수 없습니다.")
-        
-        # 인덱스 머지하기
-        merged_index = faiss.IndexFlatL2(index1.d)
-        merged_index.add(index1.reconstruct_n(0, index1.ntotal))
-        merged_index.add(index2.reconstruct_n(0, index2.ntotal))
-        
-        # 메타 데이터 들고오기
-        with open(vdb1_meta_path, 'rb') as f:
-            meta1 = pickle.load(f)
-        with open(vdb2_meta_path, 'rb') as f:
-            meta2 = pickle.load(f)
-        
-        # 메타 데이터 병합하기 (data_id 조정)
-        max_data_id = max(item['data_id'] for item in meta1) if meta1 else -1
-        print(max_data_id)
-        for item in meta2:
-            item['data_id'] += max_data_id + 1
-
-        # 메타 데이터 병합하기
-        merged_meta = meta1 + meta2
-        
+        return Merger.merge_many([(vdb1_index_path, vdb1_meta_path), (vdb2_index_path, vdb2_meta_path)], output_dir)
+
+    @staticmethod
+    def merge_many(inputs, output_dir, block_size=MERGE_BLOCK_SIZE, deduplicator=None):
+        """
+        여러 벡터DB를 한 번에 병합합니다.
+        :param inputs: (인덱스 경로, 메타데이터 경로) 리스트 - 첫 DB가 기준 (data_id를 그대로 유지)
+        :param output_dir: merged_index.bin, merged_metadata.cols를 저장할 폴더
+        :param block_size: 벡터/메타데이터를 한 번에 복사하는 행 수
+        :param deduplicator: 중복을 뺄 때 넘기는 Deduplicator (뺀 행 목록은 merged_index.dedup.json)
+        :return: (병합된 인덱스 경로, 병합된 메타데이터 경로)
+        """
+        if len(inputs) < 2:
+            raise ValueError("병합할 DB를 두 개 이상 선택해주세요.")
+
         # 출력 디렉토리가 없다면 새로 만들기
         os.makedirs(output_dir, exist_ok=True)
-        
-        # 병합된 인덱스 저장하기
         output_index_path = os.path.join(output_dir, 'merged_index.bin')
+        output_meta_path = os.path.join(output_dir, 'merged_metadata.cols')
+
+        # DB별 (인덱스, 메타데이터) 세그먼트 목록
+        stores = [Merger.store_parts(index_path, meta_path) for index_path, meta_path in inputs]
+
+        # 메타 데이터 병합하기 (data_id 조정: 뒤 DB는 앞 DB들의 최대 data_id + 1 만큼 밀기)
+        metadata = []
+        data_id_offsets = []
+        sources = []  # 세그먼트별 DB 번호 (같은 DB의 세그먼트는 data_id를 같이 씀)
+        max_data_id = -1
+        for store_index, parts in enumerate(stores):
+            store_metadata = [Merger.open_metadata(meta_path, output_dir) for _, meta_path in parts]
+            store_max = max((int(meta.data_ids.max()) for meta in store_metadata if len(meta)), default=-1)
+            offset = 0 if store_index == 0 else max_data_id + 1
+            if store_max >= 0:
+                max_data_id = max(max_data_id, store_max + offset)
+            metadata.extend(store_metadata)
+            data_id_offsets.extend([offset] * len(store_metadata))
+            sources.extend([store_index] * len(store_metadata))
+        try:
+            # 인덱스 머지하기 (중복 제거면 남길 행도 같이 정함)
+            index_paths = [index_path for parts in stores for index_path, _ in parts]
+            keep = None
+            if deduplicator is None:
+                merged_index = Merger.merge_indexes(index_paths, block_size)
+            else:
+                merged_index, keep = Merger.merge_unique(index_paths, metadata, sources, deduplicator, block_size)
+                deduplicator.write_report(dedup_report_path(output_index_path))
+            merge_columnar_metadata(output_meta_path, metadata, {"data_id": data_id_offsets}, block_size, keep)
+        finally:
+            for meta in metadata:
+                meta.close()
         faiss.write_index(merged_index, output_index_path)
-        
-        # 병합된 메타데이터 저장하기
-        output_meta_path = os.path.join(output_dir, 'merged_metadata.pkl')
-        with open(output_meta_path, 'wb') as f:
-            pickle.dump(merged_meta, f)
-        
+
+        # IVF 결과는 검색 파라미터(nprobe 등)를 기준 DB에서 물려받음
+        if Merger.as_ivf(merged_index) is not None:
+            params = load_index_params(inputs[0][0])
+            save_index_params(output_index_path, {**params, "ntotal": int(merged_index.ntotal), "dim": merged_index.d})
+
         return output_index_path, output_meta_path
-    
+
+    @staticmethod
+    def store_parts(index_path, meta_path):
+        """
+        세그먼트 저장소면 기본 세그먼트 + 추가 세그먼트의 (인덱스, 메타데이터) 목록, 아니면 입력 그대로
+        """
+        manifest = open_manifest(index_path, meta_path)
+        return [(index_path, meta_path)] + [segment_files(index_path, segment["name"]) for segment in manifest["segments"]]
+
+    @staticmethod
+    def open_metadata(meta_path, output_dir):
+        """
+        메타데이터를 메모리 맵으로 엽니다. (컬럼 파일로 변환하지 못한 pkl은 출력 폴더에 임시 컬럼 파일을 만들어서 엶)
+        """
+        metadata = load_metadata(meta_path)
+        if isinstance(metadata, ColumnarMetadata):
+            return metadata
+        tmp_path = os.path.join(output_dir, f"{os.path.basename(meta_path)}.{os.getpid()}.cols")
+        write_columnar_metadata(tmp_path, metadata)
+        metadata = ColumnarMetadata(tmp_path)
+        os.remove(tmp_path)  # 열어 둔 메모리 맵은 닫을 때까지 유효 (윈도우에서는 실패할 수 있음)
+        return metadata
+
+    @staticmethod
+    def as_ivf(index):
+        index = faiss.downcast_index(index)
+        return index if isinstance(index, faiss.IndexIVF) else None
+
+    @staticmethod
+    def shares_quantizer(target, source):
+        """
+        두 IVF 인덱스가 같은 종류/같은 중심점(PQ면 같은 코드북)을 써서 역리스트를 그대로 옮길 수 있는지 확인합니다.
+        """
+        if type(target) is not type(source) or target.d != source.d or target.nlist != source.nlist \
+                or target.code_size != source.code_size:
+            return False
+        if not np.array_equal(target.quantizer.reconstruct_n(0, target.nlist),
+                              source.quantizer.reconstruct_n(0, source.nlist)):
+            return False
+        if isinstance(target, faiss.IndexIVFPQ):
+            return np.array_equal(faiss.vector_to_array(target.pq.centroids), faiss.vector_to_array(source.pq.centroids))
+        return True
+
+    @staticmethod
+    def read_index(index_path):
+        """
+        IVF가 아니면 메모리 맵으로 열어서 블록 단위로 꺼낼 때 필요한 부분만 읽습니다.
+        """
+        try:
+            index = faiss.read_index(index_path, faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY)
+        except RuntimeError:
+            return faiss.read_index(index_path)
+        if Merger.as_ivf(index) is not None:
+            # 역리스트를 옮기거나(merge_from) 벡터를 꺼내려면(direct map) 메모리로 읽어야 함
+            return faiss.read_index(index_path)
+        return index
+
+    @staticmethod
+    def iter_vectors(source, block_size):
+        """
+        source의 벡터를 block_size개씩 꺼냅니다. (IVF-PQ는 압축된 값이라 근사치)
+        :return: (시작 행, 벡터 블록) 제너레이터
+        """
+        ivf = Merger.as_ivf(source)
+        if ivf is not None:
+            ivf.make_direct_map()
+        for start in range(0, source.ntotal, block_size):
+            yield start, source.reconstruct_n(start, min(block_size, source.ntotal - start))
+
+    @staticmethod
+    def copy_vectors(source, target, block_size):
+        """
+        source의 벡터를 block_size개씩 꺼내서 target에 추가합니다.
+        """
+        for _, block in Merger.iter_vectors(source, block_size):
+            target.add(block)
+
+    @staticmethod
+    def empty_like(index):
+        """
+        병합 결과를 담을 빈 인덱스 (IVF면 같은 양자화기/파라미터의 빈 IVF, 아니면 Flat)
+        """
+        ivf = Merger.as_ivf(index)
+        if ivf is None:
+            return faiss.IndexFlatL2(index.d)
+        merged = faiss.clone_index(ivf)
+        merged.reset()
+        return merged
+
+    @staticmethod
+    def merge_indexes(index_paths, block_size):
+        """
+        인덱스들을 순서대로 이어 붙인 인덱스를 만듭니다. (메모리에는 결과 + 입력 하나만 올라감)
+        """
+        first = Merger.read_index(index_paths[0])
+        merged = Merger.empty_like(first)
+        merged_ivf = Merger.as_ivf(merged)
+
+        for position, index_path in enumerate(index_paths):
+            index = Merger.read_index(index_path) if position else first
+            first = None  # 입력은 하나씩만 메모리에 두도록 참조를 놓음
+            # 인덱스의 차원 비교
+            if index.d != merged.d:
+                raise ValueError("차원이 서로 달라서 병합할 수 없습니다.")
+            source_ivf = Merger.as_ivf(index)
+            if merged_ivf is not None and source_ivf is not None and Merger.shares_quantizer(merged_ivf, source_ivf):
+                merged_ivf.merge_from(source_ivf, merged.ntotal)  # 역리스트를 그대로 옮김 (source는 비워짐)
+            else:
+                Merger.copy_vectors(index, merged, block_size)
+            del index
+        return merged
+
+    @staticmethod
+    def merge_unique(index_paths, metadata, sources, deduplicator, block_size):
+        """
+        인덱스들의 벡터를 블록 단위로 꺼내서 중복이 아닌 행만 이어 붙입니다.
+        :param metadata: 인덱스별 메타데이터 (같은 순서)
+        :param sources: 인덱스별 DB 번호
+        :return: (병합된 인덱스, 인덱스별 남긴 행 bool 배열 리스트)
+        """
+        deduplicator.expect(sum(len(meta) for meta in metadata))
+        merged = None
+        keep = []
+        for index_path, meta, source in zip(index_paths, metadata, sources):
+            index = Merger.read_index(index_path)
+            if merged is None:
+                merged = Merger.empty_like(index)
+            if index.d != merged.d:
+                raise ValueError("차원이 서로 달라서 병합할 수 없습니다.")
+            if index.ntotal != len(meta):
+                raise ValueError(f"인덱스와 메타데이터의 행 수가 다릅니다: {index_path}")
+            mask = np.zeros(index.ntotal, dtype=bool)
+            for start, block in Merger.iter_vectors(index, block_size):
+                block_keep = deduplicator.filter(meta, block, source, index_path, start)
+                mask[start:start + len(block)] = block_keep
+                if block_keep.any():
+                    merged.add(block[block_keep])
+            keep.append(mask)
+            del index
+        return merged, keep
+
     @staticmethod
     def verify_merge(merged_index_path, merged_meta_path):
         """
@@ -57,13 +228,14 @@ class Merger:
         """
         # 검증할 데이터의 인덱스 들고오기
         merged_index = faiss.read_index(merged_index_path)
-        
-        # 검증할 데이터의 메타데이터 들고오기
-        with open(merged_meta_path, 'rb') as f:
-            merged_meta = pickle.load(f)
-        
-        # 인덱스와 메타데이터의 차원이 일치하는지 알아보기
-        if merged_index.ntotal != len(merged_meta):
-            raise ValueError("검증실패 : 차원이 일치하지 않습니다")
- 
-        return True
\ No newline at end of file
+
+        # 검증할 데이터의 메타데이터 들고오기 (행 수만 필요하므로 메모리 맵으로 열기)
+        merged_meta = ColumnarMetadata(merged_meta_path)
+        try:
+            # 인덱스와 메타데이터의 차원이 일치하는지 알아보기
+            if merged_index.ntotal != len(merged_meta):
+                raise ValueError("검증실패 : 차원이 일치하지 않습니다")
+        finally:
+            merged_meta.close()
+
+        return True
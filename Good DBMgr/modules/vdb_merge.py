@@ -4,7 +4,9 @@ from configuration import save_module_config, load_module_config
 from .merger import Merger
 import os
 import json
-import pickle
+import numpy as np
+from spot_store.metadataStore import ColumnarMetadata
+from creator_api.dedup import Deduplicator, dedup_report_path
 from vdb_data.common_constants import VDB_DATA_DIR, ID_FILE_PATH
 
 class VdbMergeModule:
@@ -27,6 +29,8 @@ class VdbMergeModule:
         self.vdb1_meta = tk.StringVar()
         self.vdb2_index = tk.StringVar()
         self.vdb2_meta = tk.StringVar()
+        self.extra_vdbs = []  # "DB 추가"로 쌓아 둔 (인덱스, 메타데이터) - 한 번에 같이 병합
+        self.dedup = tk.BooleanVar(value=True)
 
         self.current_step = 1
         self.create_widgets()
@@ -67,6 +71,10 @@ class VdbMergeModule:
         ttk.Entry(self.vdb2_frame, textvariable=self.vdb2_meta, width=40).grid(row=1, column=1, padx=5, pady=2)
         ttk.Button(self.vdb2_frame, text="Browse", command=lambda: self.browse_file('vdb2_meta')).grid(row=1, column=2, padx=5, pady=2)
 
+        # 중복 제거 (같은 글/청크/본문, 거의 같은 벡터는 먼저 병합된 쪽만 남김)
+        self.dedup_check = ttk.Checkbutton(self.main_frame, text="중복 제거", variable=self.dedup)
+        self.dedup_check.pack(pady=5)
+
         # 버튼 프레임
         self.button_frame = ttk.Frame(self.main_frame)
         self.button_frame.pack(pady=10)
@@ -74,6 +82,9 @@ class VdbMergeModule:
         self.next_button = ttk.Button(self.button_frame, text="다음으로", command=self.next_step)
         self.next_button.pack(side=tk.LEFT, padx=5)
 
+        self.add_button = ttk.Button(self.button_frame, text="DB 추가", command=self.add_vdb, state=tk.DISABLED)
+        self.add_button.pack(side=tk.LEFT, padx=5)
+
         self.merge_button = ttk.Button(self.button_frame, text="병합", command=self.merge_vdbs, state=tk.DISABLED)
         self.merge_button.pack(side=tk.LEFT, padx=5)
 
@@ -90,7 +101,7 @@ class VdbMergeModule:
             filetypes = [("Binary files", "*.bin"), ("All files", "*.*")]
             title = "인덱스 파일을 선택해주세요"
         else:
-            filetypes = [("Pickle files", "*.pkl"), ("All files", "*.*")]
+            filetypes = [("Metadata files", "*.cols *.pkl"), ("All files", "*.*")]
             title = "메타 파일을 선택해주세요"
 
         initial_dir = self.data_dir if os.path.exists(self.data_dir) else os.path.dirname(self.data_dir)
@@ -109,11 +120,25 @@ class VdbMergeModule:
                 self.status_var.set("첫번째 db의 인덱스와 메타 파일을 둘 다 선택해주세요")
                 return
             self.current_step = 2
-            self.step_label.config(text="Step 2: 병할될 DB를 선택해주세요\n인덱스와 메타 파일을 둘 다 선택해주세요")
-            self.vdb2_frame.pack(fill=tk.X, pady=5, before=self.button_frame)
+            self.step_label.config(text="Step 2: 병할될 DB를 선택해주세요\n인덱스와 메타 파일을 둘 다 선택해주세요\n"
+                                        "여러 개를 합치려면 선택할 때마다 'DB 추가'를 눌러주세요")
+            self.vdb2_frame.pack(fill=tk.X, pady=5, before=self.dedup_check)
             self.next_button.config(state=tk.DISABLED)
+            self.add_button.config(state=tk.NORMAL)
             self.merge_button.config(state=tk.NORMAL)
 
+    def add_vdb(self):
+        """
+        지금 선택한 DB를 병합 목록에 넣고 다음 DB를 고를 수 있게 입력칸을 비웁니다.
+        """
+        if not self.vdb2_index.get() or not self.vdb2_meta.get():
+            self.status_var.set("추가할 DB의 인덱스와 메타 파일을 둘 다 선택해주세요")
+            return
+        self.extra_vdbs.append((self.vdb2_index.get(), self.vdb2_meta.get()))
+        self.vdb2_index.set("")
+        self.vdb2_meta.set("")
+        self.status_var.set(f"병합할 DB {len(self.extra_vdbs)}개가 추가되었습니다.")
+
     def load_last_id(self):
         if os.path.exists(self.id_file_path):
             with open(self.id_file_path, 'r') as f:
@@ -127,7 +152,10 @@ class VdbMergeModule:
             json.dump({'last_id': last_id}, f)
 
     def merge_vdbs(self):
-        if not self.vdb2_index.get() or not self.vdb2_meta.get():
+        inputs = [(self.vdb1_index.get(), self.vdb1_meta.get())] + self.extra_vdbs
+        if self.vdb2_index.get() and self.vdb2_meta.get():
+            inputs.append((self.vdb2_index.get(), self.vdb2_meta.get()))
+        if len(inputs) < 2:
             self.status_var.set("두 DB의 인덱스와 메타 데이터를 모두 선택해주세요")
             return
         
@@ -136,22 +164,21 @@ class VdbMergeModule:
             if not output_dir:
                 return  
             
-            self.status_var.set("vdb 병합중입니다.")
+            self.status_var.set(f"vdb {len(inputs)}개를 병합중입니다.")
             self.window.update()  
             
             # 머지 시작
-            merged_index_path, merged_meta_path = Merger.merge_vdbs(
-                self.vdb1_index.get(), self.vdb1_meta.get(),
-                self.vdb2_index.get(), self.vdb2_meta.get(),
-                output_dir
-            )
+            deduplicator = Deduplicator() if self.dedup.get() else None
+            merged_index_path, merged_meta_path = Merger.merge_many(inputs, output_dir, deduplicator=deduplicator)
+            dedup_message = f"{deduplicator.summary()}\n보고서: {dedup_report_path(merged_index_path)}\n\n" \
+                if deduplicator is not None else ""
             
             # 머지 적용
             if Merger.verify_merge(merged_index_path, merged_meta_path):
-                # 메타데이터에서 최대 data_id 찾기
-                with open(merged_meta_path, 'rb') as f:
-                    merged_meta = pickle.load(f)
-                max_data_id = max(item['data_id'] for item in merged_meta)
+                # 메타데이터에서 최대 data_id 찾기 (data_id 컬럼만 읽음)
+                merged_meta = ColumnarMetadata(merged_meta_path)
+                max_data_id = int(np.max(merged_meta.data_ids))
+                merged_meta.close()
                 
                 # last_id 업데이트 및 저장
                 self.save_last_id(max_data_id)
@@ -160,6 +187,7 @@ class VdbMergeModule:
                 messagebox.showinfo("병합 성공", 
                                     f"성공적으로 병합되었습니다.\n"
                                     f"last_id가 {max_data_id}로 업데이트되었습니다.\n\n"
+                                    f"{dedup_message}"
                                     f"Merged index: {merged_index_path}\n"
                                     f"Merged metadata: {merged_meta_path}")
             else:
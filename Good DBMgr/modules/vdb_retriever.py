@@ -125,7 +125,7 @@ class VdbRetrieverModule:
             filetypes = [("Binary files", "*.bin"), ("All files", "*.*")]
             title = "Select Index File"
         elif file_type == 'metadata':
-            filetypes = [("Pickle files", "*.pkl"), ("All files", "*.*")]
+            filetypes = [("Metadata files", "*.cols *.pkl"), ("All files", "*.*")]
             title = "Select Metadata File"
         else:
             return
@@ -179,29 +179,16 @@ class VdbRetrieverModule:
 
         try:
             query_vector = self.embedding.get_text_embedding_sync(query)
-            distances, indices = self.vector_store.search(query_vector, k * 2)
-            
+            # 가게 인덱스로 후보 가게를 고르고 그 가게의 청크만 다시 계산 (가게당 가장 가까운 청크 하나)
+            distances, indices = self.vector_store.search_entities(query_vector, k)
+
             results = []
-            seen_data_ids = set()
-            
-            for distance, idx in zip(distances[0], indices[0]):
-                if idx < len(self.vector_store.metadata):
-                    metadata = self.vector_store.metadata[idx]
-                    data_id = metadata.get('data_id')
-                    
-                    if data_id not in seen_data_ids:
-                        seen_data_ids.add(data_id)
-                        
-                        result_str = f"Distance: {distance:.4f}\n"
-                        for key, value in metadata.items():
-                            result_str += f"{key}: {value}\n"
-                        
-                        results.append(result_str)
-                        
-                        if len(results) == k:
-                            break
-                else:
-                    break
+            for distance, idx in zip(distances, indices):
+                metadata = self.vector_store.metadata[idx]
+                result_str = f"Distance: {distance:.4f}\n"
+                for key, value in metadata.items():
+                    result_str += f"{key}: {value}\n"
+                results.append(result_str)
 
             if len(results) < k:
                 self.status_var.set(f"주의: 요청한 {k}개의 결과 중 {len(results)}개만 찾았습니다.")
@@ -0,0 +1,41 @@
+# 저장소 파일 형식/복구 테스트 ("Good DBMgr" 폴더에서 python -m pytest tests 로 실행)
+import os
+import sys
+import numpy as np
+import pytest
+
+# "Good DBMgr" 폴더를 import 경로에 추가 (creator_api, modules, vdb_data)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from creator_api.faissVectorStore import FaissVectorStore  # noqa: E402
+
+DIM = 16
+
+
+def make_vectors(count, seed=0):
+    vectors = np.random.default_rng(seed).normal(size=(count, DIM)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def make_rows(data_ids, chunks=2, content=None):
+    """
+    가게 하나(data_id)당 청크 chunks개의 메타데이터 리스트
+    """
+    return [{"data_id": data_id, "name": f"가게{data_id}", "address": f"서울 {data_id}번길",
+             "link": f"https://blog.naver.com/user/{data_id}", "img": "", "chunk_index": chunk,
+             "chunk_content": content or f"가게{data_id} 후기 {chunk}"}
+            for data_id in data_ids for chunk in range(chunks)]
+
+
+@pytest.fixture
+def store_files(tmp_path):
+    """
+    가게 1~10 (20행) 기본 세그먼트만 있는 저장소
+    :return: (인덱스 파일, 메타데이터 파일)
+    """
+    index_file = str(tmp_path / "spot_index.bin")
+    metadata_file = str(tmp_path / "spot_metadata.pkl")
+    store = FaissVectorStore(index_file, metadata_file)
+    store.add_vectors(make_vectors(20), make_rows(range(1, 11)))
+    store.save_index()
+    return index_file, metadata_file
@@ -0,0 +1,73 @@
+import os
+import numpy as np
+from creator_api.dedup import (Deduplicator, link_key, load_dedup_keys, open_probe_index, dedup_keys_path,
+                               REASON_CHUNK, REASON_LINK, REASON_CONTENT, REASON_NEAR)
+from conftest import make_vectors, make_rows
+
+
+def stored_deduplicator(index_file, metadata_file, rows=20):
+    deduplicator = Deduplicator(expected_rows=rows)
+    deduplicator.register(load_dedup_keys(index_file, metadata_file, rows), "stored", open_probe_index(index_file))
+    return deduplicator
+
+
+def reasons(deduplicator):
+    return [(entry["row"], entry["reason"]) for entry in deduplicator.removed]
+
+
+def test_link_key_ignores_mobile_and_postview_urls():
+    assert link_key("https://m.blog.naver.com/user/123") == link_key("https://blog.naver.com/user/123")
+    assert link_key("https://blog.naver.com/PostView.naver?blogId=user&logNo=123") == link_key("https://blog.naver.com/user/123")
+
+
+def test_same_content_is_only_a_duplicate_within_the_same_restaurant():
+    rows = make_rows([1, 2], chunks=1, content="주차 가능합니다")
+    rows.append({**make_rows([1], chunks=1, content="주차 가능합니다")[0], "chunk_index": 1,
+                 "link": "https://blog.naver.com/other/1"})
+    vectors = make_vectors(3)
+
+    deduplicator = Deduplicator(expected_rows=3)
+    keep = deduplicator.filter(rows, vectors, "new", "new")
+
+    assert keep.tolist() == [True, True, False]
+    assert reasons(deduplicator) == [(2, REASON_CONTENT)]
+
+
+def test_near_vector_is_only_a_duplicate_within_the_same_restaurant():
+    rows = make_rows([1, 2], chunks=1) + [{**make_rows([1], chunks=1)[0], "chunk_index": 1, "chunk_content": "다른 후기"}]
+    base = make_vectors(1)[0]
+    vectors = np.vstack([base, base + 0.001, base + 0.001])
+
+    deduplicator = Deduplicator(expected_rows=3)
+    keep = deduplicator.filter(rows, vectors, "new", "new")
+
+    assert keep.tolist() == [True, True, False]
+    assert reasons(deduplicator) == [(2, REASON_NEAR)]
+
+
+def test_new_rows_are_checked_against_stored_keys(store_files):
+    index_file, metadata_file = store_files
+    stored_vectors = make_vectors(20)
+    rows = [make_rows([1], chunks=1)[0],  # 저장된 청크 그대로
+            {**make_rows([11], chunks=1)[0], "link": "https://m.blog.naver.com/user/2"},  # 저장된 글, 다른 data_id
+            make_rows([12], chunks=1)[0]]
+    vectors = np.vstack([stored_vectors[0], make_vectors(1, seed=5)[0], make_vectors(1, seed=6)[0]])
+
+    deduplicator = stored_deduplicator(index_file, metadata_file)
+    keep = deduplicator.filter(rows, vectors, "stored", "new")  # 같은 저장소 키라서 data_id + chunk_index로 같은 청크를 찾음
+
+    assert keep.tolist() == [False, False, True]
+    assert reasons(deduplicator) == [(0, REASON_CHUNK), (1, REASON_LINK)]
+
+
+def test_dedup_keys_sidecar_is_reused_and_rebuilt(store_files):
+    index_file, metadata_file = store_files
+    keys_file = dedup_keys_path(index_file)
+    assert os.path.exists(keys_file)
+    first = load_dedup_keys(index_file, metadata_file, 20)
+
+    os.remove(keys_file)
+    rebuilt = load_dedup_keys(index_file, metadata_file, 20)
+    assert os.path.exists(keys_file)
+    for name in first:
+        assert np.array_equal(first[name], rebuilt[name])
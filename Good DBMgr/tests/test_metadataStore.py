@@ -0,0 +1,27 @@
+import os
+import pickle
+from spot_store.metadataStore import write_columnar_metadata, load_metadata, columnar_metadata_path, data_id_column
+from conftest import make_rows
+
+
+def test_columnar_metadata_round_trips_rows(tmp_path):
+    rows = make_rows([1, 2]) + [{"name": "data_id 없음", "chunk_index": None, "rating": 4.5}]
+    path = str(tmp_path / "spot_metadata.cols")
+    write_columnar_metadata(path, rows)
+
+    metadata = load_metadata(path)
+    assert list(metadata) == rows
+    assert data_id_column(metadata).tolist() == [1, 1, 2, 2, -1]
+    metadata.close()
+
+
+def test_pickle_is_converted_to_columns(tmp_path):
+    metadata_file = str(tmp_path / "spot_metadata.pkl")
+    rows = make_rows([1])
+    with open(metadata_file, 'wb') as f:
+        pickle.dump(rows, f)
+
+    metadata = load_metadata(metadata_file)
+    assert list(metadata) == rows
+    assert os.path.exists(columnar_metadata_path(metadata_file))
+    metadata.close()
@@ -0,0 +1,130 @@
+import os
+import faiss
+import pytest
+from creator_api import segmentStore
+from creator_api.segmentStore import (open_manifest, read_manifest, read_wal, append_wal, append_segment, segment_files,
+                                      staged_base_files, wal_path)
+from creator_api.faissVectorStore import FaissVectorStore
+from creator_api.dedup import dedup_keys_path
+from spot_store.metadataStore import load_metadata
+from conftest import make_vectors, make_rows
+
+
+class Crash(Exception):
+    pass
+
+
+def crash(*args, **kwargs):
+    raise Crash()
+
+
+def staged_leftovers(index_file, metadata_file):
+    return [staged for staged, _ in staged_base_files(index_file, metadata_file) if os.path.exists(staged)]
+
+
+def test_append_segment_updates_manifest(store_files):
+    index_file, metadata_file = store_files
+    manifest = open_manifest(index_file, metadata_file)
+    manifest = append_segment(index_file, manifest, make_vectors(4, seed=1), make_rows([11, 12]))
+
+    assert [segment["name"] for segment in manifest["segments"]] == ["000001"]
+    assert manifest["next_segment"] == 2
+    assert manifest["last_id"] == 12
+    assert read_manifest(index_file) == manifest
+    assert not os.path.exists(wal_path(index_file))
+    segment_index_file, _ = segment_files(index_file, "000001")
+    assert os.path.exists(dedup_keys_path(segment_index_file))
+
+
+def test_uncommitted_segment_is_rolled_back(store_files, monkeypatch):
+    index_file, metadata_file = store_files
+    manifest = open_manifest(index_file, metadata_file)
+    # 세그먼트 인덱스/메타데이터까지 쓰고 segment_commit 전에 중단
+    monkeypatch.setattr(segmentStore, "write_dedup_keys", crash)
+    with pytest.raises(Crash):
+        append_segment(index_file, manifest, make_vectors(4, seed=1), make_rows([11, 12]))
+    monkeypatch.undo()
+    assert all(map(os.path.exists, segment_files(index_file, "000001")))
+
+    manifest = open_manifest(index_file, metadata_file)
+    assert manifest["segments"] == []
+    assert manifest["last_id"] == 10
+    assert manifest["next_segment"] == 2  # 되돌린 세그먼트 이름은 다시 쓰지 않음
+    assert not any(map(os.path.exists, segment_files(index_file, "000001")))
+    assert not os.path.exists(wal_path(index_file))
+
+
+def test_committed_segment_missing_from_manifest_is_replayed(store_files, monkeypatch):
+    index_file, metadata_file = store_files
+    manifest = open_manifest(index_file, metadata_file)
+    # segment_commit까지 기록하고 매니페스트를 쓰기 전에 중단
+    monkeypatch.setattr(segmentStore, "write_manifest", crash)
+    with pytest.raises(Crash):
+        append_segment(index_file, manifest, make_vectors(4, seed=1), make_rows([11, 12]))
+    monkeypatch.undo()
+    assert read_manifest(index_file)["segments"] == []
+
+    manifest = open_manifest(index_file, metadata_file)
+    assert [segment["name"] for segment in manifest["segments"]] == ["000001"]
+    assert manifest["last_id"] == 12
+    assert manifest["next_segment"] == 2
+    assert read_manifest(index_file) == manifest
+    assert not os.path.exists(wal_path(index_file))
+
+
+def test_interrupted_base_commit_is_completed(store_files, monkeypatch):
+    index_file, metadata_file = store_files
+    manifest = open_manifest(index_file, metadata_file)
+    append_segment(index_file, manifest, make_vectors(4, seed=1), make_rows([11, 12]))
+
+    # 세그먼트를 읽어 들여 행을 더 추가하고 저장하다가 base_commit 기록 직후(.staged 교체 전) 중단
+    store = FaissVectorStore(index_file, metadata_file)
+    assert store.index.ntotal == 24
+    store.add_vectors(make_vectors(2, seed=2), make_rows([13]))
+    monkeypatch.setattr(segmentStore, "_replay", crash)
+    with pytest.raises(Crash):
+        store.save_index()
+    monkeypatch.undo()
+    assert staged_leftovers(index_file, metadata_file)
+    assert read_manifest(index_file)["generation"] == 1
+
+    manifest = open_manifest(index_file, metadata_file)
+    assert manifest["generation"] == 2
+    assert manifest["base"]["ntotal"] == 26
+    assert manifest["segments"] == []
+    assert manifest["last_id"] == 13
+    assert not staged_leftovers(index_file, metadata_file)
+    assert not any(map(os.path.exists, segment_files(index_file, "000001")))
+    assert faiss.read_index(index_file).ntotal == 26
+    assert len(load_metadata(metadata_file)) == 26
+
+
+def test_staged_files_without_base_commit_are_discarded(store_files, monkeypatch):
+    index_file, metadata_file = store_files
+    store = FaissVectorStore(index_file, metadata_file)
+    store.add_vectors(make_vectors(2, seed=2), make_rows([11]))
+    # .staged 파일을 다 쓰고 base_commit을 기록하기 전에 중단
+    monkeypatch.setattr(segmentStore, "append_wal", crash)
+    with pytest.raises(Crash):
+        store.save_index()
+    monkeypatch.undo()
+    assert staged_leftovers(index_file, metadata_file)
+
+    manifest = open_manifest(index_file, metadata_file)
+    assert manifest["generation"] == 1
+    assert manifest["base"]["ntotal"] == 20
+    assert not staged_leftovers(index_file, metadata_file)
+    assert faiss.read_index(index_file).ntotal == 20
+
+
+def test_torn_wal_line_is_ignored(store_files):
+    index_file, metadata_file = store_files
+    segment = {"name": "000001", "ntotal": 4, "last_id": 12, "created_at": ""}
+    append_wal(index_file, {"op": "segment_begin", "segment": segment})
+    with open(wal_path(index_file), 'a', encoding='utf-8') as f:
+        f.write('{"op": "segment_com')
+
+    assert [record["op"] for record in read_wal(index_file)] == ["segment_begin"]
+    manifest = open_manifest(index_file, metadata_file)
+    assert manifest["segments"] == []
+    assert not os.path.exists(wal_path(index_file))
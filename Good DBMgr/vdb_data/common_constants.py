@@ -1,12 +1,23 @@
 import os
+import sys
 
 # 프로젝트 루트 디렉토리 찾기
 PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+# 웹 앱과 같이 쓰는 저장 형식 모듈(프로젝트 루트의 spot_store)을 불러올 수 있도록 경로에 추가
+if PROJECT_ROOT not in sys.path:
+    sys.path.append(PROJECT_ROOT)
+
 # vdb_data 디렉토리 경로 (현재 파일의 디렉토리)
 VDB_DATA_DIR = os.path.dirname(os.path.abspath(__file__))
 
 # last_id.json 파일 경로
 ID_FILE_PATH = os.path.join(VDB_DATA_DIR, "last_id.json")
 
+# 이미 크롤링한 블로그 링크 목록 (페이지 수집 모드에서 중복 크롤링 방지)
+SEEN_URLS_PATH = os.path.join(VDB_DATA_DIR, "seen_urls.sqlite3")
+
+# 임베딩 영구 캐시 경로 (프로젝트 루트의 embedding_cache, 웹 앱과 같이 사용)
+EMBEDDING_CACHE_DIR = os.path.join(PROJECT_ROOT, "embedding_cache")
+
 # 기타 공통으로 사용할 상수들을 따로 빼서 저장하자
\ No newline at end of file
@@ -8,3 +8,6 @@ load_dotenv()
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 NAVER_MAP_CLIENT_ID = os.getenv("NAVER_MAP_CLIENT_ID")
 NAVER_MAP_CLIENT_SECRET = os.getenv("NAVER_MAP_CLIENT_SECRET")
+
+# POST /reload 토큰 (설정하면 X-Reload-Token 헤더가 같아야 하고, 없으면 같은 컴퓨터(localhost)의 요청만 허용)
+SPOT_RELOAD_TOKEN = os.getenv("SPOT_RELOAD_TOKEN")
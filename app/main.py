@@ -1,15 +1,52 @@
+import asyncio
 import logging
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
 from .routers import router
+from .sessionMgr import SessionPool
+from .vectorRouter.imageMgr import image_fetcher
+from .vectorRouter.promptMgr import summary_cache, SUMMARY_CACHE_PURGE_INTERVAL
+from .vectorRouter.vectorMgr import search_resources
+from .vectorRouter.startupMgr import SPOT_WARMUP, SPOT_RELOAD_INTERVAL
 import os
 os.environ['KMP_DUPLICATE_LIB_OK']='True'
 # 로그 레벨 설정
 logging.getLogger("uvicorn.access").setLevel(logging.WARNING)
 
+# 앱 수명 동안 공유 HTTP 세션 풀을 열고 닫고, 검색 리소스를 워밍업하고 벡터 저장소 변경을 감시함 (만료된 요약 캐시도 주기적으로 정리)
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    session_pool = SessionPool()
+    await session_pool.start()
+    app.state.session_pool = session_pool
+
+    warmup_task = None
+    if SPOT_WARMUP == "blocking":
+        await search_resources.ensure_loaded_async()  # 로드가 끝나야 요청을 받음
+    elif SPOT_WARMUP == "background":
+        warmup_task = asyncio.create_task(search_resources.warmup())  # 바로 요청을 받고 뒤에서 로드
+
+    reload_task = None
+    if SPOT_RELOAD_INTERVAL > 0:
+        reload_task = asyncio.create_task(search_resources.watch())  # DBMgr가 새로 저장하면 재시작 없이 반영
+
+    purge_task = None
+    if SUMMARY_CACHE_PURGE_INTERVAL > 0:
+        purge_task = asyncio.create_task(summary_cache.purge_periodically())
+    try:
+        yield
+    finally:
+        for task in (warmup_task, reload_task, purge_task):
+            if task is not None and not task.done():
+                task.cancel()
+        await image_fetcher.close()
+        search_resources.close()
+        await session_pool.close()
+
 # FastAPI 애플리케이션 인스턴스 생성
-app = FastAPI(debug=True)
+app = FastAPI(debug=True, lifespan=lifespan)
 
 # 라우터 등록
 app.include_router(router)
@@ -1,15 +1,22 @@
-from fastapi import APIRouter, Request, Form, HTTPException
-from fastapi.responses import HTMLResponse
+from fastapi import APIRouter, Request, Form, HTTPException, Depends
+from fastapi.responses import HTMLResponse, Response, StreamingResponse, JSONResponse
 from fastapi.templating import Jinja2Templates
 from .vectorRouter.vectorMgr import search_with_rag as vector_search  # 비동기 함수 사용
+from .vectorRouter.vectorMgr import stream_search_with_rag as vector_search_stream  # 점진적 결과 스트리밍
+from .vectorRouter.vectorMgr import query_embedder, search_resources
+from .vectorRouter.imageMgr import image_cache, IMAGE_CACHE_TTL
+from .sessionMgr import SessionPool, get_session_pool
+from .vectorRouter.promptMgr import summary_cache
 from .vectorRouter.exceptions import (
     VectorSearchException,
     EmptySearchQueryException,
     NoSearchResultsException,
     EmptyVectorStoreException,
 )
-import aiohttp  # 비동기 HTTP 클라이언트
-from .config import NAVER_MAP_CLIENT_ID, NAVER_MAP_CLIENT_SECRET
+from .config import NAVER_MAP_CLIENT_ID, NAVER_MAP_CLIENT_SECRET, SPOT_RELOAD_TOKEN
+import json
+import hmac
+import asyncio
 
 # FastAPI의 APIRouter 인스턴스 생성
 router = APIRouter()
@@ -22,11 +29,12 @@ async def root(request: Request):
 
 # POST 요청을 통해 검색을 처리하는 엔드포인트에 하이브리드 검색 추가
 @router.post("/search/", response_class=HTMLResponse)
-async def search_restaurant(request: Request, search_input: str = Form(...)):
+async def search_restaurant(request: Request, search_input: str = Form(...),
+                            session_pool: SessionPool = Depends(get_session_pool)):
     print(f"검색 입력: {search_input}")
     try:
         # 비동기 함수 호출 시 await 사용
-        results = await vector_search(search_input)
+        results = await vector_search(search_input, session=session_pool.session)
     except EmptySearchQueryException as e:
         raise HTTPException(status_code=400, detail=str(e))
     except NoSearchResultsException as e:
@@ -47,24 +55,120 @@ async def search_restaurant(request: Request, search_input: str = Form(...)):
         "search_input": search_input
     })
 
+# 결과 페이지를 먼저 띄우고 results.js가 /search/stream 으로 결과를 받아 점진적으로 그리는 엔드포인트
+@router.get("/search/live", response_class=HTMLResponse)
+async def search_restaurant_live(request: Request, search_input: str):
+    return templates.TemplateResponse("results.html", {
+        "request": request,
+        "results": [],
+        "stream": True,
+        "search_input": search_input
+    })
+
+# 검색 결과를 NDJSON(한 줄에 이벤트 하나)으로 스트리밍하는 엔드포인트
+@router.get("/search/stream")
+async def search_restaurant_stream(search_input: str, session_pool: SessionPool = Depends(get_session_pool)):
+    print(f"스트리밍 검색 입력: {search_input}")
+
+    async def event_lines():
+        try:
+            async for event in vector_search_stream(search_input, session=session_pool.session):
+                yield json.dumps(event, ensure_ascii=False) + "\n"
+        except EmptySearchQueryException as e:
+            yield json.dumps({"type": "error", "status": 400, "detail": str(e)}, ensure_ascii=False) + "\n"
+        except NoSearchResultsException as e:
+            yield json.dumps({"type": "error", "status": 404, "detail": str(e)}, ensure_ascii=False) + "\n"
+        except VectorSearchException as e:
+            yield json.dumps({"type": "error", "status": 500, "detail": str(e)}, ensure_ascii=False) + "\n"
+        except Exception as e:
+            print(f"예상치 못한 오류 발생: {str(e)}")
+            yield json.dumps({"type": "error", "status": 500, "detail": "서버 내부 오류가 발생했습니다."}, ensure_ascii=False) + "\n"
+
+    # 응답이 중간 프록시에서 버퍼링되지 않도록 설정
+    return StreamingResponse(event_lines(), media_type="application/x-ndjson",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
 # 네이버 지오코딩을 처리하는 엔드포인트 추가
 @router.get("/geocode")
-async def geocode(address: str):
+async def geocode(address: str, session_pool: SessionPool = Depends(get_session_pool)):
     headers = {
         "X-NCP-APIGW-API-KEY-ID": NAVER_MAP_CLIENT_ID,
         "X-NCP-APIGW-API-KEY": NAVER_MAP_CLIENT_SECRET
     }
 
     try:
-        # aiohttp를 사용하여 비동기 HTTP 요청
-        async with aiohttp.ClientSession() as session:
-            async with session.get(
-                f"https://naveropenapi.apigw.ntruss.com/map-geocode/v2/geocode?query={address}",
-                headers=headers
-            ) as response:
-                if response.status == 200:
-                    return await response.json()
-                else:
-                    raise HTTPException(status_code=response.status, detail="네이버 API 호출 실패")
+        # 공유 세션 풀을 사용하여 비동기 HTTP 요청
+        async with session_pool.session.get(
+            f"https://naveropenapi.apigw.ntruss.com/map-geocode/v2/geocode?query={address}",
+            headers=headers
+        ) as response:
+            if response.status == 200:
+                return await response.json()
+            else:
+                raise HTTPException(status_code=response.status, detail="네이버 API 호출 실패")
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+
+# 준비 상태 확인 (검색 리소스 로드 전에는 503, 단계별 로드 시간 포함)
+@router.get("/ready")
+async def ready():
+    status = search_resources.status()
+    return JSONResponse(content=status, status_code=200 if status["ready"] else 503)
+
+# /reload 호출 권한 확인 (SPOT_RELOAD_TOKEN이 있으면 토큰, 없으면 localhost만 허용)
+LOCAL_HOSTS = ("127.0.0.1", "::1", "localhost")
+
+def require_reload_permission(request: Request):
+    if SPOT_RELOAD_TOKEN:
+        token = request.headers.get("X-Reload-Token", "")
+        if not hmac.compare_digest(token.encode("utf-8"), SPOT_RELOAD_TOKEN.encode("utf-8")):
+            raise HTTPException(status_code=403, detail="다시 로드할 권한이 없습니다.")
+    elif request.client is None or request.client.host not in LOCAL_HOSTS:
+        raise HTTPException(status_code=403, detail="SPOT_RELOAD_TOKEN이 없으면 localhost에서만 다시 로드할 수 있습니다.")
+
+# 벡터 저장소를 바로 다시 로드 (보통은 lifespan의 감시 태스크가 파일 변경을 보고 자동으로 다시 로드함)
+@router.post("/reload", dependencies=[Depends(require_reload_permission)])
+async def reload_vector_store(force: bool = False):
+    if not search_resources.status()["ready"]:
+        raise HTTPException(status_code=503, detail="검색 리소스가 아직 로드되지 않았습니다.")
+    reloaded = await asyncio.to_thread(search_resources.reload_if_changed, force)
+    status = search_resources.status()
+    return {"reloaded": reloaded, "index_version": status["index_version"], "chunks": status["chunks"],
+            "error": status["reload_error"]}
+
+# 공유 HTTP 세션 풀 지표 (진행 중 요청, 커넥션 대기, 재사용 비율)
+@router.get("/metrics/http-pool")
+async def http_pool_metrics(session_pool: SessionPool = Depends(get_session_pool)):
+    return session_pool.metrics()
+
+# 요약 캐시 지표 (적중/미스 횟수)
+@router.get("/metrics/summary-cache")
+async def summary_cache_metrics():
+    return summary_cache.stats()
+
+# 검색어 임베딩 캐시/배칭 지표
+@router.get("/metrics/query-embedding")
+async def query_embedding_metrics():
+    return query_embedder.stats()
+
+# 검색어 NER 캐시/배칭 지표
+@router.get("/metrics/ner")
+async def ner_metrics():
+    if search_resources.ner_worker is None:
+        return {"loaded": False}
+    return search_resources.ner_worker.stats()
+
+# 캐시된 가게 이미지를 내려주는 엔드포인트 (검색 결과 HTML에 base64를 인라인하지 않기 위함)
+@router.get("/img/{image_key}")
+async def cached_image(image_key: str):
+    if not image_cache.is_valid_key(image_key):
+        raise HTTPException(status_code=404, detail="이미지를 찾을 수 없습니다.")
+
+    cached = await image_cache.get(image_key)
+    if cached is None:
+        raise HTTPException(status_code=404, detail="이미지를 찾을 수 없습니다.")
+
+    content, content_type = cached
+    return Response(content=content, media_type=content_type,
+                    headers={"Cache-Control": f"public, max-age={IMAGE_CACHE_TTL}",
+                             "X-Content-Type-Options": "nosniff"})
@@ -0,0 +1,121 @@
+# sessionMgr.py
+import os
+import aiohttp
+from fastapi import Request
+from dotenv import load_dotenv
+
+# 코드 설명 요약:
+# 앱 전체에서 하나의 aiohttp ClientSession(커넥션 풀)을 공유합니다.
+# 요약 생성(OpenAI), 지오코딩(네이버), 이미지 요청이 매번 TCP/TLS 연결을 새로 맺지 않도록 keep-alive와 DNS 캐시를 사용합니다.
+# TraceConfig로 진행 중 요청 수, 커넥션 대기 수, 커넥션 재사용 비율을 집계합니다.
+
+load_dotenv()
+
+HTTP_POOL_LIMIT = int(os.getenv("HTTP_POOL_LIMIT", 100))  # 전체 동시 커넥션 수
+HTTP_POOL_LIMIT_PER_HOST = int(os.getenv("HTTP_POOL_LIMIT_PER_HOST", 20))  # 호스트별 동시 커넥션 수
+HTTP_POOL_KEEPALIVE = float(os.getenv("HTTP_POOL_KEEPALIVE", 30))  # 유휴 커넥션 유지 시간 (초)
+HTTP_POOL_DNS_TTL = int(os.getenv("HTTP_POOL_DNS_TTL", 300))  # DNS 캐시 유지 시간 (초)
+HTTP_POOL_TIMEOUT = float(os.getenv("HTTP_POOL_TIMEOUT", 30))  # 요청 기본 타임아웃 (초)
+
+
+class SessionPool:
+    def __init__(self, limit=HTTP_POOL_LIMIT, limit_per_host=HTTP_POOL_LIMIT_PER_HOST,
+                 keepalive_timeout=HTTP_POOL_KEEPALIVE, dns_ttl=HTTP_POOL_DNS_TTL, timeout=HTTP_POOL_TIMEOUT):
+        """
+        lifespan 동안 유지되는 공유 HTTP 세션
+        :param limit: 전체 동시 커넥션 수
+        :param limit_per_host: 호스트별 동시 커넥션 수
+        :param keepalive_timeout: 유휴 커넥션 유지 시간 (초)
+        :param dns_ttl: DNS 캐시 유지 시간 (초)
+        :param timeout: 요청 기본 타임아웃 (초)
+        """
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.keepalive_timeout = keepalive_timeout
+        self.dns_ttl = dns_ttl
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+        self.session = None
+
+        # 풀 지표
+        self.inflight = 0
+        self.queued = 0
+        self.requests = 0
+        self.failures = 0
+        self.created_connections = 0
+        self.reused_connections = 0
+
+    def _trace_config(self):
+        trace_config = aiohttp.TraceConfig()
+
+        async def on_request_start(session, context, params):
+            self.inflight += 1
+            self.requests += 1
+
+        async def on_request_end(session, context, params):
+            self.inflight -= 1
+
+        async def on_request_exception(session, context, params):
+            self.inflight -= 1
+            self.failures += 1
+
+        async def on_queued_start(session, context, params):
+            self.queued += 1
+
+        async def on_queued_end(session, context, params):
+            self.queued -= 1
+
+        async def on_connection_create_end(session, context, params):
+            self.created_connections += 1
+
+        async def on_connection_reuseconn(session, context, params):
+            self.reused_connections += 1
+
+        trace_config.on_request_start.append(on_request_start)
+        trace_config.on_request_end.append(on_request_end)
+        trace_config.on_request_exception.append(on_request_exception)
+        trace_config.on_connection_queued_start.append(on_queued_start)
+        trace_config.on_connection_queued_end.append(on_queued_end)
+        trace_config.on_connection_create_end.append(on_connection_create_end)
+        trace_config.on_connection_reuseconn.append(on_connection_reuseconn)
+        return trace_config
+
+    async def start(self):
+        if self.session is not None and not self.session.closed:
+            return self.session
+        connector = aiohttp.TCPConnector(
+            limit=self.limit,
+            limit_per_host=self.limit_per_host,
+            keepalive_timeout=self.keepalive_timeout,
+            use_dns_cache=True,
+            ttl_dns_cache=self.dns_ttl,
+        )
+        self.session = aiohttp.ClientSession(connector=connector, timeout=self.timeout,
+                                             trace_configs=[self._trace_config()])
+        return self.session
+
+    async def close(self):
+        if self.session is not None and not self.session.closed:
+            await self.session.close()
+        self.session = None
+
+    def metrics(self):
+        """
+        현재 풀 상태를 반환합니다.
+        """
+        connections = self.created_connections + self.reused_connections
+        return {
+            "inflight": self.inflight,
+            "queued": self.queued,
+            "requests": self.requests,
+            "failures": self.failures,
+            "created_connections": self.created_connections,
+            "reused_connections": self.reused_connections,
+            "reuse_ratio": self.reused_connections / connections if connections else 0.0,
+            "limit": self.limit,
+            "limit_per_host": self.limit_per_host,
+        }
+
+
+# FastAPI 의존성: lifespan에서 만든 공유 세션 풀을 꺼내줌
+def get_session_pool(request: Request) -> SessionPool:
+    return request.app.state.session_pool
@@ -53,8 +53,10 @@ document.addEventListener("DOMContentLoaded", function() {
     const nextBtn = document.getElementById('nextBtn');
     let currentIndex = 0;
 
-    // 슬라이더 아이템 개수
-    const totalItems = document.querySelectorAll('.slider-item').length;
+    // 슬라이더 아이템 개수 (스트리밍 모드에서는 결과가 나중에 추가되므로 매번 계산)
+    function getTotalItems() {
+        return document.querySelectorAll('.slider-item').length;
+    }
 
     // 사용자 위치 저장 변수
     let userLatitude = NaN;
@@ -83,7 +85,7 @@ document.addEventListener("DOMContentLoaded", function() {
 
     // 다음 버튼 클릭
     nextBtn.addEventListener('click', function() {
-        if (currentIndex < totalItems - 1) {
+        if (currentIndex < getTotalItems() - 1) {
             currentIndex++;
             moveSlider(currentIndex);
         }
@@ -343,6 +345,149 @@ document.addEventListener("DOMContentLoaded", function() {
         }
     }
 
-    // API 로드 확인 시작
-    checkNaverMapsAPI();
+    // 스트리밍 결과 카드 생성 함수 (results.html의 슬라이드 마크업과 동일)
+    function createSliderItem(result, index) {
+        const sliderItem = document.createElement('div');
+        sliderItem.classList.add('slider-item');
+        sliderItem.dataset.index = index;
+        sliderItem.dataset.address = result.address;
+
+        const itemContent = document.createElement('div');
+        itemContent.classList.add('item-content');
+
+        // 가게 이름과 이미지
+        const itemHeader = document.createElement('div');
+        itemHeader.classList.add('item-header');
+        const title = document.createElement('h2');
+        title.textContent = result.name;
+        const itemImage = document.createElement('div');
+        itemImage.classList.add('item-image');
+        const image = document.createElement('img');
+        image.src = result.image || '/static/default-image.png';
+        image.alt = result.name;
+        itemImage.appendChild(image);
+        itemHeader.append(title, itemImage);
+
+        // 텍스트 내용 (요약은 도착하면 채움)
+        const itemText = document.createElement('div');
+        itemText.classList.add('item-text');
+        const summary = document.createElement('p');
+        summary.classList.add('summary');
+        summary.textContent = result.summary || '요약을 생성하는 중...';
+        itemText.appendChild(summary);
+
+        // 지도와 가게 정보
+        const mapContainer = document.createElement('div');
+        mapContainer.id = `map-container-${index}`;
+        mapContainer.classList.add('map-container');
+        const mapDiv = document.createElement('div');
+        mapDiv.id = `map-${index}`;
+        mapDiv.classList.add('map');
+        const storeInfo = document.createElement('div');
+        storeInfo.classList.add('store-info');
+        const storeName = document.createElement('strong');
+        storeName.textContent = result.name;
+        const storeAddress = document.createElement('span');
+        storeAddress.textContent = result.address;
+        storeInfo.append(storeName, document.createElement('br'), storeAddress);
+        mapContainer.append(mapDiv, storeInfo);
+
+        // 버튼
+        const buttonBox = document.createElement('div');
+        buttonBox.classList.add('button-box');
+        const linkButton = document.createElement('a');
+        linkButton.href = result.link;
+        linkButton.classList.add('link-button');
+        linkButton.target = '_blank';
+        linkButton.textContent = '블로그로 이동';
+        const newSearchButton = document.createElement('a');
+        newSearchButton.href = '/';
+        newSearchButton.classList.add('button');
+        newSearchButton.textContent = '새로운 검색하기';
+        buttonBox.append(linkButton, newSearchButton);
+
+        itemContent.append(itemHeader, itemText, mapContainer, buttonBox);
+        sliderItem.appendChild(itemContent);
+        return sliderItem;
+    }
+
+    // 스트리밍 안내 메시지 표시 함수
+    function showStreamMessage(message) {
+        const messageElement = document.createElement('p');
+        messageElement.classList.add('stream-message');
+        messageElement.textContent = message;
+        sliderWrapper.appendChild(messageElement);
+    }
+
+    // 스트리밍 이벤트 처리 함수
+    function applyStreamEvent(event) {
+        const sliderItems = document.querySelectorAll('.slider-item');
+
+        if (event.type === 'results') {
+            if (event.results.length === 0) {
+                showStreamMessage('검색 결과가 없습니다.');
+                return;
+            }
+            event.results.forEach((result, index) => {
+                sliderWrapper.appendChild(createSliderItem(result, index));
+            });
+            // 카드가 생긴 뒤 첫 번째 지도 렌더링
+            checkNaverMapsAPI();
+        } else if (event.type === 'summary' && sliderItems[event.index]) {
+            // 서버가 <br>로 줄바꿈한 요약을 그대로 표시 (템플릿의 | safe 와 동일)
+            sliderItems[event.index].querySelector('.summary').innerHTML = event.summary;
+        } else if (event.type === 'image' && sliderItems[event.index] && event.image) {
+            sliderItems[event.index].querySelector('.item-image img').src = event.image;
+        } else if (event.type === 'error') {
+            console.error(`검색 중 오류 발생 (${event.status}): ${event.detail}`);
+            showStreamMessage(event.detail);
+        }
+    }
+
+    // /search/stream 의 NDJSON 응답을 한 줄씩 읽어서 처리하는 함수
+    function startStreaming(query) {
+        const decoder = new TextDecoder();
+        let buffer = '';
+
+        function handleLines(lines) {
+            lines.forEach(line => {
+                if (line.trim()) {
+                    applyStreamEvent(JSON.parse(line));
+                }
+            });
+        }
+
+        fetch(`/search/stream?search_input=${encodeURIComponent(query)}`)
+            .then(response => {
+                const reader = response.body.getReader();
+
+                function read() {
+                    return reader.read().then(({ done, value }) => {
+                        if (done) {
+                            handleLines([buffer]);
+                            return;
+                        }
+                        buffer += decoder.decode(value, { stream: true });
+                        const lines = buffer.split('\n');
+                        buffer = lines.pop();  // 아직 끝나지 않은 마지막 줄은 다음 청크와 합침
+                        handleLines(lines);
+                        return read();
+                    });
+                }
+
+                return read();
+            })
+            .catch(error => {
+                console.error("스트리밍 검색 중 오류 발생:", error);
+                showStreamMessage('검색 중 오류가 발생했습니다.');
+            });
+    }
+
+    // 스트리밍 모드면 결과를 받아온 뒤, 아니면 바로 API 로드 확인 시작
+    const streamQuery = sliderWrapper.dataset.streamQuery;
+    if (streamQuery) {
+        startStreaming(streamQuery);
+    } else {
+        checkNaverMapsAPI();
+    }
 });
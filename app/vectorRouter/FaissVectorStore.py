@@ -1,41 +1,208 @@
-import pickle
 import faiss
 import os
+import copy
+import json
+import logging
 import numpy as np
+from dotenv import load_dotenv
+from spot_store.metadataStore import load_metadata, metadata_exists, data_id_column, ColumnarMetadata, ChainedMetadata
+from spot_store.segmentStore import read_manifest, segment_files, base_update_pending
+from spot_store.entityIndex import EntityIndex, entity_index_path, ensure_direct_map
+
+load_dotenv()
+
+FAISS_MMAP = os.getenv("FAISS_MMAP", "1") == "1"  # 인덱스/메타데이터를 메모리 맵으로 열어 워커끼리 페이지 캐시를 공유
 
 class FaissVectorStore:
-    def __init__(self, index_file="spot_index.bin", metadata_file="spot_metadata.pkl"):
+    def __init__(self, index_file="spot_index.bin", metadata_file="spot_metadata.pkl", use_mmap=FAISS_MMAP):
         """
         FaissVectorStore 클래스를 초기화합니다.
         :param index_file: Faiss 인덱스를 저장할 파일 이름
         :param metadata_file: 메타데이터를 저장할 파일 이름
+        :param use_mmap: 인덱스와 메타데이터를 메모리 맵으로 열지 여부
         """
         self.index_file = index_file
         self.metadata_file = metadata_file
+        self.use_mmap = use_mmap
         self.index = None
         self.metadata = list()
         self.dim = None  
+        self.search_params = dict()  # DBMgr가 인덱스와 함께 저장한 검색 파라미터 (nprobe, ef_search)
+        self.chunk_positions = dict()  # data_id -> 해당 가게의 청크 위치 배열
+        self.last_positions = dict()  # data_id -> 해당 가게의 마지막 청크 위치 (가게 정보 조회용)
+        self.manifest = None  # DBMgr가 쓴 세그먼트 매니페스트 (세그먼트 이전 저장소면 None)
+        self.segments = list()  # (세그먼트 이름, 인덱스) - 기본 인덱스 뒤에 이어지는 추가 세그먼트
+        self.entities = None  # 가게 단위 인덱스 (기본 세그먼트 파일 + 추가 세그먼트 청크)
         self.load_index()
 
     def load_index(self):
         """
         저장된 인덱스와 메타데이터를 로드합니다. 파일이 없으면 새 인덱스를 생성합니다.
+        매니페스트에 추가 세그먼트가 있으면 같이 열고, 메타데이터 행 번호는 기본 세그먼트 뒤로 이어집니다.
+        가게 단위 인덱스도 같이 열고, 추가 세그먼트의 청크를 이어 붙입니다.
         """
-        if os.path.exists(self.index_file) and os.path.exists(self.metadata_file):
-            self.index = faiss.read_index(self.index_file)
+        if os.path.exists(self.index_file) and metadata_exists(self.metadata_file):
+            self.manifest = read_manifest(self.index_file)
+            if base_update_pending(self.index_file, self.manifest):
+                raise RuntimeError("DBMgr가 기본 인덱스를 교체하는 중입니다. 잠시 후 다시 시도하세요.")
+            self.index = self.read_index(self.index_file)
             self.dim = self.index.d
-            with open(self.metadata_file, 'rb') as f:
-                self.metadata = pickle.load(f)
+            self.metadata = load_metadata(self.metadata_file, use_mmap=self.use_mmap)
+            self.search_params = self.load_search_params()
+            ensure_direct_map(self.index)  # 후보 가게의 청크를 행 번호로 꺼내서 다시 계산하기 위해 필요 (IVF)
+            self.entities = self.load_entities()
+            self.segments = list()
+            if self.manifest:
+                self.load_segments(self.manifest["segments"])
         else:
             self.index = None
             self.dim = None
+            self.entities = None
+        self.build_lookup()
+
+    def read_index(self, index_file):
+        """
+        메모리 맵(IO_FLAG_MMAP)으로 인덱스를 엽니다. 인덱스 종류가 지원하지 않으면 일반 방식으로 읽습니다.
+        (IVF 계열은 역리스트가 파일에 매핑되고, Flat은 FAISS 버전에 따라 메모리로 읽힐 수 있음)
+        """
+        if self.use_mmap:
+            try:
+                return faiss.read_index(index_file, faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY)
+            except RuntimeError as e:
+                logging.warning(f"인덱스를 메모리 맵으로 열지 못해 일반 방식으로 읽습니다: {str(e)}")
+        return faiss.read_index(index_file)
+
+    def load_segments(self, segments):
+        """
+        추가 세그먼트(Flat 인덱스 + 컬럼 메타데이터)를 열어서 기존 세그먼트 뒤에 붙입니다.
+        기존 메타데이터/세그먼트 목록은 고치지 않고 새 객체로 바꿔 끼웁니다. (with_new_segments의 이전 저장소와 공유)
+        :param segments: 매니페스트의 세그먼트 항목 리스트
+        """
+        opened = []
+        parts = []
+        entities = self.entities
+        for segment in segments:
+            index_file, metadata_file = segment_files(self.index_file, segment["name"])
+            opened.append((segment["name"], self.read_index(index_file)))
+            parts.append(load_metadata(metadata_file, use_mmap=self.use_mmap))
+            entities = EntityIndex.from_index(parts[-1], opened[-1][1], base=entities)
+        if not opened:
+            return
+        self.entities = entities
+        base_parts = self.metadata.parts if isinstance(self.metadata, ChainedMetadata) else [self.metadata]
+        self.metadata = ChainedMetadata(base_parts + parts)
+        self.segments = self.segments + opened
+
+    def with_new_segments(self):
+        """
+        매니페스트를 다시 읽고, 새로 추가된 세그먼트만 연 새 저장소를 반환합니다.
+        기본 인덱스/기존 세그먼트/메타데이터는 새 저장소와 같이 쓰고 이 저장소는 바꾸지 않으므로
+        이 저장소로 검색 중인 요청은 그대로 끝까지 진행됩니다.
+        :return: 새 저장소 (새 세그먼트가 없으면 self, 매니페스트가 없거나 기본 세그먼트가 바뀌어서 전체를 다시 로드해야 하면 None)
+        """
+        manifest = read_manifest(self.index_file)
+        if manifest is None or self.index is None:
+            return None
+        generation = self.manifest["generation"] if self.manifest else 0
+        if manifest["generation"] != generation:
+            return None
+        loaded = {name for name, _ in self.segments}
+        new_segments = [segment for segment in manifest["segments"] if segment["name"] not in loaded]
+        if not new_segments:
+            return self
+
+        store = copy.copy(self)
+        store.load_segments(new_segments)
+        store.build_lookup()
+        store.manifest = manifest
+        return store
+
+    def load_entities(self):
+        """
+        DBMgr가 기본 세그먼트와 함께 저장한 가게 인덱스(<인덱스 이름>.entities.npz)를 읽습니다.
+        파일이 없거나 기본 인덱스와 행 수가 다르면 (예전 저장소, 병합 결과) 기본 인덱스의 벡터로 새로 만듭니다.
+        """
+        path = entity_index_path(self.index_file)
+        if os.path.exists(path):
+            try:
+                entities = EntityIndex.read(path)
+                if entities.chunk_count == self.index.ntotal:
+                    return entities
+                logging.warning("가게 인덱스의 행 수가 기본 인덱스와 달라서 새로 만듭니다.")
+            except (OSError, ValueError, KeyError) as e:
+                logging.warning(f"가게 인덱스를 읽지 못해 새로 만듭니다: {str(e)}")
+        else:
+            logging.info("가게 인덱스 파일이 없어서 기본 인덱스의 벡터로 만듭니다.")
+        return EntityIndex.from_index(self.metadata, self.index)
 
-    def search(self, query_vector, k=5, nprobe=10):
+    def load_search_params(self):
+        """
+        인덱스 파일 옆 <인덱스 이름>.params.json에서 검색 파라미터를 읽습니다. (DBMgr 저장 탭에서 생성)
+        """
+        path = f"{os.path.splitext(self.index_file)[0]}.params.json"
+        if not os.path.exists(path):
+            return dict()
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f).get("params", dict())
+        except (OSError, ValueError) as e:
+            logging.warning(f"인덱스 파라미터를 읽지 못했습니다: {str(e)}")
+            return dict()
+
+    def build_lookup(self):
+        """
+        data_id 배열만으로 가게별 청크 위치 조회 테이블을 만듭니다. (행 내용은 역직렬화하지 않음)
+        검색할 때마다 전체 메타데이터를 다시 도는 일을 없애기 위해 로드 시점에 한 번만 수행합니다.
+        """
+        data_ids = data_id_column(self.metadata)
+        order = np.argsort(data_ids, kind="stable")  # 같은 data_id 안에서는 메타데이터 순서 유지
+        unique_ids, starts = np.unique(data_ids[order], return_index=True)
+        groups = np.split(order.astype(np.int64), starts[1:]) if len(order) else []
+
+        self.chunk_positions = {int(data_id): group for data_id, group in zip(unique_ids, groups)}
+        self.last_positions = {data_id: int(group[-1]) for data_id, group in self.chunk_positions.items()}
+
+    def get_store_info(self, data_id):
+        """
+        data_id의 가게 정보 (link, name, img, address)를 반환합니다. 마지막 청크의 값을 사용합니다.
+        """
+        position = self.last_positions.get(data_id)
+        if position is None:
+            return {}
+        meta = self.metadata[position]
+        return {
+            "link": meta.get("link", ""),
+            "name": meta.get("name", "Unknown"),
+            "img": meta.get("img"),
+            "address": meta.get("address", "Unknown"),
+        }
+
+    def close(self):
+        """
+        메모리 맵으로 연 메타데이터를 닫습니다.
+        """
+        if isinstance(self.metadata, (ColumnarMetadata, ChainedMetadata)):
+            self.metadata.close()
+
+    def get_chunk_contents(self, data_id):
+        """
+        data_id에 속한 청크 내용을 메타데이터 순서대로 반환합니다.
+        :param data_id: 가게 데이터 아이디
+        :return: 비어 있지 않은 chunk_content 리스트
+        """
+        contents = []
+        for position in self.chunk_positions.get(data_id, ()):
+            chunk_content = self.metadata[position].get("chunk_content", "")
+            if chunk_content:
+                contents.append(chunk_content)
+        return contents
+
+    def search(self, query_vector, k=5, nprobe=None):
         """
         주어진 쿼리 벡터와 가장 유사한 k개의 벡터를 검색합니다.
         :param query_vector: 검색할 쿼리 벡터
         :param k: 반환할 결과의 개수
-        :param nprobe: 검색 시 탐색할 클러스터의 개수 (IVF 인덱스에만 적용)
+        :param nprobe: 검색 시 탐색할 클러스터의 개수 (IVF 인덱스에만 적용, 없으면 저장된 값 또는 10)
         :return: 거리와 인덱스의 튜플
         """
         if self.index is None:
@@ -48,13 +215,54 @@ class FaissVectorStore:
             raise ValueError(f"쿼리 벡터의 차원({query_vector.shape[1]})이 인덱스의 차원({self.dim})과 일치하지 않습니다.")
         
         # nprobe 설정 (IVF 인덱스에 사용하여 검색 정확도 및 속도 조절)
-        if isinstance(self.index, faiss.IndexIVF):
-            self.index.nprobe = nprobe
+        index = faiss.downcast_index(self.index)
+        if isinstance(index, faiss.IndexIVF):
+            index.nprobe = nprobe or self.search_params.get("nprobe", 10)
+        elif isinstance(index, faiss.IndexHNSW) and self.search_params.get("ef_search"):
+            index.hnsw.efSearch = self.search_params["ef_search"]
         
         # 멀티 스레딩 설정 (FAISS는 기본적으로 단일 스레드를 사용)
         faiss.omp_set_num_threads(os.cpu_count())
         
         # 검색 수행
         distances, indices = self.index.search(query_vector, k)
+        if self.segments:
+            distances, indices = self.search_segments(query_vector, k, distances, indices)
         return distances, indices
 
+    def chunk_distances(self, query_vector, rows):
+        """
+        청크 행 번호들의 벡터를 꺼내서 쿼리와의 L2 거리 제곱을 계산합니다. (추가 세그먼트 행 포함)
+        :param rows: 메타데이터 행 번호 배열
+        :return: rows와 같은 순서의 거리 배열
+        """
+        query_vector = np.asarray(query_vector, dtype=np.float32).reshape(1, -1)
+        vectors = np.empty((len(rows), self.dim), dtype=np.float32)
+        start = 0
+        for index in [self.index] + [segment_index for _, segment_index in self.segments]:
+            inside = (rows >= start) & (rows < start + index.ntotal)
+            if inside.any():
+                vectors[inside] = index.reconstruct_batch(rows[inside] - start)
+            start += index.ntotal
+        return ((vectors - query_vector) ** 2).sum(axis=1)
+
+    def search_segments(self, query_vector, k, distances, indices):
+        """
+        추가 세그먼트도 각각 검색해서 기본 인덱스 결과와 거리순으로 합칩니다.
+        세그먼트 결과의 번호에는 앞 세그먼트들의 벡터 수를 더해서 메타데이터 행 번호와 맞춥니다.
+        """
+        all_distances = [distances]
+        all_indices = [indices]
+        offset = self.index.ntotal
+        for _, segment_index in self.segments:
+            segment_distances, segment_indices = segment_index.search(query_vector, k)
+            all_distances.append(segment_distances)
+            all_indices.append(np.where(segment_indices >= 0, segment_indices + offset, -1))
+            offset += segment_index.ntotal
+
+        distances = np.concatenate(all_distances, axis=1)
+        indices = np.concatenate(all_indices, axis=1)
+        distances[indices < 0] = np.finfo(np.float32).max  # 결과가 모자라서 채운 -1은 맨 뒤로
+        order = np.argsort(distances, axis=1, kind="stable")[:, :k]
+        return np.take_along_axis(distances, order, axis=1), np.take_along_axis(indices, order, axis=1)
+
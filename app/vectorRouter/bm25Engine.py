@@ -0,0 +1,257 @@
+# bm25Engine.py
+import os
+import logging
+from collections import Counter
+import numpy as np
+from app.vectorRouter.tokenizer import corpus_signature, load_or_build_tokenized_corpus
+
+# 코드 설명 요약:
+# rank_bm25의 BM25Okapi와 같은 점수를 내는 역색인(inverted index) 기반 BM25 엔진입니다.
+# 토큰별 포스팅(문서 번호, 미리 계산한 tf 가중치)을 NumPy 배열(CSR 형태)로 저장해서
+# 검색어 토큰이 들어 있는 문서만 계산하고, top_k는 MaxScore 방식으로 가망 없는 문서를 건너뜁니다.
+# 만든 역색인은 인덱스 파일 옆에 저장해서 서버를 다시 띄울 때 그대로 불러옵니다.
+
+
+class SparseBM25:
+    def __init__(self, tokenized_corpus=None, k1=1.5, b=0.75, epsilon=0.25):
+        """
+        토큰화된 코퍼스로 역색인을 만듭니다.
+        :param tokenized_corpus: 문서별 토큰 리스트의 리스트
+        :param k1: BM25 k1 파라미터
+        :param b: BM25 b 파라미터
+        :param epsilon: 음수 IDF를 평균 IDF * epsilon 으로 바꿀 때 쓰는 값 (BM25Okapi와 동일)
+        """
+        self.k1 = k1
+        self.b = b
+        self.epsilon = epsilon
+        self.vocab = dict()  # 토큰 -> 토큰 번호
+        self.corpus_size = 0
+        self.avgdl = 0.0
+        self.doc_lengths = np.zeros(0, dtype=np.float32)
+        self.offsets = np.zeros(1, dtype=np.int64)  # 토큰 번호 t의 포스팅 범위: offsets[t]:offsets[t+1]
+        self.doc_ids = np.zeros(0, dtype=np.int32)  # 포스팅 문서 번호
+        self.weights = np.zeros(0, dtype=np.float32)  # 포스팅별 tf*(k1+1)/(tf+k1*문서길이보정)
+        self.idf = np.zeros(0, dtype=np.float32)
+        self.max_weights = np.zeros(0, dtype=np.float32)  # 토큰별 최대 포스팅 가중치 (MaxScore 상한용)
+        if tokenized_corpus is not None:
+            self.build(tokenized_corpus)
+
+    def build(self, tokenized_corpus):
+        vocab = dict()
+        term_ids = []
+        doc_ids = []
+        tfs = []
+        for doc_id, document in enumerate(tokenized_corpus):
+            for term, tf in Counter(document).items():
+                term_ids.append(vocab.setdefault(term, len(vocab)))
+                doc_ids.append(doc_id)
+                tfs.append(tf)
+
+        doc_lengths = np.array([len(document) for document in tokenized_corpus], dtype=np.float32)
+        self.build_from_postings(vocab, np.array(term_ids, dtype=np.int64), np.array(doc_ids, dtype=np.int32),
+                                 np.array(tfs, dtype=np.float32), doc_lengths)
+
+    def build_from_token_ids(self, vocab, token_ids, doc_offsets):
+        """
+        TokenizedCorpus 형태(평평한 토큰 번호 배열 + 문서 오프셋)에서 바로 역색인을 만듭니다.
+        :param vocab: 토큰 번호 -> 토큰 문자열 리스트
+        :param token_ids: 모든 문서의 토큰 번호를 이어 붙인 배열
+        :param doc_offsets: 문서별 토큰 범위 오프셋 (문서 수 + 1)
+        """
+        vocab_size = max(len(vocab), 1)
+        doc_lengths = np.diff(doc_offsets).astype(np.float32)
+        token_docs = np.repeat(np.arange(len(doc_lengths), dtype=np.int64), np.diff(doc_offsets))
+        keys, tfs = np.unique(token_docs * vocab_size + token_ids, return_counts=True)  # (문서, 토큰) 쌍별 tf
+        self.build_from_postings({token: term_id for term_id, token in enumerate(vocab)},
+                                 (keys % vocab_size).astype(np.int64), (keys // vocab_size).astype(np.int32),
+                                 tfs.astype(np.float32), doc_lengths)
+
+    def build_from_postings(self, vocab, term_ids, doc_ids, tfs, doc_lengths):
+        """
+        (토큰 번호, 문서 번호, tf) 목록에서 CSR 포스팅과 IDF/가중치를 계산합니다.
+        """
+        self.vocab = vocab
+        self.corpus_size = len(doc_lengths)
+        self.doc_lengths = doc_lengths
+        self.avgdl = float(doc_lengths.sum() / self.corpus_size) if self.corpus_size else 0.0
+
+        vocab_size = len(vocab)
+        order = np.argsort(term_ids, kind="stable")  # 토큰별로 모으고, 같은 토큰 안에서는 문서 순서 유지
+        self.doc_ids = doc_ids[order]
+        tfs = tfs[order]
+        doc_freqs = np.bincount(term_ids, minlength=vocab_size)
+        self.offsets = np.concatenate(([0], np.cumsum(doc_freqs))).astype(np.int64)
+
+        # IDF (BM25Okapi와 동일: 음수 IDF는 평균 IDF * epsilon 으로 대체)
+        idf = np.log(self.corpus_size - doc_freqs + 0.5) - np.log(doc_freqs + 0.5)
+        average_idf = idf.sum() / vocab_size if vocab_size else 0.0
+        idf[idf < 0] = self.epsilon * average_idf
+        self.idf = idf.astype(np.float32)
+
+        # 문서 길이 보정은 색인 시점에 한 번만 계산
+        avgdl = self.avgdl if self.avgdl > 0 else 1.0
+        norms = self.k1 * (1 - self.b + self.b * self.doc_lengths[self.doc_ids] / avgdl)
+        self.weights = (tfs * (self.k1 + 1) / (tfs + norms)).astype(np.float32)
+        if vocab_size:
+            self.max_weights = np.maximum.reduceat(self.weights, self.offsets[:-1]).astype(np.float32)
+        else:
+            self.max_weights = np.zeros(0, dtype=np.float32)
+
+    def save(self, path, signature):
+        """
+        역색인 배열을 npz로 저장합니다. (쓰는 도중 읽히지 않도록 임시 파일에 쓴 뒤 교체)
+        """
+        vocab = [None] * len(self.vocab)
+        for token, term_id in self.vocab.items():
+            vocab[term_id] = token
+        tmp_path = path + ".tmp.npz"
+        np.savez(tmp_path, vocab=np.array(vocab, dtype=str), doc_lengths=self.doc_lengths, offsets=self.offsets,
+                 doc_ids=self.doc_ids, weights=self.weights, idf=self.idf, max_weights=self.max_weights,
+                 params=np.array([self.k1, self.b, self.epsilon]), signature=np.array(signature))
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path, signature):
+        """
+        저장된 역색인을 불러옵니다. 서명이 다르면(토크나이저/메타데이터 변경) None을 반환합니다.
+        """
+        with np.load(path, allow_pickle=False) as data:
+            if str(data["signature"]) != signature:
+                return None
+            k1, b, epsilon = data["params"].tolist()
+            bm25 = cls(k1=k1, b=b, epsilon=epsilon)
+            bm25.vocab = {token: term_id for term_id, token in enumerate(data["vocab"].tolist())}
+            bm25.doc_lengths = data["doc_lengths"]
+            bm25.corpus_size = len(bm25.doc_lengths)
+            bm25.avgdl = float(bm25.doc_lengths.sum() / bm25.corpus_size) if bm25.corpus_size else 0.0
+            bm25.offsets = data["offsets"]
+            bm25.doc_ids = data["doc_ids"]
+            bm25.weights = data["weights"]
+            bm25.idf = data["idf"]
+            bm25.max_weights = data["max_weights"]
+        return bm25
+
+    def _query_terms(self, query_tokens):
+        """
+        검색어 토큰을 (토큰 번호, 등장 횟수)로 바꿉니다. 색인에 없는 토큰은 점수가 0이므로 버립니다.
+        """
+        counts = Counter(self.vocab[token] for token in query_tokens if token in self.vocab)
+        return list(counts.items())
+
+    def _postings(self, term_id, query_tf):
+        start, end = self.offsets[term_id], self.offsets[term_id + 1]
+        return self.doc_ids[start:end], self.weights[start:end] * (self.idf[term_id] * query_tf)
+
+    def get_sparse_scores(self, query_tokens):
+        """
+        검색어 토큰을 하나라도 가진 문서의 점수만 계산합니다.
+        :return: (문서 번호 배열(오름차순), 점수 배열)
+        """
+        postings = [self._postings(term_id, query_tf) for term_id, query_tf in self._query_terms(query_tokens)]
+        if not postings:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float64)
+        docs = np.concatenate([p[0] for p in postings])
+        contributions = np.concatenate([p[1] for p in postings]).astype(np.float64)
+        unique_docs, inverse = np.unique(docs, return_inverse=True)
+        return unique_docs.astype(np.int64), np.bincount(inverse, weights=contributions)
+
+    def get_scores(self, query_tokens):
+        """
+        BM25Okapi.get_scores 와 같은 전체 문서 점수 배열을 반환합니다.
+        """
+        scores = np.zeros(self.corpus_size)
+        docs, values = self.get_sparse_scores(query_tokens)
+        scores[docs] = values
+        return scores
+
+    def get_doc_scores(self, query_tokens, docs):
+        """
+        주어진 문서들의 점수만 계산합니다. (토큰별 포스팅은 문서 번호 오름차순이라 이진 탐색으로 찾음)
+        :param docs: 문서 번호 배열
+        :return: docs와 같은 순서의 점수 배열
+        """
+        docs = np.asarray(docs, dtype=np.int64)
+        scores = np.zeros(len(docs), dtype=np.float64)
+        for term_id, query_tf in self._query_terms(query_tokens):
+            term_docs, contributions = self._postings(term_id, query_tf)
+            if not len(term_docs) or not len(docs):
+                continue
+            positions = np.minimum(np.searchsorted(term_docs, docs), len(term_docs) - 1)
+            hit = term_docs[positions] == docs
+            scores[hit] += contributions[positions[hit]]
+        return scores
+
+    def top_k(self, query_tokens, k):
+        """
+        MaxScore 방식으로 상위 k개 문서를 찾습니다.
+        상한이 큰 토큰부터 처리하다가, 남은 토큰 상한의 합이 현재 k번째 점수보다 작아지면
+        이후 토큰에서는 이미 후보인 문서의 점수만 갱신합니다.
+        :return: (문서 번호 배열, 점수 배열) 점수 내림차순
+        """
+        terms = self._query_terms(query_tokens)
+        if not terms or k <= 0:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float64)
+
+        upper_bounds = [self.idf[term_id] * self.max_weights[term_id] * query_tf for term_id, query_tf in terms]
+        order = np.argsort(upper_bounds)[::-1]
+        remaining_bounds = np.cumsum(np.array(upper_bounds)[order][::-1])[::-1]  # i번째 이후 토큰 상한의 합
+
+        candidate_docs = np.zeros(0, dtype=np.int64)
+        candidate_scores = np.zeros(0, dtype=np.float64)
+        threshold = -np.inf
+        for position, term_index in enumerate(order):
+            term_id, query_tf = terms[term_index]
+            docs, contributions = self._postings(term_id, query_tf)
+            docs = docs.astype(np.int64)
+            contributions = contributions.astype(np.float64)
+
+            if remaining_bounds[position] < threshold:
+                # 새 문서는 남은 토큰을 다 가져도 top-k에 못 들어가므로 기존 후보만 갱신
+                positions = np.searchsorted(candidate_docs, docs)
+                positions = np.minimum(positions, len(candidate_docs) - 1)
+                known = candidate_docs[positions] == docs
+                candidate_scores[positions[known]] += contributions[known]
+            else:
+                merged_docs = np.concatenate((candidate_docs, docs))
+                merged_scores = np.concatenate((candidate_scores, contributions))
+                candidate_docs, inverse = np.unique(merged_docs, return_inverse=True)
+                candidate_scores = np.bincount(inverse, weights=merged_scores)
+
+            if len(candidate_scores) >= k:
+                threshold = np.partition(candidate_scores, len(candidate_scores) - k)[len(candidate_scores) - k]
+
+        top = min(k, len(candidate_scores))
+        best = np.argpartition(-candidate_scores, top - 1)[:top]
+        best = best[np.argsort(-candidate_scores[best], kind="stable")]
+        return candidate_docs[best], candidate_scores[best]
+
+
+def bm25_index_path(index_file, tokenizer):
+    return f"{os.path.splitext(index_file)[0]}.bm25.{tokenizer.name}.npz"
+
+
+def load_or_build_bm25(index_file, metadata_file, corpus, tokenizer, persist=True):
+    """
+    인덱스 파일 옆에 저장된 BM25 역색인이 최신이면 불러오고, 아니면 토큰화 코퍼스로 새로 만듭니다.
+    :param persist: True면 새로 만든 역색인/토큰화 코퍼스를 파일로 저장
+    """
+    path = bm25_index_path(index_file, tokenizer)
+    signature = corpus_signature(metadata_file, len(corpus), tokenizer)
+    if persist and os.path.exists(path):
+        try:
+            bm25 = SparseBM25.load(path, signature)
+            if bm25 is not None:
+                logging.info(f"저장된 BM25 역색인을 사용합니다: {path}")
+                return bm25
+        except (OSError, ValueError, KeyError) as e:
+            logging.warning(f"BM25 역색인을 읽지 못했습니다. 다시 만듭니다: {str(e)}")
+
+    tokenized_corpus = load_or_build_tokenized_corpus(index_file, metadata_file, corpus, tokenizer, persist=persist)
+    bm25 = SparseBM25()
+    bm25.build_from_token_ids(tokenized_corpus.vocab, tokenized_corpus.token_ids, tokenized_corpus.doc_offsets)
+    if persist:
+        try:
+            bm25.save(path, signature)
+        except OSError as e:
+            logging.warning(f"BM25 역색인을 저장하지 못했습니다: {str(e)}")
+    return bm25
@@ -0,0 +1,175 @@
+# embeddingMgr.py
+import os
+import re
+import asyncio
+import logging
+import unicodedata
+import numpy as np
+from dotenv import load_dotenv
+from spot_store.embeddingStore import EmbeddingStore, EMBEDDING_STORE_MAX_BYTES
+from app.vectorRouter.lruCache import LruCache
+
+# 코드 설명 요약:
+# 검색어 임베딩을 이벤트 루프를 막지 않고 비동기로 생성합니다.
+# 정규화한 검색어 기준으로 메모리(LRU) + 디스크(EmbeddingStore, DBMgr와 같은 폴더)에 캐시하고,
+# 짧은 시간 안에 동시에 들어온 검색어들은 embed_documents 한 번으로 묶어서 요청합니다.
+
+load_dotenv()
+
+EMBEDDING_MODEL = "text-embedding-3-small"  # 검색어 임베딩 모델 (DB 생성 시 모델과 같아야 함)
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# 디스크 캐시 폴더 (DBMgr의 PROJECT_ROOT/embedding_cache와 같은 폴더, 실행 위치와 관계없이 저장소 루트 기준)
+EMBEDDING_STORE_DIR = os.getenv("EMBEDDING_STORE_DIR", os.path.join(PROJECT_ROOT, "embedding_cache"))
+EMBEDDING_STORE_MAX_MB = int(os.getenv("EMBEDDING_STORE_MAX_MB", EMBEDDING_STORE_MAX_BYTES // (1024 * 1024)))  # 모델별 최대 크기
+EMBEDDING_CACHE_MAX_ITEMS = int(os.getenv("EMBEDDING_CACHE_MAX_ITEMS", 4096))  # 메모리 LRU 최대 개수
+EMBEDDING_BATCH_MAX_SIZE = int(os.getenv("EMBEDDING_BATCH_MAX_SIZE", 16))  # 한 번에 묶을 최대 검색어 수
+EMBEDDING_BATCH_MAX_WAIT_MS = float(os.getenv("EMBEDDING_BATCH_MAX_WAIT_MS", 5))  # 묶기 위해 기다리는 최대 시간 (ms)
+
+
+# 검색어를 임베딩/캐시 키용으로 정규화하는 함수
+def normalize_query_text(text: str):
+    """
+    전각 문자와 공백 차이만 없앱니다. (어순/조사는 임베딩 결과에 영향을 주므로 유지)
+    """
+    text = unicodedata.normalize("NFKC", text)
+    return re.sub(r"\s+", " ", text).strip()
+
+
+class QueryEmbeddingCache:
+    def __init__(self, root_dir=EMBEDDING_STORE_DIR, model=EMBEDDING_MODEL, max_items=EMBEDDING_CACHE_MAX_ITEMS,
+                 max_bytes=EMBEDDING_STORE_MAX_MB * 1024 * 1024):
+        """
+        검색어 임베딩 캐시 (메모리 LRU + EmbeddingStore)
+        :param root_dir: 디스크 캐시 폴더 (모델별 하위 폴더)
+        :param model: 임베딩 모델 버전
+        :param max_items: 메모리 LRU 최대 개수
+        :param max_bytes: 디스크 캐시의 모델별 최대 크기
+        """
+        self.memory = LruCache(max_items)  # 키 -> float32 벡터
+        self.disk_hits = 0
+        self.store = EmbeddingStore(root_dir, model, max_bytes)
+
+    def make_key(self, text):
+        return self.store.make_key(text)
+
+    async def get(self, key):
+        vector = self.memory.get(key)
+        if vector is not None:
+            return vector
+        vector = await asyncio.to_thread(self.store.get, key)
+        if vector is None:
+            return None
+        self.memory.put(key, vector)
+        self.disk_hits += 1
+        return vector
+
+    @property
+    def hits(self):
+        return self.memory.hits + self.disk_hits
+
+    @property
+    def misses(self):
+        return self.memory.misses - self.disk_hits
+
+    async def put_many(self, items):
+        """
+        :param items: (키, float32 벡터) 리스트
+        """
+        for key, vector in items:
+            self.memory.put(key, vector)
+        await asyncio.to_thread(self.store.put_many, [key for key, _ in items], [vector for _, vector in items])
+
+    def close(self):
+        self.store.close()
+
+
+class QueryEmbedder:
+    def __init__(self, embeddings, cache: QueryEmbeddingCache,
+                 max_batch_size=EMBEDDING_BATCH_MAX_SIZE, max_wait_ms=EMBEDDING_BATCH_MAX_WAIT_MS):
+        """
+        캐시 + 마이크로 배칭 비동기 임베딩 클라이언트
+        :param embeddings: langchain 임베딩 객체 (embed_documents 사용)
+        :param cache: 검색어 임베딩 캐시
+        :param max_batch_size: 한 번에 묶을 최대 검색어 수
+        :param max_wait_ms: 첫 검색어가 들어온 뒤 더 모으기 위해 기다리는 최대 시간 (ms)
+        """
+        self.embeddings = embeddings
+        self.cache = cache
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.queue = []  # (키, 텍스트) 대기열
+        self.pending = dict()  # 키 -> Future (같은 검색어는 한 번만 요청)
+        self.flush_handle = None
+        self.batches = 0
+        self.batched_queries = 0
+
+    async def embed(self, text: str):
+        """
+        검색어 임베딩을 반환합니다.
+        :return: float32 NumPy 배열
+        """
+        text = normalize_query_text(text)
+        key = self.cache.make_key(text)
+
+        vector = await self.cache.get(key)
+        if vector is not None:
+            return vector
+
+        future = self.pending.get(key)
+        if future is None:
+            future = asyncio.get_running_loop().create_future()
+            self.pending[key] = future
+            self.queue.append((key, text))
+            if len(self.queue) >= self.max_batch_size:
+                self._flush()
+            elif self.flush_handle is None:
+                self.flush_handle = asyncio.get_running_loop().call_later(self.max_wait, self._flush)
+        return await asyncio.shield(future)
+
+    def _flush(self):
+        """
+        대기열에서 최대 max_batch_size개를 꺼내 한 번의 요청으로 보냅니다.
+        """
+        if self.flush_handle is not None:
+            self.flush_handle.cancel()
+            self.flush_handle = None
+        batch, self.queue = self.queue[:self.max_batch_size], self.queue[self.max_batch_size:]
+        if self.queue:
+            self.flush_handle = asyncio.get_running_loop().call_later(self.max_wait, self._flush)
+        if batch:
+            asyncio.ensure_future(self._run_batch(batch))
+
+    async def _run_batch(self, batch):
+        keys = [key for key, _ in batch]
+        try:
+            vectors = await asyncio.to_thread(self.embeddings.embed_documents, [text for _, text in batch])
+            vectors = [np.array(vector, dtype=np.float32) for vector in vectors]
+            self.batches += 1
+            self.batched_queries += len(batch)
+            await self.cache.put_many(list(zip(keys, vectors)))
+        except Exception as e:
+            logging.error(f"검색어 임베딩 생성 중 오류 발생: {str(e)}")
+            for key in keys:
+                future = self.pending.pop(key, None)
+                if future is not None and not future.done():
+                    future.set_exception(e)
+            return
+
+        for key, vector in zip(keys, vectors):
+            future = self.pending.pop(key, None)
+            if future is not None and not future.done():
+                future.set_result(vector)
+
+    def stats(self):
+        lookups = self.cache.hits + self.cache.misses
+        return {
+            "cache_hits": self.cache.hits,
+            "cache_misses": self.cache.misses,
+            "hit_ratio": self.cache.hits / lookups if lookups else 0.0,
+            "batches": self.batches,
+            "batched_queries": self.batched_queries,
+            "average_batch_size": self.batched_queries / self.batches if self.batches else 0.0,
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000,
+            "disk": self.cache.store.stats(),
+        }
@@ -0,0 +1,265 @@
+# imageMgr.py
+import os
+import re
+import time
+import base64
+import hashlib
+import asyncio
+import logging
+import aiohttp
+from dotenv import load_dotenv
+from app.vectorRouter.lruCache import LruCache
+
+# 코드 설명 요약:
+# 검색 결과 이미지를 비동기로 가져와서 메모리(LRU) + 디스크에 캐시합니다.
+# 캐시 키는 이미지 URL의 sha256 값이고, /img/{키} 라우트로 바로 내려주거나 base64로 인라인할 수 있습니다.
+
+load_dotenv()
+
+IMAGE_CACHE_DIR = os.getenv("IMAGE_CACHE_DIR", "image_cache")  # 디스크 캐시 경로
+IMAGE_CACHE_TTL = int(os.getenv("IMAGE_CACHE_TTL", 60 * 60 * 24))  # 캐시 유효 시간 (초)
+IMAGE_MEMORY_MAX_ITEMS = int(os.getenv("IMAGE_MEMORY_MAX_ITEMS", 256))  # 메모리 캐시 최대 개수
+IMAGE_MEMORY_MAX_BYTES = int(os.getenv("IMAGE_MEMORY_MAX_BYTES", 64 * 1024 * 1024))  # 메모리 캐시 최대 용량
+IMAGE_DISK_MAX_BYTES = int(os.getenv("IMAGE_DISK_MAX_BYTES", 512 * 1024 * 1024))  # 디스크 캐시 최대 용량
+IMAGE_MAX_CONNECTIONS = int(os.getenv("IMAGE_MAX_CONNECTIONS", 20))  # 동시에 여는 이미지 요청 수
+IMAGE_FETCH_TIMEOUT = float(os.getenv("IMAGE_FETCH_TIMEOUT", 5))  # 이미지 요청 타임아웃 (초)
+IMAGE_MAX_BYTES = int(os.getenv("IMAGE_MAX_BYTES", 5 * 1024 * 1024))  # 이미지 하나의 최대 크기 (넘으면 받지 않음)
+IMAGE_SERVE_MODE = os.getenv("IMAGE_SERVE_MODE", "route")  # "route": /img/{키} 경로, "base64": data URI 인라인
+
+IMAGE_KEY_PATTERN = re.compile(r"^[0-9a-f]{64}$")
+DEFAULT_CONTENT_TYPE = "image/png"
+# 우리 도메인(/img, data URI)으로 그대로 내려주므로 래스터 이미지 형식만 받음 (text/html, image/svg+xml 등은 실패로 처리)
+ALLOWED_CONTENT_TYPES = ("image/jpeg", "image/png", "image/gif", "image/webp", "image/avif", "image/bmp")
+
+
+def raster_content_type(content_type):
+    """
+    :return: 허용하는 래스터 이미지 content-type (소문자, 파라미터 제외) 또는 None
+    """
+    content_type = (content_type or "").split(";")[0].strip().lower()
+    return content_type if content_type in ALLOWED_CONTENT_TYPES else None
+
+
+class ImageCache:
+    def __init__(self, cache_dir=IMAGE_CACHE_DIR, max_items=IMAGE_MEMORY_MAX_ITEMS,
+                 max_bytes=IMAGE_MEMORY_MAX_BYTES, max_disk_bytes=IMAGE_DISK_MAX_BYTES, ttl=IMAGE_CACHE_TTL):
+        """
+        URL 기준 이미지 캐시 (메모리 LRU + 디스크)
+        :param cache_dir: 디스크 캐시 디렉토리
+        :param max_items: 메모리에 유지할 최대 이미지 개수
+        :param max_bytes: 메모리에 유지할 최대 바이트 수
+        :param max_disk_bytes: 디스크에 유지할 최대 바이트 수
+        :param ttl: 캐시 유효 시간 (초)
+        """
+        self.cache_dir = cache_dir
+        self.max_disk_bytes = max_disk_bytes
+        self.ttl = ttl
+        # 키 -> (바이트, content-type)
+        self.memory = LruCache(max_items, ttl=ttl, max_bytes=max_bytes, size_of=lambda entry: len(entry[0]))
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    @staticmethod
+    def make_key(url):
+        return hashlib.sha256(url.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def is_valid_key(key):
+        return bool(IMAGE_KEY_PATTERN.match(key))
+
+    def _paths(self, key):
+        base = os.path.join(self.cache_dir, key)
+        return base + ".img", base + ".type"
+
+    def _read_disk(self, key):
+        image_path, type_path = self._paths(key)
+        try:
+            stored_at = os.path.getmtime(image_path)
+            if time.time() - stored_at > self.ttl:
+                return None
+            with open(image_path, "rb") as f:
+                content = f.read()
+            with open(type_path, "r", encoding="utf-8") as f:
+                content_type = raster_content_type(f.read())
+        except OSError:
+            return None
+        if content_type is None:
+            return None
+        return stored_at, content, content_type
+
+    def _write_disk(self, key, content, content_type):
+        image_path, type_path = self._paths(key)
+        tmp_path = image_path + ".tmp"
+        type_tmp_path = type_path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(content)
+        with open(type_tmp_path, "w", encoding="utf-8") as f:
+            f.write(content_type)
+        # 다른 요청이 반쯤 쓴 파일을 읽지 않도록 교체
+        os.replace(type_tmp_path, type_path)
+        os.replace(tmp_path, image_path)
+        self._evict_disk()
+
+    def _evict_disk(self):
+        """
+        디스크 캐시가 용량 한도를 넘으면 가장 오래된 파일부터 지웁니다.
+        """
+        entries = []
+        total = 0
+        for file_name in os.listdir(self.cache_dir):
+            if not file_name.endswith(".img"):
+                continue
+            path = os.path.join(self.cache_dir, file_name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, file_name[:-len(".img")]))
+            total += stat.st_size
+        if total <= self.max_disk_bytes:
+            return
+        for _, size, key in sorted(entries):
+            for path in self._paths(key):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            total -= size
+            if total <= self.max_disk_bytes:
+                break
+
+    async def get(self, key):
+        """
+        메모리 -> 디스크 순으로 조회합니다. 디스크에서 찾으면 메모리에도 올립니다.
+        :return: (바이트, content-type) 또는 None
+        """
+        cached = self.memory.get(key)
+        if cached is not None:
+            return cached
+        entry = await asyncio.to_thread(self._read_disk, key)
+        if entry is None:
+            return None
+        stored_at, content, content_type = entry
+        self.memory.put(key, (content, content_type), stored_at=stored_at)
+        return content, content_type
+
+    async def put(self, key, content, content_type):
+        self.memory.put(key, (content, content_type))
+        await asyncio.to_thread(self._write_disk, key, content, content_type)
+
+
+class ImageFetcher:
+    def __init__(self, cache: ImageCache, max_connections=IMAGE_MAX_CONNECTIONS, timeout=IMAGE_FETCH_TIMEOUT,
+                 max_bytes=IMAGE_MAX_BYTES):
+        """
+        제한된 커넥션 풀로 이미지를 동시에 가져오는 비동기 클라이언트
+        :param cache: 이미지 캐시
+        :param max_connections: 동시에 진행할 최대 요청 수
+        :param timeout: 요청당 타임아웃 (초)
+        :param max_bytes: 이미지 하나의 최대 크기 (넘으면 실패로 처리)
+        """
+        self.cache = cache
+        self.max_connections = max_connections
+        self.max_bytes = max_bytes
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+        self.semaphore = asyncio.Semaphore(max_connections)
+        self.session = None
+        self.inflight = dict()  # 같은 URL을 동시에 두 번 받지 않도록 진행 중인 요청 공유
+
+    def get_session(self, session=None):
+        """
+        앱의 공유 세션이 넘어오면 그것을 쓰고, 없으면 이미지 전용 세션을 만들어 씁니다.
+        """
+        if session is not None:
+            return session
+        if self.session is None or self.session.closed:
+            connector = aiohttp.TCPConnector(limit=self.max_connections)
+            self.session = aiohttp.ClientSession(connector=connector, timeout=self.timeout)
+        return self.session
+
+    async def close(self):
+        if self.session is not None and not self.session.closed:
+            await self.session.close()
+
+    async def _read_limited(self, response):
+        """
+        본문을 max_bytes까지만 읽습니다. (Content-Length가 없거나 틀려도 한도를 넘으면 중단)
+        :return: 바이트 또는 한도를 넘으면 None
+        """
+        chunks = []
+        size = 0
+        async for chunk in response.content.iter_chunked(64 * 1024):
+            size += len(chunk)
+            if size > self.max_bytes:
+                return None
+            chunks.append(chunk)
+        return b"".join(chunks)
+
+    async def _download(self, url, key, session=None):
+        async with self.semaphore:
+            async with self.get_session(session).get(url, timeout=self.timeout) as response:
+                if response.status != 200:
+                    logging.warning(f"이미지 요청 실패 ({response.status}): {url}")
+                    return None
+                content_type = raster_content_type(response.headers.get("Content-Type", DEFAULT_CONTENT_TYPE))
+                if content_type is None:
+                    logging.warning(f"이미지가 아닌 응답 ({response.headers.get('Content-Type')}): {url}")
+                    return None
+                if response.content_length is not None and response.content_length > self.max_bytes:
+                    logging.warning(f"이미지가 너무 큼 ({response.content_length}바이트): {url}")
+                    return None
+                content = await self._read_limited(response)
+                if content is None:
+                    logging.warning(f"이미지가 너무 큼 ({self.max_bytes}바이트 초과): {url}")
+                    return None
+        await self.cache.put(key, content, content_type)
+        return content, content_type
+
+    async def fetch(self, url, session=None):
+        """
+        캐시에 있으면 캐시에서, 없으면 내려받아 캐시에 저장합니다.
+        :param url: 이미지 URL
+        :param session: 공유 aiohttp 세션 (없으면 이미지 전용 세션 사용)
+        :return: (캐시 키, 바이트, content-type) 또는 실패 시 None
+        """
+        if not url:
+            return None
+        key = self.cache.make_key(url)
+        cached = await self.cache.get(key)
+        if cached is None:
+            task = self.inflight.get(key)
+            if task is None:
+                task = asyncio.ensure_future(self._download(url, key, session))
+                self.inflight[key] = task
+                task.add_done_callback(lambda _: self.inflight.pop(key, None))
+            try:
+                cached = await asyncio.shield(task)
+            except Exception as e:
+                logging.warning(f"이미지 요청 중 오류 발생: {url} ({str(e)})")
+                return None
+            if cached is None:
+                return None
+        content, content_type = cached
+        return key, content, content_type
+
+    async def get_image_src(self, url, session=None):
+        """
+        템플릿의 <img src>에 넣을 값을 반환합니다. 실패하면 None (기본 이미지 사용)
+        """
+        fetched = await self.fetch(url, session)
+        if fetched is None:
+            return None
+        key, content, content_type = fetched
+        if IMAGE_SERVE_MODE == "base64":
+            return f"data:{content_type};base64,{base64.b64encode(content).decode('utf-8')}"
+        return f"/img/{key}"
+
+    async def get_image_srcs(self, urls, session=None):
+        """
+        여러 이미지를 동시에 가져옵니다.
+        """
+        return await asyncio.gather(*(self.get_image_src(url, session) for url in urls))
+
+
+# 앱 전체에서 공유하는 이미지 캐시/클라이언트
+image_cache = ImageCache()
+image_fetcher = ImageFetcher(image_cache)
@@ -0,0 +1,76 @@
+# lruCache.py
+import time
+from collections import OrderedDict
+
+# 코드 설명 요약:
+# 요약/검색어 임베딩/NER/이미지 캐시가 같이 쓰는 메모리 LRU 캐시입니다.
+# 개수 한도, 선택적인 용량 한도(size_of로 항목 크기 계산)와 유효 시간(TTL)을 지원하고 조회 통계를 셉니다.
+# 디스크(SQLite, EmbeddingStore, 이미지 파일) 계층은 각 캐시가 이 캐시 뒤에 따로 둡니다.
+
+
+class LruCache:
+    def __init__(self, max_items, ttl=None, max_bytes=None, size_of=None):
+        """
+        :param max_items: 최대 항목 수 (0 이하면 아무것도 저장하지 않음)
+        :param ttl: 유효 시간 (초, None이면 만료 없음)
+        :param max_bytes: 최대 용량 (None이면 제한 없음)
+        :param size_of: 값 -> 크기 함수 (max_bytes를 쓸 때)
+        """
+        self.max_items = max_items
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.size_of = size_of or (lambda value: 0)
+        self.items = OrderedDict()  # 키 -> (저장 시각, 값)
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def _expired(self, stored_at):
+        return self.ttl is not None and time.time() - stored_at > self.ttl
+
+    def get(self, key):
+        """
+        :return: 값 (없거나 만료됐으면 None)
+        """
+        entry = self.items.get(key)
+        if entry is not None and self._expired(entry[0]):
+            self.pop(key)
+            entry = None
+        if entry is None:
+            self.misses += 1
+            return None
+        self.items.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def put(self, key, value, stored_at=None):
+        """
+        값을 넣고 개수/용량 한도를 넘으면 오래 안 쓴 것부터 내보냅니다.
+        :param stored_at: 저장 시각 (디스크에서 올린 항목은 디스크에 저장된 시각, None이면 지금)
+        """
+        if self.max_items <= 0:
+            return
+        self.pop(key)
+        self.items[key] = (time.time() if stored_at is None else stored_at, value)
+        self.bytes += self.size_of(value)
+        while self.items and (len(self.items) > self.max_items or
+                              (self.max_bytes is not None and self.bytes > self.max_bytes)):
+            _, (_, evicted) = self.items.popitem(last=False)
+            self.bytes -= self.size_of(evicted)
+
+    def pop(self, key):
+        entry = self.items.pop(key, None)
+        if entry is not None:
+            self.bytes -= self.size_of(entry[1])
+
+    def __len__(self):
+        return len(self.items)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            "items": len(self.items),
+        }
@@ -0,0 +1,240 @@
+# nerMgr.py
+import os
+import time
+import asyncio
+import logging
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from dotenv import load_dotenv
+from app.vectorRouter.embeddingMgr import normalize_query_text
+from app.vectorRouter.lruCache import LruCache
+
+# 코드 설명 요약:
+# 검색어 NER을 이벤트 루프 밖의 전용 스레드에서 수행합니다.
+# 짧은 시간 안에 동시에 들어온 검색어들은 파이프라인 한 번(배치)으로 묶어서 추론하고,
+# 정규화한 검색어 기준으로 엔티티 결과를 메모리(LRU)에 캐시합니다.
+# 모델은 그대로(pytorch), 동적 양자화(int8), ONNX 변환(onnx) 중에서 고를 수 있습니다.
+# python -m app.vectorRouter.nerMgr 로 기존 파이프라인과 지연 시간(p50/p99)을 비교할 수 있습니다.
+
+load_dotenv()
+
+NER_MODEL_NAME = "klue/bert-base"  # 한국어 NER을 위한 BERT 모델
+NER_BACKEND = os.getenv("NER_BACKEND", "pytorch")  # "pytorch": 기존 모델, "int8": 동적 양자화, "onnx": ONNX Runtime
+NER_CACHE_MAX_ITEMS = int(os.getenv("NER_CACHE_MAX_ITEMS", 2048))  # 엔티티 결과 캐시 최대 개수
+NER_BATCH_MAX_SIZE = int(os.getenv("NER_BATCH_MAX_SIZE", 16))  # 한 번에 묶을 최대 검색어 수
+NER_BATCH_MAX_WAIT_MS = float(os.getenv("NER_BATCH_MAX_WAIT_MS", 5))  # 묶기 위해 기다리는 최대 시간 (ms)
+NER_BACKENDS = ("pytorch", "int8", "onnx")
+
+
+def load_ner_pipeline(model_name=NER_MODEL_NAME, backend=NER_BACKEND):
+    """
+    토큰 분류(NER) 파이프라인을 만듭니다.
+    :param model_name: 허깅페이스 모델 이름
+    :param backend: "pytorch", "int8"(Linear 레이어 동적 양자화, CPU 전용), "onnx"(optimum 필요)
+    """
+    if backend not in NER_BACKENDS:
+        raise ValueError(f"지원하지 않는 NER 백엔드입니다: {backend} (사용 가능: {', '.join(NER_BACKENDS)})")
+
+    import torch
+    from transformers import AutoTokenizer, AutoModelForTokenClassification, pipeline
+
+    ner_tokenizer = AutoTokenizer.from_pretrained(model_name)
+
+    if backend == "onnx":
+        try:
+            from optimum.onnxruntime import ORTModelForTokenClassification
+        except ImportError:
+            raise ImportError("onnx 백엔드를 쓰려면 optimum[onnxruntime] 패키지가 필요합니다.")
+        ner_model = ORTModelForTokenClassification.from_pretrained(model_name, export=True)
+        return pipeline("ner", model=ner_model, tokenizer=ner_tokenizer)
+
+    try:
+        ner_model = AutoModelForTokenClassification.from_pretrained(model_name)
+    except EnvironmentError:
+        raise EnvironmentError(f"모델 '{model_name}'을 로드할 수 없습니다.")
+
+    if backend == "int8":
+        # 가중치를 int8로 바꾸고 활성값은 실행 시점에 양자화 (양자화 커널은 CPU만 지원)
+        ner_model = torch.quantization.quantize_dynamic(ner_model.eval(), {torch.nn.Linear}, dtype=torch.qint8)
+        return pipeline("ner", model=ner_model, tokenizer=ner_tokenizer, framework="pt", device=-1)
+
+    return pipeline("ner", model=ner_model, tokenizer=ner_tokenizer, framework="pt",
+                    device=0 if torch.cuda.is_available() else -1)
+
+
+# 파이프라인 결과에서 B-로 시작하는 엔티티 단어만 추출하는 함수
+def extract_entity_words(entities):
+    return [entity['word'] for entity in entities if entity['entity'].startswith("B-")]
+
+
+class NerWorker:
+    def __init__(self, ner_pipeline, max_batch_size=NER_BATCH_MAX_SIZE, max_wait_ms=NER_BATCH_MAX_WAIT_MS,
+                 cache_max_items=NER_CACHE_MAX_ITEMS):
+        """
+        캐시 + 마이크로 배칭 비동기 NER 추론기
+        :param ner_pipeline: transformers NER 파이프라인 (텍스트 리스트를 받을 수 있어야 함)
+        :param max_batch_size: 한 번에 묶을 최대 검색어 수
+        :param max_wait_ms: 첫 검색어가 들어온 뒤 더 모으기 위해 기다리는 최대 시간 (ms)
+        :param cache_max_items: 엔티티 결과 캐시 최대 개수 (0이면 캐시 안 함)
+        """
+        self.ner_pipeline = ner_pipeline
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.cache = LruCache(cache_max_items)  # 정규화한 검색어 -> 엔티티 단어 리스트
+        # torch가 연산 내부에서 여러 코어를 쓰므로 추론 스레드는 하나만 둠 (배치끼리 코어를 나눠 먹지 않도록)
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ner")
+        self.queue = []  # 정규화한 검색어 대기열
+        self.pending = dict()  # 검색어 -> Future (같은 검색어는 한 번만 추론)
+        self.flush_handle = None
+        self.batches = 0
+        self.batched_queries = 0
+        self.inference_seconds = 0.0
+
+    async def extract(self, search_input: str):
+        """
+        검색어에서 B-로 시작하는 엔티티 단어 리스트를 반환합니다.
+        """
+        text = normalize_query_text(search_input)
+        words = self.cache.get(text)
+        if words is not None:
+            return list(words)
+
+        future = self.pending.get(text)
+        if future is None:
+            future = asyncio.get_running_loop().create_future()
+            self.pending[text] = future
+            self.queue.append(text)
+            if len(self.queue) >= self.max_batch_size:
+                self._flush()
+            elif self.flush_handle is None:
+                self.flush_handle = asyncio.get_running_loop().call_later(self.max_wait, self._flush)
+        return list(await asyncio.shield(future))
+
+    def _flush(self):
+        """
+        대기열에서 최대 max_batch_size개를 꺼내 한 번의 추론으로 보냅니다.
+        """
+        if self.flush_handle is not None:
+            self.flush_handle.cancel()
+            self.flush_handle = None
+        batch, self.queue = self.queue[:self.max_batch_size], self.queue[self.max_batch_size:]
+        if self.queue:
+            self.flush_handle = asyncio.get_running_loop().call_later(self.max_wait, self._flush)
+        if batch:
+            asyncio.ensure_future(self._run_batch(batch))
+
+    def _infer(self, texts):
+        start = time.perf_counter()
+        outputs = self.ner_pipeline(texts, batch_size=len(texts))
+        self.inference_seconds += time.perf_counter() - start
+        return [extract_entity_words(entities) for entities in outputs]
+
+    async def _run_batch(self, batch):
+        try:
+            results = await asyncio.get_running_loop().run_in_executor(self.executor, self._infer, batch)
+            self.batches += 1
+            self.batched_queries += len(batch)
+        except Exception as e:
+            logging.error(f"NER 추론 중 오류 발생: {str(e)}")
+            for text in batch:
+                future = self.pending.pop(text, None)
+                if future is not None and not future.done():
+                    future.set_exception(e)
+            return
+
+        for text, words in zip(batch, results):
+            self.cache.put(text, words)
+            future = self.pending.pop(text, None)
+            if future is not None and not future.done():
+                future.set_result(words)
+
+    def close(self):
+        self.executor.shutdown(wait=False)
+
+    def stats(self):
+        cache = self.cache.stats()
+        return {
+            "cache_hits": cache["hits"],
+            "cache_misses": cache["misses"],
+            "hit_ratio": cache["hit_ratio"],
+            "cache_items": cache["items"],
+            "batches": self.batches,
+            "batched_queries": self.batched_queries,
+            "average_batch_size": self.batched_queries / self.batches if self.batches else 0.0,
+            "average_batch_ms": self.inference_seconds * 1000 / self.batches if self.batches else 0.0,
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000,
+        }
+
+
+def latency_report(latencies):
+    latencies = np.array(latencies) * 1000
+    return {
+        "p50_ms": round(float(np.percentile(latencies, 50)), 2),
+        "p99_ms": round(float(np.percentile(latencies, 99)), 2),
+        "mean_ms": round(float(latencies.mean()), 2),
+    }
+
+
+def benchmark_pipeline(ner_pipeline, queries, concurrency):
+    """
+    기존 방식: 요청마다 이벤트 루프 안에서 파이프라인을 바로 호출 (동시 요청은 앞 요청이 끝날 때까지 대기)
+    """
+    latencies = []
+    for start in range(0, len(queries), concurrency):
+        wave_start = time.perf_counter()
+        for query in queries[start:start + concurrency]:
+            extract_entity_words(ner_pipeline(query))
+            latencies.append(time.perf_counter() - wave_start)
+    return latencies
+
+
+async def benchmark_worker(ner_pipeline, queries, concurrency):
+    """
+    NerWorker: 동시 요청을 배치로 묶어 전용 스레드에서 추론 (캐시는 끄고 추론 시간만 측정)
+    """
+    worker = NerWorker(ner_pipeline, max_batch_size=max(concurrency, 1), cache_max_items=0)
+    latencies = []
+
+    async def timed(query):
+        start = time.perf_counter()
+        await worker.extract(query)
+        latencies.append(time.perf_counter() - start)
+
+    try:
+        for start in range(0, len(queries), concurrency):
+            await asyncio.gather(*(timed(query) for query in queries[start:start + concurrency]))
+    finally:
+        worker.close()
+    return latencies, worker.stats()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="NER 추론 방식별 지연 시간(p50/p99) 비교")
+    parser.add_argument("--queries", default=None, help="한 줄에 검색어 하나씩 들어 있는 파일 (없으면 예시 검색어 사용)")
+    parser.add_argument("--backends", default="pytorch,int8", help="비교할 백엔드 목록 (쉼표로 구분)")
+    parser.add_argument("--concurrency", type=int, default=8, help="동시에 들어오는 검색어 수")
+    parser.add_argument("--repeat", type=int, default=5, help="검색어 목록 반복 횟수")
+    args = parser.parse_args()
+
+    if args.queries:
+        with open(args.queries, "r", encoding="utf-8") as f:
+            queries = [line.strip() for line in f if line.strip()]
+    else:
+        queries = ["강남역 근처 분위기 좋은 파스타 맛집", "홍대에서 혼밥하기 좋은 라멘집", "성수동 브런치 카페 추천",
+                   "부산 해운대 돼지국밥", "을지로 노포 고기집", "판교 회식 장소 추천", "제주 흑돼지 맛집", "이태원 수제버거"]
+    queries = [f"{query} {i}" for i in range(args.repeat) for query in queries]  # 캐시 효과가 섞이지 않도록 검색어를 모두 다르게
+
+    for backend in args.backends.split(","):
+        ner_pipeline = load_ner_pipeline(NER_MODEL_NAME, backend.strip())
+        ner_pipeline(queries[0])  # 첫 호출 워밍업
+
+        baseline = latency_report(benchmark_pipeline(ner_pipeline, queries, args.concurrency))
+        latencies, stats = asyncio.run(benchmark_worker(ner_pipeline, queries, args.concurrency))
+        print(f"[{backend}] 기존 파이프라인: {baseline}")
+        print(f"[{backend}] NerWorker: {latency_report(latencies)} (평균 배치 {stats['average_batch_size']:.1f}개)")
+
+
+if __name__ == "__main__":
+    main()
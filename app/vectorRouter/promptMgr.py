@@ -1,19 +1,162 @@
 # promptMgr.py
 import aiohttp
 import os
+import re
+import time
+import sqlite3
+import asyncio
+import hashlib
+import logging
+import threading
+import unicodedata
 from dotenv import load_dotenv
+from app.vectorRouter.lruCache import LruCache
 
 # .env 파일에서 API 키 로드
 load_dotenv()
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 
+SUMMARY_MODEL = "gpt-4o-mini"  # 요약 생성 모델
+PROMPT_VERSION = "v1"  # 프롬프트를 바꾸면 올려서 이전 캐시를 무효화
+SUMMARY_CACHE_PATH = os.getenv("SUMMARY_CACHE_PATH", "summary_cache.sqlite3")  # 디스크 캐시 파일
+SUMMARY_CACHE_TTL = int(os.getenv("SUMMARY_CACHE_TTL", 60 * 60 * 24 * 7))  # 캐시 유효 시간 (초)
+SUMMARY_CACHE_MAX_ITEMS = int(os.getenv("SUMMARY_CACHE_MAX_ITEMS", 1024))  # 메모리 LRU 최대 개수
+SUMMARY_CACHE_PURGE_INTERVAL = int(os.getenv("SUMMARY_CACHE_PURGE_INTERVAL", 60 * 60))  # 만료 항목 정리 주기 (초, 0이면 안 함)
+
+
+# 검색어를 캐시 키용으로 정규화하는 함수
+def normalize_query(search_input: str):
+    """
+    대소문자/전각 문자/문장 부호/어순 차이를 없애서 비슷한 검색어가 같은 버킷에 모이도록 합니다.
+    """
+    text = unicodedata.normalize("NFKC", search_input).lower()
+    words = re.findall(r"\w+", text)
+    return " ".join(sorted(set(words)))
+
+
+class SummaryCache:
+    def __init__(self, path=SUMMARY_CACHE_PATH, ttl=SUMMARY_CACHE_TTL, max_items=SUMMARY_CACHE_MAX_ITEMS):
+        """
+        요약 결과 캐시 (메모리 LRU + SQLite)
+        :param path: SQLite 파일 경로
+        :param ttl: 캐시 유효 시간 (초)
+        :param max_items: 메모리 LRU 최대 개수
+        """
+        self.path = path
+        self.ttl = ttl
+        self.memory = LruCache(max_items, ttl=ttl)  # 키 -> 요약
+        self.lock = threading.Lock()
+        self.disk_hits = 0
+        self.connection = sqlite3.connect(self.path, check_same_thread=False)
+        with self.lock:
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS summaries (key TEXT PRIMARY KEY, summary TEXT NOT NULL, created_at REAL NOT NULL)"
+            )
+            self.connection.commit()
+
+    @staticmethod
+    def content_fingerprint(link, name, full_content):
+        """
+        요약 대상 가게의 지문 (링크 + 이름 + 본문 해시)
+        data_id는 병합/재구축 때 다시 매겨지므로 키에 쓰지 않고, 본문이 바뀌면 다른 키가 됩니다.
+        """
+        content_hash = hashlib.sha256((full_content or "").encode("utf-8")).hexdigest()
+        return f"{link or ''}|{name or ''}|{content_hash}"
+
+    @staticmethod
+    def make_key(link, name, full_content, search_input, model=SUMMARY_MODEL, prompt_version=PROMPT_VERSION):
+        raw = f"{SummaryCache.content_fingerprint(link, name, full_content)}|{normalize_query(search_input)}|{model}|{prompt_version}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _read_disk(self, key):
+        with self.lock:
+            row = self.connection.execute("SELECT summary, created_at FROM summaries WHERE key = ?", (key,)).fetchone()
+            if row is not None and time.time() - row[1] > self.ttl:
+                self.connection.execute("DELETE FROM summaries WHERE key = ?", (key,))
+                self.connection.commit()
+                return None
+        return row
+
+    def _write_disk(self, key, summary, created_at):
+        with self.lock:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO summaries (key, summary, created_at) VALUES (?, ?, ?)",
+                (key, summary, created_at)
+            )
+            self.connection.commit()
+
+    async def get(self, key):
+        """
+        메모리 -> SQLite 순으로 조회합니다. TTL이 지난 항목은 없는 것으로 봅니다.
+        """
+        summary = self.memory.get(key)
+        if summary is not None:
+            return summary
+
+        row = await asyncio.to_thread(self._read_disk, key)
+        if row is None:
+            return None
+        summary, created_at = row
+        self.memory.put(key, summary, stored_at=created_at)
+        self.disk_hits += 1
+        return summary
+
+    async def put(self, key, summary):
+        created_at = time.time()
+        self.memory.put(key, summary, stored_at=created_at)
+        await asyncio.to_thread(self._write_disk, key, summary, created_at)
+
+    def purge_expired(self):
+        """
+        TTL이 지난 항목을 SQLite에서 지웁니다.
+        :return: 지운 항목 수
+        """
+        with self.lock:
+            cursor = self.connection.execute("DELETE FROM summaries WHERE created_at < ?", (time.time() - self.ttl,))
+            self.connection.commit()
+            return cursor.rowcount
+
+    async def purge_periodically(self, interval=SUMMARY_CACHE_PURGE_INTERVAL):
+        """
+        앱 lifespan 동안 interval초마다 만료 항목을 정리합니다. (시작할 때 한 번 먼저 정리)
+        """
+        while True:
+            removed = await asyncio.to_thread(self.purge_expired)
+            if removed:
+                logging.info(f"만료된 요약 캐시 {removed}개를 정리했습니다.")
+            await asyncio.sleep(interval)
+
+    def stats(self):
+        hits = self.memory.hits + self.disk_hits
+        misses = self.memory.misses - self.disk_hits
+        return {
+            "hits": hits,
+            "memory_hits": self.memory.hits,
+            "misses": misses,
+            "hit_ratio": hits / (hits + misses) if hits + misses else 0.0,
+            "memory_items": len(self.memory),
+            "model": SUMMARY_MODEL,
+            "prompt_version": PROMPT_VERSION,
+        }
+
+
+# 앱 전체에서 공유하는 요약 캐시
+summary_cache = SummaryCache()
+
 # 비동기 OpenAI GPT 요약 생성 함수
-async def generate_gpt_response(name: str, full_content: str, search_input:str):
+async def generate_gpt_response(name: str, full_content: str, search_input:str, session: aiohttp.ClientSession = None, link=None):
     """
     OpenAI를 통해 요약된 정보를 비동기적으로 반환하는 함수.
     중복된 정보 없이 새로운 정보를 생성하는 것을 목표로 함.
+    session을 넘기면 앱의 공유 커넥션 풀을 사용하고, 없으면 호출마다 세션을 새로 엽니다.
+    요약은 (링크 + 이름 + 본문 해시, 정규화된 검색어, 모델, 프롬프트 버전) 기준으로 캐시합니다.
     """
     try:
+        cache_key = summary_cache.make_key(link, name, full_content, search_input)
+        cached_summary = await summary_cache.get(cache_key)
+        if cached_summary is not None:
+            return cached_summary
+
         # OpenAI API 호출을 위한 헤더 및 요청 데이터 구성
         headers = {
             "Authorization": f"Bearer {OPENAI_API_KEY}",
@@ -21,7 +164,7 @@ async def generate_gpt_response(name: str, full_content: str, search_input:str):
         }
 
         data = {
-            "model": "gpt-4o-mini",
+            "model": SUMMARY_MODEL,
             "messages": [
                     {
                         "role": "system",
@@ -61,29 +204,41 @@ async def generate_gpt_response(name: str, full_content: str, search_input:str):
             "presence_penalty": 0.5,
         }
 
-        # 비동기 HTTP 요청을 보냄
-        async with aiohttp.ClientSession() as session:
-            async with session.post("https://api.openai.com/v1/chat/completions", json=data, headers=headers) as response:
-                if response.status == 200:
-                    result_json = await response.json()
-                    result = result_json['choices'][0]['message']['content']
-
-                    # 강조 표시 제거 및 포맷팅
-                    formatted_result = result.replace("**", "")  # 강조 표시 제거
-                    formatted_result = formatted_result.replace("{", "")  # 중괄호 제거
-                    formatted_result = formatted_result.replace("}", "")  # 중괄호 제거
-                    formatted_result = formatted_result.replace(",", "")  # 쉼표 제거
-                    formatted_result = formatted_result.replace("\n", "<br>")
-
-                    # 항목별로 줄바꿈 처리
-                    formatted_result = formatted_result.replace("대표 메뉴:", "\n대표 메뉴:")\
-                                                       .replace("분위기:", "\n분위기:")\
-                                                       .replace("차별점:", "\n차별점:")
-                    
-                    return formatted_result
-                else:
-                    return f"요약 생성 실패: {response.status}"
+        # 비동기 HTTP 요청을 보냄 (공유 세션이 없으면 임시 세션 사용)
+        if session is None:
+            async with aiohttp.ClientSession() as own_session:
+                summary, succeeded = await _request_summary(own_session, data, headers)
+        else:
+            summary, succeeded = await _request_summary(session, data, headers)
+
+        # 성공한 요약만 캐시
+        if succeeded:
+            await summary_cache.put(cache_key, summary)
+        return summary
 
     except Exception as e:
         print(f"OpenAI API 오류 발생: {str(e)}")
-        return "요약 생성 실패"
\ No newline at end of file
+        return "요약 생성 실패"
+
+# OpenAI 요약 요청을 보내고 결과를 포맷팅하는 함수
+async def _request_summary(session: aiohttp.ClientSession, data: dict, headers: dict):
+    async with session.post("https://api.openai.com/v1/chat/completions", json=data, headers=headers) as response:
+        if response.status == 200:
+            result_json = await response.json()
+            result = result_json['choices'][0]['message']['content']
+
+            # 강조 표시 제거 및 포맷팅
+            formatted_result = result.replace("**", "")  # 강조 표시 제거
+            formatted_result = formatted_result.replace("{", "")  # 중괄호 제거
+            formatted_result = formatted_result.replace("}", "")  # 중괄호 제거
+            formatted_result = formatted_result.replace(",", "")  # 쉼표 제거
+            formatted_result = formatted_result.replace("\n", "<br>")
+
+            # 항목별로 줄바꿈 처리
+            formatted_result = formatted_result.replace("대표 메뉴:", "\n대표 메뉴:")\
+                                               .replace("분위기:", "\n분위기:")\
+                                               .replace("차별점:", "\n차별점:")
+            
+            return formatted_result, True
+        else:
+            return f"요약 생성 실패: {response.status}", False
@@ -0,0 +1,254 @@
+# startupMgr.py
+import os
+import time
+import asyncio
+import logging
+import threading
+from contextlib import contextmanager
+from dotenv import load_dotenv
+from app.vectorRouter.FaissVectorStore import FaissVectorStore
+from spot_store.metadataStore import metadata_column, metadata_source_path
+from spot_store.segmentStore import manifest_path, read_manifest, base_update_pending
+from app.vectorRouter.bm25Engine import load_or_build_bm25
+from app.vectorRouter.tokenizer import get_tokenizer
+from app.vectorRouter.nerMgr import NER_MODEL_NAME, NER_BACKEND, NerWorker, load_ner_pipeline
+from app.vectorRouter.exceptions import EmptyVectorStoreException
+
+# 코드 설명 요약:
+# 검색에 필요한 무거운 리소스(FAISS 인덱스/메타데이터, BM25 역색인, NER 모델)를 import 시점이 아니라
+# 처음 필요할 때 또는 앱 시작 후 백그라운드 워밍업에서 로드합니다.
+# 단계별 소요 시간을 기록해서 로그와 /ready 응답으로 보여줍니다.
+# 로드한 뒤에는 인덱스/메타데이터/매니페스트 파일을 주기적으로 확인해서, 바뀌었으면 새 버전의 검색 자료구조를
+# 백그라운드에서 만들고 참조만 바꿔 끼웁니다. (검색 중인 요청은 시작할 때 잡은 이전 버전으로 끝남)
+
+load_dotenv()
+
+SPOT_WARMUP = os.getenv("SPOT_WARMUP", "background")  # "background": 시작 후 백그라운드 로드, "blocking": 로드 후 요청 수락, "lazy": 첫 검색 때 로드
+SPOT_PERSIST_ARTIFACTS = os.getenv("SPOT_PERSIST_ARTIFACTS", "1") == "1"  # BM25 역색인/토큰화 코퍼스를 파일로 저장해서 재사용
+SPOT_RELOAD_INTERVAL = float(os.getenv("SPOT_RELOAD_INTERVAL", "10"))  # 벡터 저장소 파일 변경 확인 주기 (초), 0이면 다시 로드하지 않음
+
+
+def store_signature(index_file, metadata_file):
+    """
+    벡터 저장소 파일(매니페스트, 기본 인덱스, 메타데이터)의 크기/수정 시각. 값이 바뀌면 다시 로드합니다.
+    """
+    signature = []
+    for path in (manifest_path(index_file), index_file, metadata_source_path(metadata_file)):
+        stat = os.stat(path) if os.path.exists(path) else None
+        signature.append((stat.st_size, stat.st_mtime_ns) if stat else None)
+    return tuple(signature)
+
+
+def corpus_source_path(index_file, metadata_file):
+    """
+    BM25 캐시 서명에 쓰는 파일. 추가 세그먼트가 있는 저장소는 세그먼트가 추가될 때마다 바뀌는 매니페스트를 사용
+    """
+    path = manifest_path(index_file)
+    return path if os.path.exists(path) else metadata_source_path(metadata_file)
+
+
+class StartupProfiler:
+    def __init__(self):
+        self.steps = []  # (단계 이름, 소요 시간(초))
+
+    @contextmanager
+    def step(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.steps.append((name, elapsed))
+            logging.info(f"[startup] {name}: {elapsed:.2f}초")
+
+    def report(self):
+        return [{"step": name, "seconds": round(elapsed, 3)} for name, elapsed in self.steps]
+
+    def total(self):
+        return sum(elapsed for _, elapsed in self.steps)
+
+
+class SearchIndex:
+    def __init__(self, vector_store, bm25, tokenizer, version=1, signature=None):
+        """
+        한 번에 같이 바뀌어야 하는 검색 자료구조 묶음 (다시 로드하면 통째로 새 객체로 바꿈)
+        :param vector_store: FAISS 인덱스 + 메타데이터
+        :param bm25: 메타데이터 청크로 만든 BM25 역색인
+        :param tokenizer: BM25 색인/검색에 쓴 토크나이저
+        :param version: 로드할 때마다 1씩 늘어나는 버전
+        :param signature: 로드를 시작할 때의 store_signature
+        """
+        self.vector_store = vector_store
+        self.bm25 = bm25
+        self.tokenizer = tokenizer
+        self.version = version
+        self.signature = signature
+        self.loaded_at = time.time()
+
+
+class SearchResources:
+    def __init__(self, index_file="spot_index.bin", metadata_file="spot_metadata.pkl", ner_model_name=NER_MODEL_NAME,
+                 ner_backend=NER_BACKEND, persist_artifacts=SPOT_PERSIST_ARTIFACTS):
+        """
+        :param index_file: FAISS 인덱스 파일
+        :param metadata_file: 메타데이터 파일
+        :param ner_model_name: NER 모델 이름
+        :param ner_backend: NER 모델 실행 방식 ("pytorch", "int8", "onnx")
+        :param persist_artifacts: BM25 역색인/토큰화 코퍼스를 인덱스 파일 옆에 저장해 재사용할지 여부
+        """
+        self.index_file = index_file
+        self.metadata_file = metadata_file
+        self.ner_model_name = ner_model_name
+        self.ner_backend = ner_backend
+        self.persist_artifacts = persist_artifacts
+        self.lock = threading.Lock()
+        self.reload_lock = threading.Lock()  # 다시 로드는 한 번에 하나만
+        self.profiler = StartupProfiler()
+        self.reload_profiler = None  # 마지막으로 다시 로드할 때의 단계별 시간
+        self.reload_error = None
+        self.index = None
+        self.ner_worker = None
+        self.state = "not_loaded"  # not_loaded -> loading -> ready / failed
+        self.error = None
+
+    def load_index(self, previous=None, profiler=None):
+        """
+        검색 자료구조를 만듭니다.
+        :param previous: 다시 로드할 때 현재 버전 (새 추가 세그먼트만 열고 기본 인덱스는 같이 씀)
+        :param profiler: 단계별 시간을 기록할 프로파일러 (없으면 시작 프로파일러)
+        """
+        profiler = profiler or self.profiler
+        signature = store_signature(self.index_file, self.metadata_file)  # 로드 중에 바뀌면 다음 확인 때 다시 로드되도록 먼저 기록
+        vector_store = None
+        if previous is not None:
+            with profiler.step("추가 세그먼트 로드"):
+                vector_store = previous.vector_store.with_new_segments()
+        if vector_store is None:
+            with profiler.step("FAISS 인덱스/메타데이터 로드"):
+                vector_store = FaissVectorStore(index_file=self.index_file, metadata_file=self.metadata_file)
+
+        # 코퍼스 생성 (벡터 저장소에서 가져온 데이터로 텍스트 목록 생성)
+        # 저장된 BM25 역색인이 최신이면 청크 내용을 읽지 않도록 필요할 때만 꺼냄
+        corpus = metadata_column(vector_store.metadata, "chunk_content", " ")
+        if not corpus:
+            raise EmptyVectorStoreException("메타 데이터 안에 chunk_content 없습니다.")
+
+        tokenizer = get_tokenizer()
+        with profiler.step(f"BM25 역색인 준비 ({tokenizer.name})"):
+            bm25 = load_or_build_bm25(self.index_file, corpus_source_path(self.index_file, self.metadata_file), corpus,
+                                      tokenizer, persist=self.persist_artifacts)
+        version = previous.version + 1 if previous is not None else 1
+        return SearchIndex(vector_store, bm25, tokenizer, version=version, signature=signature)
+
+    def reload_if_changed(self, force=False):
+        """
+        벡터 저장소 파일이 바뀌었으면 새 버전을 만들어서 바꿔 끼웁니다. 실패하면 이전 버전을 계속 씁니다.
+        이전 버전은 검색 중인 요청이 참조를 놓으면 정리됩니다.
+        :param force: 파일이 바뀌지 않았어도 다시 로드
+        :return: 새 버전으로 바꿨으면 True
+        """
+        current = self.index
+        if current is None or self.state != "ready":
+            return False
+        if not force and store_signature(self.index_file, self.metadata_file) == current.signature:
+            return False
+        if base_update_pending(self.index_file, read_manifest(self.index_file)):
+            return False  # DBMgr가 기본 인덱스를 교체하는 중이면 다음 확인 때 로드
+        if not self.reload_lock.acquire(blocking=False):
+            return False
+        try:
+            profiler = StartupProfiler()
+            try:
+                index = self.load_index(previous=current, profiler=profiler)
+            except Exception as e:
+                self.reload_error = str(e)
+                logging.error(f"벡터 저장소 다시 로드 실패 (버전 {current.version} 유지): {str(e)}")
+                return False
+            self.index = index
+            self.reload_profiler = profiler
+            self.reload_error = None
+            logging.info(f"벡터 저장소 버전 {index.version} 적용 ({len(index.vector_store.metadata)}개 청크, "
+                         f"{profiler.total():.2f}초)")
+            return True
+        finally:
+            self.reload_lock.release()
+
+    async def watch(self, interval=SPOT_RELOAD_INTERVAL):
+        """
+        lifespan에서 백그라운드 태스크로 실행합니다. interval마다 파일 변경을 확인합니다.
+        """
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await asyncio.to_thread(self.reload_if_changed)
+            except Exception as e:
+                logging.error(f"벡터 저장소 변경 확인 실패: {str(e)}")
+
+    def load_ner(self):
+        # torch/transformers는 load_ner_pipeline 안에서 처음 임포트되므로 그 시간도 이 단계에 포함됨
+        # (앱 모듈 임포트 시간은 python -X importtime -c "import app.main" 으로 따로 확인)
+        with self.profiler.step(f"NER 모델 로드 ({self.ner_model_name}, {self.ner_backend}, torch/transformers 임포트 포함)"):
+            return NerWorker(load_ner_pipeline(self.ner_model_name, self.ner_backend))
+
+    def ensure_loaded(self):
+        """
+        아직 로드되지 않은 리소스를 로드합니다. 여러 스레드가 동시에 불러도 한 번만 로드합니다.
+        """
+        if self.state == "ready":
+            return
+        with self.lock:
+            if self.state == "ready":
+                return
+            self.state = "loading"
+            try:
+                if self.index is None:
+                    self.index = self.load_index()
+                if self.ner_worker is None:
+                    self.ner_worker = self.load_ner()
+            except Exception as e:
+                self.state = "failed"
+                self.error = str(e)
+                logging.error(f"검색 리소스 로드 실패: {str(e)}")
+                raise
+            self.state = "ready"
+            self.error = None
+            logging.info(f"[startup] 검색 리소스 준비 완료 (총 {self.profiler.total():.2f}초)")
+
+    async def ensure_loaded_async(self):
+        """
+        이벤트 루프를 막지 않도록 로드는 스레드에서 수행합니다.
+        """
+        if self.state != "ready":
+            await asyncio.to_thread(self.ensure_loaded)
+
+    async def warmup(self):
+        """
+        lifespan에서 백그라운드 태스크로 실행합니다. 실패해도 첫 검색 때 다시 시도합니다.
+        """
+        try:
+            await self.ensure_loaded_async()
+        except Exception:
+            pass
+
+    def status(self):
+        return {
+            "state": self.state,
+            "ready": self.state == "ready",
+            "error": self.error,
+            "index_loaded": self.index is not None,
+            "ner_loaded": self.ner_worker is not None,
+            "ner_backend": self.ner_backend,
+            "steps": self.profiler.report(),
+            "total_seconds": round(self.profiler.total(), 3),
+            "index_version": self.index.version if self.index is not None else None,
+            "index_loaded_at": self.index.loaded_at if self.index is not None else None,
+            "chunks": len(self.index.vector_store.metadata) if self.index is not None else None,
+            "entities": len(self.index.vector_store.entities)
+            if self.index is not None and self.index.vector_store.entities is not None else None,
+            "reload_steps": self.reload_profiler.report() if self.reload_profiler is not None else [],
+            "reload_error": self.reload_error,
+        }
+
+    def close(self):
+        if self.ner_worker is not None:
+            self.ner_worker.close()
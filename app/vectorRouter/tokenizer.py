@@ -0,0 +1,160 @@
+# tokenizer.py
+import os
+import re
+import logging
+import numpy as np
+from dotenv import load_dotenv
+
+# 코드 설명 요약:
+# BM25 색인/검색에 같이 쓰는 토크나이저 모음입니다. (외부 형태소 분석기 없이 순수 파이썬)
+# - whitespace: 기존 방식 (공백 분리)
+# - korean: 단어 끝의 조사를 떼어냄 ("강남역에서" -> "강남역")
+# - ngram: 조사를 뗀 단어를 글자 n-gram으로 나눔 (복합 명사 부분 일치용)
+# 토큰화한 코퍼스는 인덱스 파일 옆에 저장해서 서버를 다시 띄울 때 재사용합니다.
+
+load_dotenv()
+
+BM25_TOKENIZER = os.getenv("BM25_TOKENIZER", "korean")  # 사용할 토크나이저 이름
+
+WORD_PATTERN = re.compile(r"\w+")
+HANGUL_PATTERN = re.compile(r"[가-힣]")
+
+# 긴 조사부터 떼어내야 "에서는"이 "에서" + "는"으로 잘못 나뉘지 않음
+JOSA_SUFFIXES = sorted([
+    "에서는", "에서도", "에게서", "으로는", "으로도", "이라고", "까지는", "부터는",
+    "에서", "에게", "한테", "께서", "으로", "까지", "부터", "처럼", "보다", "이랑", "마다", "밖에", "이나", "이며",
+    "은", "는", "이", "가", "을", "를", "의", "에", "와", "과", "도", "만", "로", "랑", "나",
+], key=len, reverse=True)
+
+
+def strip_josa(word: str, min_stem=2):
+    """
+    한글 단어 끝의 조사를 떼어냅니다. 남는 어간이 min_stem 글자보다 짧으면 그대로 둡니다.
+    """
+    if not HANGUL_PATTERN.search(word[-1:]):
+        return word
+    for suffix in JOSA_SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= min_stem:
+            return word[:-len(suffix)]
+    return word
+
+
+class WhitespaceTokenizer:
+    name = "whitespace"
+    version = 1
+
+    def tokenize(self, text: str):
+        return text.split(" ")
+
+
+class KoreanTokenizer:
+    name = "korean"
+    version = 1
+
+    def tokenize(self, text: str):
+        return [strip_josa(word) for word in WORD_PATTERN.findall(text.lower())]
+
+
+class CharNgramTokenizer:
+    name = "ngram"
+    version = 1
+
+    def __init__(self, n=2):
+        self.n = n
+
+    def tokenize(self, text: str):
+        tokens = []
+        for word in WORD_PATTERN.findall(text.lower()):
+            word = strip_josa(word)
+            if len(word) <= self.n:
+                tokens.append(word)
+            else:
+                tokens.extend(word[i:i + self.n] for i in range(len(word) - self.n + 1))
+        return tokens
+
+
+TOKENIZERS = {
+    WhitespaceTokenizer.name: WhitespaceTokenizer,
+    KoreanTokenizer.name: KoreanTokenizer,
+    CharNgramTokenizer.name: CharNgramTokenizer,
+}
+
+
+def get_tokenizer(name: str = BM25_TOKENIZER):
+    if name not in TOKENIZERS:
+        raise ValueError(f"지원하지 않는 토크나이저입니다: {name} (사용 가능: {', '.join(TOKENIZERS)})")
+    return TOKENIZERS[name]()
+
+
+class TokenizedCorpus:
+    def __init__(self, vocab, token_ids, doc_offsets):
+        """
+        토큰화된 코퍼스를 평평한 배열로 저장합니다.
+        :param vocab: 토큰 번호 -> 토큰 문자열 리스트
+        :param token_ids: 모든 문서의 토큰 번호를 이어 붙인 int32 배열
+        :param doc_offsets: 문서 d의 토큰 범위 token_ids[doc_offsets[d]:doc_offsets[d+1]]
+        """
+        self.vocab = vocab
+        self.token_ids = token_ids
+        self.doc_offsets = doc_offsets
+
+    @classmethod
+    def build(cls, corpus, tokenizer):
+        vocab = dict()
+        token_ids = []
+        doc_offsets = [0]
+        for document in corpus:
+            token_ids.extend(vocab.setdefault(token, len(vocab)) for token in tokenizer.tokenize(document))
+            doc_offsets.append(len(token_ids))
+        return cls(list(vocab), np.array(token_ids, dtype=np.int32), np.array(doc_offsets, dtype=np.int64))
+
+    def save(self, path, signature):
+        tmp_path = path + ".tmp.npz"
+        np.savez(tmp_path, vocab=np.array(self.vocab, dtype=str), token_ids=self.token_ids,
+                 doc_offsets=self.doc_offsets, signature=np.array(signature))
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path, signature):
+        """
+        저장된 코퍼스의 서명이 다르면(토크나이저/메타데이터 변경) None을 반환합니다.
+        """
+        with np.load(path, allow_pickle=False) as data:
+            if str(data["signature"]) != signature:
+                return None
+            return cls(data["vocab"].tolist(), data["token_ids"], data["doc_offsets"])
+
+
+def tokenized_corpus_path(index_file, tokenizer):
+    return f"{os.path.splitext(index_file)[0]}.tokens.{tokenizer.name}.npz"
+
+
+def corpus_signature(metadata_file, corpus_size, tokenizer):
+    stat = os.stat(metadata_file) if os.path.exists(metadata_file) else None
+    source = f"{stat.st_size}:{stat.st_mtime_ns}" if stat else "none"
+    return f"{tokenizer.name}:{tokenizer.version}:{corpus_size}:{source}"
+
+
+def load_or_build_tokenized_corpus(index_file, metadata_file, corpus, tokenizer, persist=True):
+    """
+    인덱스 파일 옆에 저장된 토큰화 결과가 최신이면 불러오고, 아니면 새로 토큰화해서 저장합니다.
+    :param persist: False면 파일을 읽거나 쓰지 않고 매번 새로 토큰화
+    """
+    path = tokenized_corpus_path(index_file, tokenizer)
+    signature = corpus_signature(metadata_file, len(corpus), tokenizer)
+    if persist and os.path.exists(path):
+        try:
+            tokenized = TokenizedCorpus.load(path, signature)
+            if tokenized is not None:
+                logging.info(f"저장된 토큰화 코퍼스를 사용합니다: {path}")
+                return tokenized
+        except (OSError, ValueError, KeyError) as e:
+            logging.warning(f"토큰화 코퍼스를 읽지 못했습니다. 다시 만듭니다: {str(e)}")
+
+    tokenized = TokenizedCorpus.build(corpus, tokenizer)
+    if persist:
+        try:
+            tokenized.save(path, signature)
+        except OSError as e:
+            logging.warning(f"토큰화 코퍼스를 저장하지 못했습니다: {str(e)}")
+    return tokenized
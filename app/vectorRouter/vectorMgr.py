@@ -2,29 +2,25 @@ import re  # 정규 표현식 모듈
 from dotenv import load_dotenv  # .env 파일의 환경 변수를 로드하기 위한 모듈
 from langchain_openai import OpenAIEmbeddings  # OpenAI 임베딩을 사용하기 위한 모듈
 from app.vectorRouter.exceptions import EmptySearchQueryException, EmptyVectorStoreException, NoSearchResultsException  # 사용자 정의 예외 처리 모듈
-from rank_bm25 import BM25Okapi  # BM25 모델을 사용하기 위한 모듈
 import os  # 운영체제 관련 모듈
 import numpy as np  # 배열 연산을 위한 라이브러리
 from collections import defaultdict  # 기본값이 있는 딕셔너리를 사용하기 위한 모듈
 import time  # 시간 측정 모듈
 import logging  # 로깅 모듈
 import asyncio  # 비동기 처리를 위한 모듈
-from app.vectorRouter.FaissVectorStore import FaissVectorStore  # FAISS 벡터 저장소 클래스
+from app.vectorRouter.startupMgr import SearchResources  # 검색 리소스 지연 로드/워밍업
 from app.vectorRouter.promptMgr import generate_gpt_response  # OpenAI API를 호출하는 함수
-from transformers import AutoTokenizer, AutoModelForTokenClassification  # BERT 모델과 토크나이저 사용
-from transformers import pipeline  # 파이프라인을 사용하여 NLP 모델 적용
-import torch  # PyTorch 딥러닝 라이브러리
-import requests  # HTTP 요청을 위한 모듈
-import base64  # 이미지를 base64 형식으로 인코딩하기 위한 모듈
-import aiohttp  # 비동기 HTTP 요청 모듈
+from app.vectorRouter.imageMgr import image_fetcher  # 비동기 이미지 캐시/클라이언트
+from app.vectorRouter.embeddingMgr import EMBEDDING_MODEL, QueryEmbeddingCache, QueryEmbedder  # 검색어 임베딩 캐시/배칭
 
 
 # 코드 설명 요약:
 # 환경설정 및 임베딩 생성: .env 파일에서 OpenAI API 키를 로드하고, OpenAI 임베딩 객체를 생성합니다.
 # 검색어 전처리 및 NER 수행: 검색어를 정규 표현식을 통해 전처리하고, NER(Named Entity Recognition) 모델을 사용하여 엔티티 키워드를 추출합니다.
-# BM25 및 FAISS 검색 수행: BM25와 FAISS를 결합하여 검색 점수를 계산하고, 이를 바탕으로 상위 문서를 선택합니다.
+# BM25 및 FAISS 검색 수행: 가게 인덱스(중심 벡터)와 BM25 상위 문서로 후보 가게를 고르고, 후보 가게의 청크만
+#   BM25와 FAISS 점수를 결합해 다시 계산한 뒤 가게별 최고 점수로 서로 다른 가게 k개를 선택합니다.
 # 비동기 요약 생성: 검색된 문서에 대해 OpenAI API를 통해 비동기적으로 요약을 생성하고, 결과를 반환합니다.
-# 이미지 처리: 이미지 URL을 base64로 변환하여 반환합니다.
+# 이미지 처리: 이미지를 비동기로 동시에 가져와 캐시하고, /img 경로(또는 base64)로 반환합니다.
 
 # 로깅 설정
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -34,47 +30,28 @@ load_dotenv()  # 환경 변수를 로드하여 사용
 openai_api_key = os.getenv("OPENAI_API_KEY")  # .env 파일에서 OpenAI API 키를 가져옴
 
 # OpenAI 임베딩 객체 생성
-embeddings = OpenAIEmbeddings(model="text-embedding-3-small")  # OpenAI의 텍스트 임베딩 모델 사용
+embeddings = OpenAIEmbeddings(model=EMBEDDING_MODEL)  # OpenAI의 텍스트 임베딩 모델 사용
+query_embedder = QueryEmbedder(embeddings, QueryEmbeddingCache())  # 캐시 + 동시 요청 묶음 처리
 
-# 벡터 저장소 인스턴스 생성
-vector_store = FaissVectorStore()  # FAISS 벡터 저장소 인스턴스 초기화
+# 검색 리소스 (FAISS 인덱스/메타데이터, BM25 역색인, NER 모델)는 import 시점이 아니라
+# 앱 시작 후 백그라운드 워밍업 또는 첫 검색 때 로드 (startupMgr 참고)
+search_resources = SearchResources()
 
-# 코퍼스 생성 (벡터 저장소에서 가져온 데이터로 텍스트 목록 생성)
-corpus = [meta.get("chunk_content", " ") for meta in vector_store.metadata]
+# 결과 하나당 다시 계산할 후보 가게 수 (중심 벡터로 고르는 가게 수 = k * 이 값, BM25로 고르는 가게도 최대 같은 수)
+ENTITY_CANDIDATE_FACTOR = int(os.getenv("ENTITY_CANDIDATE_FACTOR", "4"))
 
-# 코퍼스가 비어 있는 경우 예외 발생
-if not corpus:
-    raise EmptyVectorStoreException("메타 데이터 안에 chunk_content 없습니다.")  # 벡터 저장소가 비어 있을 경우 예외 발생
-
-# BM25 모델 초기화
-tokenized_corpus = [doc.split(" ") for doc in corpus]  # 코퍼스를 공백으로 토큰화
-bm25 = BM25Okapi(tokenized_corpus)  # BM25 모델 초기화
-
-# NER 모델 로드 (KLUE BERT 사용)
-ner_model_name = "klue/bert-base"  # 한국어 NER을 위한 BERT 모델
-ner_tokenizer = AutoTokenizer.from_pretrained(ner_model_name)  # 토크나이저 로드
-try:
-    ner_model = AutoModelForTokenClassification.from_pretrained(ner_model_name)  # 모델 로드
-except EnvironmentError:
-    raise EnvironmentError("모델 'klue/bert-base'을 로드할 수 없습니다.")  # 모델 로드 실패 시 예외 발생
-
-# NER(Named Entity Recognition) 파이프라인 생성
-ner_pipeline = pipeline("ner", model=ner_model, tokenizer=ner_tokenizer, framework="pt", device=0 if torch.cuda.is_available() else -1)  # PyTorch 기반 NER 파이프라인 생성
-
-# OpenAI 임베딩을 생성하는 함수
-def get_openai_embedding(text: str):
-    embedding = embeddings.embed_query(text)  # OpenAI API로 임베딩 생성
-    return np.array(embedding, dtype=np.float32)  # NumPy 배열로 반환
+# OpenAI 임베딩을 생성하는 함수 (캐시에 없으면 동시에 들어온 검색어와 묶어서 비동기로 요청)
+async def get_openai_embedding(text: str):
+    return await query_embedder.embed(text)  # float32 NumPy 배열로 반환
 
 # 검색어를 전처리하고 NER 수행하는 함수 (필요 없는 키워드 필터링 추가)
-def preprocess_search_input(search_input: str):
+async def preprocess_search_input(search_input: str):
     # 검색어에서 단어를 추출
     keywords = re.findall(r'\b\w+\b', search_input)
     keywords = [word for word in keywords if len(word) > 1]  # 한 글자짜리 단어 제외
 
-    # NER 수행
-    entities = ner_pipeline(search_input)
-    entity_keywords = [entity['word'] for entity in entities if entity['entity'].startswith("B-")]  # B-로 시작하는 엔티티만 추출
+    # NER 수행 (이벤트 루프 밖의 추론 스레드에서 동시 검색어와 묶어서 처리, 같은 검색어는 캐시 사용)
+    entity_keywords = await search_resources.ner_worker.extract(search_input)  # B-로 시작하는 엔티티만 추출
 
     # NER 키워드를 기존 키워드 리스트에 추가
     keywords.extend(entity_keywords)
@@ -85,123 +62,158 @@ def preprocess_search_input(search_input: str):
     
     return filtered_keywords  # 전처리된 키워드 반환
 
-# RAG(검색 + 생성) 기반 검색 함수 (비동기)
-async def search_with_rag(search_input: str, k: int = 5, bm25_weight: float = 1, faiss_weight: float = 1.5, threshold: float = 0.6):
+# 점수 배열에서 상위 문서를 내림차순으로 하나씩 꺼내주는 함수
+def iter_ranked_indices(indices, scores, batch_size):
+    """
+    전체를 정렬하지 않고 argpartition으로 상위 batch_size개만 정렬해서 돌려준다.
+    이름/data_id 중복으로 후보가 모자라면 범위를 두 배씩 늘려가며 이어서 꺼낸다.
+    :param indices: 후보 문서 인덱스 배열
+    :param scores: indices와 같은 순서의 점수 배열
+    :param batch_size: 처음 정렬할 상위 후보 개수
+    """
+    total = len(indices)
+    emitted = np.zeros(total, dtype=bool)  # 동점 때문에 경계가 바뀌어도 같은 문서를 두 번 내보내지 않도록 기록
+    top = min(max(batch_size, 1), total)
+    while top > 0:
+        if top < total:
+            top_positions = np.argpartition(-scores, top - 1)[:top]  # 상위 top개만 골라냄 (O(N))
+        else:
+            top_positions = np.arange(total)
+        order = top_positions[np.argsort(-scores[top_positions], kind="stable")]  # 상위 top개만 정렬
+        for position in order[~emitted[order]]:
+            emitted[position] = True
+            yield int(indices[position])
+        if top == total:
+            break
+        top = min(top * 2, total)
+
+# 검색(BM25 + FAISS)만 수행해서 상위 k개 가게 정보를 돌려주는 함수 (요약/이미지 제외)
+async def retrieve_results(search_input: str, k: int = 5, bm25_weight: float = 1, faiss_weight: float = 1.5, threshold: float = 0.6):
+    """
+    검색어로 가게 후보를 골라 결과 카드에 필요한 정보와 요약에 쓸 본문을 반환합니다.
+    :return: name, address, data_id, link, img(원본 URL), full_content 를 담은 딕셔너리 리스트
+    """
     if not search_input:
         raise EmptySearchQueryException()  # 검색어가 없을 경우 예외 발생
 
+    await search_resources.ensure_loaded_async()  # 워밍업이 끝나지 않았으면 로드될 때까지 대기
+    index = search_resources.index  # 검색 도중 바뀌지 않도록 현재 인덱스를 잡아둠
+    vector_store = index.vector_store
+
+    keywords = await preprocess_search_input(search_input)  # 검색어 전처리 및 NER 수행
+    if not keywords:
+        raise EmptySearchQueryException("유효한 검색 키워드가 없습니다.")  # 유효한 키워드가 없을 경우 예외 발생
+
+    logging.info(f"검색어 전처리 완료: {keywords}")  # 전처리 완료 로그 출력
+
+    # BM25 검색 (키워드별 점수의 합 = 모든 키워드 토큰으로 한 번에 계산한 점수)
+    # 후보를 고를 때는 MaxScore로 상위 문서만 찾음 (점수가 모자란 문서는 끝까지 계산하지 않음)
+    candidate_count = k * ENTITY_CANDIDATE_FACTOR
+    tokenized_query = [token for keyword in keywords for token in index.tokenizer.tokenize(keyword)]  # 코퍼스와 같은 토크나이저로 토큰화
+    bm25_docs, bm25_top_scores = index.bm25.top_k(tokenized_query, candidate_count)
+    bm25_max = bm25_top_scores[0] if len(bm25_top_scores) else 0  # 정규화 기준 (1위 점수 = 전체 최고 점수)
+
+    # FAISS 검색
+    embedding = await get_openai_embedding(search_input)  # 검색어 임베딩 생성
+
+    if vector_store.dim is None or vector_store.entities is None:
+        raise EmptyVectorStoreException("FAISS 벡터 저장소가 초기화되지 않았습니다.")  # FAISS 벡터 저장소가 초기화되지 않았을 경우 예외 발생
+
+    # 후보 가게: 중심 벡터가 가까운 가게 + BM25 점수가 높은 청크의 가게
+    entities = vector_store.entities
+    candidate_entities = entities.search(embedding, candidate_count)
+    if len(bm25_docs):
+        top_docs = bm25_docs[bm25_docs < entities.chunk_count]
+        candidate_entities = np.union1d(candidate_entities, entities.row_entities[top_docs])
+
+    # 후보 가게의 청크만 FAISS 거리를 다시 계산 (작업량은 후보 가게 수로 제한)
+    rows = entities.entity_rows(candidate_entities)
+    faiss_similarities = 1 - vector_store.chunk_distances(embedding, rows)  # FAISS 유사도 계산
+    if len(faiss_similarities) and np.max(faiss_similarities) > 0:
+        faiss_similarities = faiss_similarities / np.max(faiss_similarities)  # 유사도 정규화
+
+    # BM25와 FAISS 점수 결합 (가중치 조정) - 후보 청크의 BM25 점수만 포스팅에서 찾아 계산
+    row_bm25_scores = index.bm25.get_doc_scores(tokenized_query, rows)
+    if bm25_max > 0:
+        row_bm25_scores = row_bm25_scores / bm25_max  # 점수를 0~1 사이로 정규화
+    combined_scores = row_bm25_scores * bm25_weight + faiss_similarities * faiss_weight  # 점수에 가중치 부여
+
+    # 임계값 적용 후 가게별로 점수가 가장 높은 청크 하나만 남김 (결과가 서로 다른 가게가 됨)
+    passed = combined_scores >= threshold  # 임계값 이상인 문서만 선택
+    passed_rows = rows[passed]
+    passed_scores = combined_scores[passed]
+    order = np.argsort(-passed_scores, kind="stable")
+    _, first = np.unique(entities.row_entities[passed_rows[order]], return_index=True)
+    best = order[first]
+    ranked_indices = iter_ranked_indices(passed_rows[best], passed_scores[best], batch_size=k)  # 점수 순으로 필요한 만큼만 정렬
+
+    logging.info(f"후보 가게 {len(candidate_entities)}개, 다시 계산한 청크 {len(rows)}개, "
+                 f"임계값을 넘은 가게 {len(best)}개")  # 선택된 가게 개수 로그 출력
+
+    # 결과 수집
+    combined_results = defaultdict(list)
+
+    for idx in ranked_indices:
+        if idx < len(vector_store.metadata):
+            data_id = vector_store.metadata[idx].get("data_id")
+            if data_id in combined_results:
+                continue  # 이미 처리한 데이터는 건너뜀
+
+            chunk_contents = vector_store.get_chunk_contents(data_id)  # 미리 만든 조회 테이블로 청크 조회
+            if chunk_contents:
+                combined_results[data_id].extend(chunk_contents)  # 결과를 수집
+
+            if len(combined_results) >= k:
+                break  # K개의 결과를 넘으면 종료
+
+    entries = []
+    for data_id, chunks in combined_results.items():
+        meta_info = vector_store.get_store_info(data_id)
+        entries.append({
+            "name": meta_info.get('name', 'Unknown'),
+            "address": meta_info.get('address', 'Unknown'),
+            "data_id": data_id,
+            "link": meta_info.get('link', ''),
+            "img": meta_info.get('img'),
+            "full_content": " ".join(chunks)  # 결과 내용을 하나로 합침
+        })
+    return entries
+
+# 검색 결과 카드 형태로 변환하는 함수 (요약/이미지는 나중에 채움)
+def format_result(entry):
+    return {
+        "name": entry["name"],
+        "summary": "",
+        "address": entry["address"],
+        "data_id": entry["data_id"],
+        "image": None,
+        "link": entry["link"]
+    }
+
+# RAG(검색 + 생성) 기반 검색 함수 (비동기)
+async def search_with_rag(search_input: str, k: int = 5, bm25_weight: float = 1, faiss_weight: float = 1.5, threshold: float = 0.6, session=None):
+    # session: 앱 lifespan에서 만든 공유 aiohttp 세션 (요약/이미지 요청에 재사용)
     logging.info("검색을 시작합니다.")  # 검색 시작 로그 출력
 
     try:
-        keywords = preprocess_search_input(search_input)  # 검색어 전처리 및 NER 수행
-        if not keywords:
-            raise EmptySearchQueryException("유효한 검색 키워드가 없습니다.")  # 유효한 키워드가 없을 경우 예외 발생
-
-        logging.info(f"검색어 전처리 완료: {keywords}")  # 전처리 완료 로그 출력
-
-        # BM25 검색
-        bm25_scores = np.zeros(len(corpus))  # BM25 점수를 저장할 배열 초기화
-        for keyword in keywords:
-            tokenized_query = keyword.split(" ")  # 키워드를 공백으로 분리하여 토큰화
-            keyword_scores = bm25.get_scores(tokenized_query)  # BM25 점수 계산
-            bm25_scores += keyword_scores  # 점수를 합산
-
-        if np.max(bm25_scores) > 0:
-            bm25_scores = bm25_scores / np.max(bm25_scores)  # 점수를 0~1 사이로 정규화
-
-        # FAISS 검색
-        embedding = get_openai_embedding(search_input)  # 검색어 임베딩 생성
-
-        if vector_store.dim is None:
-            raise EmptyVectorStoreException("FAISS 벡터 저장소가 초기화되지 않았습니다.")  # FAISS 벡터 저장소가 초기화되지 않았을 경우 예외 발생
-
-        D, I = vector_store.search(embedding.reshape(1, -1), k=k*3)  # FAISS 검색 수행 (k*n n값을 조정하여 후보 갯수 설정해야함 너무많으면 느림.)
-        
-        faiss_similarities = 1 - D[0]  # FAISS 유사도 계산
-        if np.max(faiss_similarities) > 0:
-            faiss_similarities = faiss_similarities / np.max(faiss_similarities)  # 유사도 정규화
-
-        # BM25와 FAISS 점수 결합 (가중치 조정)
-        combined_scores = {}
-        for idx in range(len(corpus)):
-            bm25_score = bm25_scores[idx] * bm25_weight  # BM25 점수에 가중치 부여
-            faiss_score = faiss_similarities[np.where(I[0] == idx)[0][0]] * faiss_weight if idx in I[0] else 0  # FAISS 점수에 가중치 부여
-            combined_scores[idx] = bm25_score + faiss_score  # 두 점수를 합산
-
-        # 임계값 적용 및 상위 문서 정렬
-        filtered_scores = {idx: score for idx, score in combined_scores.items() if score >= threshold}  # 임계값 이상인 문서만 선택
-        ranked_indices = sorted(filtered_scores, key=filtered_scores.get, reverse=True)  # 점수에 따라 문서 정렬
-
-        logging.info(f"최종 선택된 문서 개수: {len(ranked_indices)}")  # 선택된 문서 개수 로그 출력
-
-        # 메타데이터 인덱스 생성
-        metadata_index = defaultdict(dict)
-        for meta in vector_store.metadata:
-            data_id = meta.get("data_id")
-            metadata_index[data_id]['link'] = meta.get("link", "")
-            metadata_index[data_id]['name'] = meta.get("name", "Unknown")
-            metadata_index[data_id]['img'] = meta.get("img")
-            metadata_index[data_id]['address'] = meta.get("address", "Unknown")
-
-        # 결과 수집 및 요약 생성
-        seen = set()
-        combined_results = defaultdict(list)
-        formatted_result = []
-        unique_names = set()
+        entries = await retrieve_results(search_input, k, bm25_weight, faiss_weight, threshold)
 
         start_time = time.time()
-        tasks = []
-
-        for idx in ranked_indices:
-            if idx < len(vector_store.metadata):
-                meta = vector_store.metadata[idx]
-                data_id = meta.get("data_id")
-                name = meta.get("name", "Unknown")
-
-                if name in unique_names:
-                    continue  # 이미 처리한 이름은 건너뜀
-
-                unique_names.add(name)  # 이름 추가
-
-                if data_id in seen:
-                    continue  # 이미 처리한 데이터는 건너뜀
-                seen.add(data_id)
-
-                for m in vector_store.metadata:
-                    if m.get("data_id") == data_id:
-                        chunk_content = m.get("chunk_content", "")
-                        if chunk_content:
-                            combined_results[data_id].append(chunk_content)  # 결과를 수집
-
-                if len(combined_results) >= k:
-                    break  # K개의 결과를 넘으면 종료
 
         # 비동기 요약 생성
-        for data_id, chunks in combined_results.items():
-            full_content = " ".join(chunks)  # 결과 내용을 하나로 합침
+        tasks = [generate_gpt_response(entry["name"], entry["full_content"], search_input, session=session, link=entry["link"])
+                 for entry in entries]  # GPT 요약 요청
+        image_urls = [entry["img"] for entry in entries]
+        formatted_result = [format_result(entry) for entry in entries]
 
-            meta_info = metadata_index.get(data_id, {})
-            link = meta_info.get('link', '')
-            name = meta_info.get('name', 'Unknown')
-            address = meta_info.get('address', 'Unknown')
-            img = meta_info.get('img')
-
-            task = generate_gpt_response(name, full_content,search_input)  # GPT 요약 요청
-            tasks.append(task)
-
-            formatted_result.append({
-                "name": name,
-                "summary": "",
-                "address": address,
-                "data_id": data_id,
-                "image": image_url_to_base64(img),  # 이미지 URL을 base64로 변환
-                "link": link
-            })
-
-        summaries = await asyncio.gather(*tasks)  # 비동기 요약 요청 실행
+        summaries, images = await asyncio.gather(
+            asyncio.gather(*tasks),  # 비동기 요약 요청 실행
+            image_fetcher.get_image_srcs(image_urls, session=session)  # 이미지도 요약과 동시에 가져옴
+        )
 
         for i, summary in enumerate(summaries):
             formatted_result[i]['summary'] = summary  # 요약 결과를 삽입
+            formatted_result[i]['image'] = images[i]  # 이미지 경로를 삽입 (실패 시 None -> 기본 이미지)
 
         end_time = time.time()
         logging.info(f"전체 요약 생성 소요 시간: {end_time - start_time:.2f}초")  # 처리 시간 로그 출력
@@ -215,13 +227,41 @@ async def search_with_rag(search_input: str, k: int = 5, bm25_weight: float = 1,
         logging.error(f"검색 중 오류 발생: {str(e)}")  # 예외 발생 시 로그 출력
         raise  # 예외 재발생
 
+# 검색 결과를 점진적으로 내보내는 함수 (비동기 제너레이터)
+async def stream_search_with_rag(search_input: str, k: int = 5, bm25_weight: float = 1, faiss_weight: float = 1.5, threshold: float = 0.6, session=None):
+    """
+    검색 직후 결과 카드를 먼저 보내고, 요약/이미지는 끝나는 순서대로 이벤트로 보냅니다.
+    이벤트: {"type": "results"} -> {"type": "summary" | "image", "index": i} ... -> {"type": "done"}
+    """
+    logging.info("스트리밍 검색을 시작합니다.")  # 검색 시작 로그 출력
+
+    entries = await retrieve_results(search_input, k, bm25_weight, faiss_weight, threshold)
+    yield {"type": "results", "results": [format_result(entry) for entry in entries]}
+
+    start_time = time.time()
+    pending = dict()  # 태스크 -> (이벤트 종류, 결과 인덱스)
+    for i, entry in enumerate(entries):
+        summary_task = asyncio.ensure_future(
+            generate_gpt_response(entry["name"], entry["full_content"], search_input, session=session, link=entry["link"]))
+        image_task = asyncio.ensure_future(image_fetcher.get_image_src(entry["img"], session))
+        pending[summary_task] = ("summary", i)
+        pending[image_task] = ("image", i)
 
-# 이미지 URL을 base64로 변환하는 함수
-def image_url_to_base64(image_url):
-    response = requests.get(image_url)  # 이미지 URL에 대한 HTTP 요청
-    if response.status_code == 200:
-        image_binary = response.content  # 이미지 바이너리 데이터 추출
-        image_base64 = base64.b64encode(image_binary).decode('utf-8')  # base64로 인코딩
-        return f"data:image/png;base64,{image_base64}"  # base64 이미지 문자열 반환
-    else:
-        raise Exception(f"Failed to retrieve image. Status code: {response.status_code}")  # 이미지 요청 실패 시 예외 발생
+    try:
+        while pending:
+            done, _ = await asyncio.wait(pending.keys(), return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                kind, index = pending.pop(task)
+                try:
+                    value = task.result()
+                except Exception as e:
+                    logging.error(f"{kind} 생성 중 오류 발생: {str(e)}")
+                    value = "요약 생성 실패" if kind == "summary" else None
+                yield {"type": kind, "index": index, kind: value}
+    finally:
+        # 클라이언트가 중간에 끊으면 남은 요청 취소
+        for task in pending:
+            task.cancel()
+
+    logging.info(f"스트리밍 요약 생성 소요 시간: {time.time() - start_time:.2f}초")  # 처리 시간 로그 출력
+    yield {"type": "done"}
@@ -0,0 +1,3 @@
+# 웹 앱(app)과 DBMgr(Good DBMgr)가 같이 쓰는 저장 형식 모듈
+# (컬럼 메타데이터 .cols, 임베딩 영구 캐시, 가게 인덱스 .entities.npz, 세그먼트/매니페스트/로그 파일 이름)
+# 두 쪽이 같은 파일을 읽고 쓰므로 복사본을 따로 두지 않고 이 패키지 하나만 고칩니다.
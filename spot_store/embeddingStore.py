@@ -0,0 +1,201 @@
+# embeddingStore.py
+import os
+import re
+import time
+import sqlite3
+import hashlib
+import threading
+import numpy as np
+
+# 코드 설명 요약:
+# 임베딩 벡터를 디스크에 영구 저장하는 내용 주소(content-addressed) 캐시입니다.
+# 모델 버전별 폴더 안에 벡터 행렬(vectors.f32, float32, 메모리 맵으로 읽음)과
+# 키(텍스트 sha256) -> 행 번호 색인(index.sqlite3)을 둡니다.
+# DBMgr(청크 임베딩, Retriever 탭)와 웹 앱(검색어 임베딩)이 같은 폴더를 같이 씁니다.
+# 용량 한도를 넘으면 가장 오래 안 쓴 항목의 행을 비워서 재사용합니다.
+
+EMBEDDING_STORE_MAX_BYTES = 1024 * 1024 * 1024  # 모델별 벡터 파일 최대 크기 (1GB)
+FREE_ROW_GRACE_SECONDS = 60  # 지운 행은 이 시간이 지난 뒤에 재사용 (다른 프로세스가 읽는 중일 수 있음)
+
+
+def model_dir_name(model):
+    return re.sub(r"[^0-9A-Za-z._-]", "_", model)
+
+
+class EmbeddingStore:
+    def __init__(self, root_dir, model, max_bytes=EMBEDDING_STORE_MAX_BYTES):
+        """
+        :param root_dir: 캐시 최상위 폴더 (모델별 하위 폴더 생성)
+        :param model: 임베딩 모델 버전 (같은 텍스트라도 모델이 다르면 다른 항목)
+        :param max_bytes: 벡터 파일 최대 크기 (넘으면 오래 안 쓴 항목부터 제거)
+        """
+        self.model = model
+        self.max_bytes = max_bytes
+        self.dir = os.path.join(root_dir, model_dir_name(model))
+        os.makedirs(self.dir, exist_ok=True)
+        self.vectors_path = os.path.join(self.dir, "vectors.f32")
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evictions = 0
+        self.matrix = None  # 벡터 파일 메모리 맵 (파일이 커지면 다시 매핑)
+
+        # 여러 프로세스(웹 워커, DBMgr)가 같이 쓰므로 잠금 대기 시간을 넉넉히 둠
+        # 트랜잭션은 직접 BEGIN/COMMIT으로 관리 (isolation_level=None)
+        self.connection = sqlite3.connect(os.path.join(self.dir, "index.sqlite3"), timeout=30,
+                                          check_same_thread=False, isolation_level=None)
+        with self.lock:
+            self.connection.executescript("""
+                CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, row INTEGER NOT NULL, last_used REAL NOT NULL);
+                CREATE INDEX IF NOT EXISTS entries_last_used ON entries (last_used);
+                CREATE TABLE IF NOT EXISTS free_rows (row INTEGER PRIMARY KEY, freed_at REAL NOT NULL);
+                CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value INTEGER NOT NULL);
+            """)
+        self.dim = self._get_meta("dim")
+
+    @staticmethod
+    def make_key(text):
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    def _get_meta(self, name, default=None):
+        row = self.connection.execute("SELECT value FROM meta WHERE name = ?", (name,)).fetchone()
+        return row[0] if row else default
+
+    def _map(self, min_rows):
+        """
+        벡터 파일을 메모리 맵으로 엽니다. 다른 프로세스가 파일을 늘렸으면 다시 매핑합니다.
+        """
+        if self.matrix is not None and len(self.matrix) >= min_rows:
+            return self.matrix
+        rows = os.path.getsize(self.vectors_path) // (self.dim * 4)
+        self.matrix = np.memmap(self.vectors_path, dtype=np.float32, mode="r", shape=(rows, self.dim))
+        return self.matrix
+
+    def get_many(self, keys):
+        """
+        :param keys: make_key로 만든 키 리스트
+        :return: 키 순서대로 float32 벡터 (없으면 None)
+        """
+        if not keys:
+            return []
+        with self.lock:
+            if self.dim is None:
+                self.dim = self._get_meta("dim")
+            found = dict()
+            unique_keys = list(set(keys))
+            for start in range(0, len(unique_keys), 500):  # SQLite 변수 개수 제한
+                part = unique_keys[start:start + 500]
+                found.update(self.connection.execute(
+                    f"SELECT key, row FROM entries WHERE key IN ({','.join('?' * len(part))})", part).fetchall())
+            if found:
+                matrix = self._map(max(found.values()) + 1)
+                vectors = {key: np.array(matrix[row]) for key, row in found.items()}  # 맵에서 복사해서 반환
+                now = time.time()
+                self.connection.execute("BEGIN")
+                self.connection.executemany("UPDATE entries SET last_used = ? WHERE key = ?",
+                                            [(now, key) for key in found])
+                self.connection.execute("COMMIT")
+            else:
+                vectors = dict()
+        results = [vectors.get(key) for key in keys]
+        hits = sum(vector is not None for vector in results)
+        self.hits += hits
+        self.misses += len(results) - hits
+        return results
+
+    def get(self, key):
+        return self.get_many([key])[0]
+
+    def put_many(self, keys, vectors):
+        """
+        벡터를 저장합니다. 이미 있는 키는 건너뜁니다.
+        :param keys: make_key로 만든 키 리스트
+        :param vectors: 키 순서대로 float32 벡터
+        """
+        items = {key: np.asarray(vector, dtype=np.float32).reshape(-1) for key, vector in zip(keys, vectors)}
+        if not items:
+            return
+        with self.lock:
+            cursor = self.connection.cursor()
+            cursor.execute("BEGIN IMMEDIATE")  # 다른 프로세스의 쓰기와 행 번호가 겹치지 않도록 잠금
+            try:
+                dim = self._get_meta("dim")
+                if dim is None:
+                    dim = len(next(iter(items.values())))
+                    cursor.execute("INSERT INTO meta (name, value) VALUES ('dim', ?)", (dim,))
+                self.dim = dim
+
+                existing = set()
+                item_keys = list(items)
+                for start in range(0, len(item_keys), 500):
+                    part = item_keys[start:start + 500]
+                    existing.update(key for key, in cursor.execute(
+                        f"SELECT key FROM entries WHERE key IN ({','.join('?' * len(part))})", part))
+                new_items = [(key, vector) for key, vector in items.items() if key not in existing and len(vector) == dim]
+                if not new_items:
+                    cursor.execute("COMMIT")
+                    return
+
+                rows = self._allocate_rows(cursor, len(new_items), dim)
+                with open(self.vectors_path, "r+b" if os.path.exists(self.vectors_path) else "w+b") as f:
+                    for row, (_, vector) in zip(rows, new_items):
+                        f.seek(row * dim * 4)
+                        f.write(vector.tobytes())
+                now = time.time()
+                cursor.executemany("INSERT INTO entries (key, row, last_used) VALUES (?, ?, ?)",
+                                   [(key, row, now) for row, (key, _) in zip(rows, new_items)])
+                cursor.execute("COMMIT")
+                self.writes += len(new_items)
+            except Exception:
+                cursor.execute("ROLLBACK")
+                raise
+
+    def _allocate_rows(self, cursor, count, dim):
+        """
+        새 항목이 들어갈 행 번호를 정합니다.
+        용량 한도를 넘으면 가장 오래 안 쓴 항목을 지워서 빈 행 목록에 넣고, 충분히 지난 빈 행부터 재사용합니다.
+        지운 행을 바로 덮어쓰지 않기 때문에 벡터 파일은 한도보다 잠깐 (배치 하나만큼) 커질 수 있습니다.
+        """
+        max_rows = max(1, self.max_bytes // (dim * 4))
+        now = time.time()
+
+        live = cursor.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+        over = live + count - max_rows
+        if over > 0:
+            victims = cursor.execute("SELECT key, row FROM entries ORDER BY last_used LIMIT ?", (over,)).fetchall()
+            cursor.executemany("DELETE FROM entries WHERE key = ?", [(key,) for key, _ in victims])
+            cursor.executemany("INSERT OR REPLACE INTO free_rows (row, freed_at) VALUES (?, ?)",
+                               [(row, now) for _, row in victims])
+            self.evictions += len(victims)
+
+        rows = [row for row, in cursor.execute("SELECT row FROM free_rows WHERE freed_at <= ? ORDER BY row LIMIT ?",
+                                               (now - FREE_ROW_GRACE_SECONDS, count))]
+        cursor.executemany("DELETE FROM free_rows WHERE row = ?", [(row,) for row in rows])
+
+        next_row = self._get_meta("next_row", 0)
+        appended = count - len(rows)
+        rows.extend(range(next_row, next_row + appended))
+        cursor.execute("INSERT OR REPLACE INTO meta (name, value) VALUES ('next_row', ?)", (next_row + appended,))
+        return rows
+
+    def stats(self):
+        with self.lock:
+            entries = self.connection.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+        lookups = self.hits + self.misses
+        return {
+            "model": self.model,
+            "entries": entries,
+            "bytes": os.path.getsize(self.vectors_path) if os.path.exists(self.vectors_path) else 0,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            "writes": self.writes,
+            "evictions": self.evictions,
+        }
+
+    def close(self):
+        with self.lock:
+            self.matrix = None
+            self.connection.close()
@@ -0,0 +1,170 @@
+# entityIndex.py
+import os
+import numpy as np
+import faiss
+
+# 코드 설명 요약:
+# 청크 인덱스 위에 가게(이름) 단위 2단계 인덱스를 둡니다.
+# 가게마다 청크 벡터의 평균(중심 벡터)을 하나씩 두고, 검색할 때는 먼저 중심 벡터로 후보 가게를 고른 뒤
+# 후보 가게의 청크만 다시 거리 계산합니다. 결과가 가게 단위라서 청크를 넉넉히 가져와 이름/data_id로
+# 거르지 않아도 서로 다른 가게 k개가 나오고, 다시 계산하는 청크 수는 후보 가게 수로 제한됩니다.
+# 파일(<인덱스 이름>.entities.npz): keys(가게 키), means(청크 벡터 평균), counts(청크 수),
+# offsets/rows(가게별 청크 행 번호, CSR). DBMgr가 기본 세그먼트를 저장할 때 같이 만들고,
+# 추가 세그먼트의 청크는 웹 앱이 열 때 build(base=...)로 이어 붙입니다. (DBMgr와 웹 앱이 이 모듈을 같이 씀)
+
+ENTITY_BLOCK_SIZE = 65536  # 중심 벡터를 계산할 때 한 번에 더하는 청크 수
+
+
+def entity_index_path(index_file):
+    return f"{os.path.splitext(index_file)[0]}.entities.npz"
+
+
+def entity_key(name, data_id):
+    """
+    가게 키: 공백을 정리한 가게 이름 (이름이 없으면 data_id로 따로 둠)
+    """
+    if isinstance(name, str) and name.strip():
+        return " ".join(name.split())
+    return f"#{data_id}"
+
+
+def _value(metadata, position, name):
+    if hasattr(metadata, "get_value"):
+        return metadata.get_value(position, name)
+    return metadata[position].get(name)
+
+
+def row_keys(metadata):
+    """
+    메타데이터 행별 가게 키 리스트
+    """
+    return [entity_key(_value(metadata, position, "name"), _value(metadata, position, "data_id"))
+            for position in range(len(metadata))]
+
+
+def ensure_direct_map(index):
+    """
+    IVF 인덱스는 행 번호로 벡터를 꺼내려면 direct map이 있어야 함 (없을 때만 만듦, 역리스트 크기에 비례)
+    """
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None and ivf.direct_map.type == faiss.DirectMap.NoMap:
+        ivf.make_direct_map()
+
+
+def index_blocks(index, block_size=ENTITY_BLOCK_SIZE):
+    """
+    인덱스의 벡터를 (시작 행, 벡터 블록)으로 꺼냅니다. (IVF-PQ는 압축된 값이라 근사치)
+    """
+    ensure_direct_map(index)
+    for start in range(0, index.ntotal, block_size):
+        yield start, index.reconstruct_n(start, min(block_size, index.ntotal - start))
+
+
+class EntityIndex:
+    def __init__(self, keys, means, counts, offsets, rows):
+        """
+        :param keys: 가게 키 배열 (E,)
+        :param means: 가게별 청크 벡터 평균 (E, D)
+        :param counts: 가게별 청크 수 (E,)
+        :param offsets: 가게별 청크 행 번호 시작 위치 (E + 1,)
+        :param rows: 가게 순서로 나열한 청크 행 번호 (N,)
+        """
+        self.keys = keys
+        self.means = np.ascontiguousarray(means, dtype=np.float32)
+        self.counts = counts
+        self.offsets = offsets
+        self.rows = rows
+        self.positions = {key: entity for entity, key in enumerate(keys.tolist())}
+        self.row_entities = np.empty(len(rows), dtype=np.int64)  # 청크 행 번호 -> 가게 번호
+        self.row_entities[rows] = np.repeat(np.arange(len(keys)), np.diff(offsets))
+
+        # 중심 벡터는 크기를 1로 맞춰서 검색 (청크가 다양한 가게일수록 평균 벡터가 짧아지는 것 보정)
+        centroids = self.means.copy()
+        norms = np.linalg.norm(centroids, axis=1, keepdims=True)
+        np.divide(centroids, norms, out=centroids, where=norms > 0)
+        self.index = faiss.IndexFlatL2(self.means.shape[1])
+        self.index.add(centroids)
+
+    @classmethod
+    def build(cls, keys, blocks, dim, base=None):
+        """
+        청크 키와 벡터로 가게 인덱스를 만듭니다. base가 있으면 그 뒤에 청크를 이어 붙인 새 인덱스를 만듭니다.
+        (base는 바꾸지 않음, 기존 가게의 평균은 청크 수로 가중 평균)
+        :param keys: 새 청크의 가게 키 리스트 (행 순서)
+        :param blocks: 새 청크 벡터의 (시작 행, 벡터 블록) 이터러블 (index_blocks)
+        :param dim: 벡터 차원
+        :param base: 앞에 있는 청크의 EntityIndex
+        """
+        positions = dict(base.positions) if base is not None else dict()
+        new_keys = []
+        row_entities = np.empty(len(keys), dtype=np.int64)
+        for row, key in enumerate(keys):
+            entity = positions.get(key)
+            if entity is None:
+                entity = positions[key] = len(positions)
+                new_keys.append(key)
+            row_entities[row] = entity
+
+        entity_count = len(positions)
+        base_count = len(base.keys) if base is not None else 0
+        sums = np.zeros((entity_count, dim), dtype=np.float64)
+        counts = np.zeros(entity_count, dtype=np.int64)
+        if base is not None:
+            sums[:base_count] = base.means * base.counts[:, None]
+            counts[:base_count] = base.counts
+        for start, block in blocks:
+            block_entities = row_entities[start:start + len(block)]
+            order = np.argsort(block_entities, kind="stable")
+            unique_entities, first = np.unique(block_entities[order], return_index=True)
+            sums[unique_entities] += np.add.reduceat(np.asarray(block, dtype=np.float64)[order], first, axis=0)
+        counts += np.bincount(row_entities, minlength=entity_count)
+
+        all_entities = np.concatenate([base.row_entities, row_entities]) if base is not None else row_entities
+        rows = np.argsort(all_entities, kind="stable").astype(np.int64)
+        offsets = np.zeros(entity_count + 1, dtype=np.int64)
+        np.cumsum(np.bincount(all_entities, minlength=entity_count), out=offsets[1:])
+        means = sums / np.maximum(counts, 1)[:, None]
+        key_array = np.array((base.keys.tolist() if base is not None else []) + new_keys, dtype=str)
+        return cls(key_array, means, counts, offsets, rows)
+
+    @classmethod
+    def from_index(cls, metadata, index, base=None):
+        """
+        메타데이터와 같은 행 순서의 청크 인덱스로 가게 인덱스를 만듭니다.
+        """
+        return cls.build(row_keys(metadata), index_blocks(index), index.d, base)
+
+    def write(self, path):
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez(f, keys=self.keys, means=self.means, counts=self.counts, offsets=self.offsets, rows=self.rows)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def read(cls, path):
+        with np.load(path, allow_pickle=False) as data:
+            return cls(data["keys"], data["means"], data["counts"], data["offsets"], data["rows"])
+
+    def __len__(self):
+        return len(self.keys)
+
+    @property
+    def chunk_count(self):
+        return len(self.rows)
+
+    def search(self, query_vector, n):
+        """
+        중심 벡터가 가까운 가게 n개
+        :return: 가게 번호 배열 (가까운 순)
+        """
+        query_vector = np.asarray(query_vector, dtype=np.float32).reshape(1, -1)
+        _, entities = self.index.search(query_vector, min(n, len(self.keys)))
+        return entities[0][entities[0] >= 0]
+
+    def entity_rows(self, entities):
+        """
+        가게들의 청크 행 번호를 이어 붙여서 반환합니다.
+        """
+        if len(entities) == 0:
+            return np.zeros(0, dtype=np.int64)
+        return np.concatenate([self.rows[self.offsets[entity]:self.offsets[entity + 1]] for entity in entities])
@@ -0,0 +1,467 @@
+# metadataStore.py
+import os
+import sys
+import json
+import mmap
+import pickle
+import logging
+import numpy as np
+
+# 코드 설명 요약:
+# 청크 메타데이터를 딕셔너리 리스트(pkl) 대신 컬럼 단위 파일(spot_metadata.cols)로 저장합니다.
+# - 정수 컬럼(data_id, chunk_index): 고정 폭 int64 배열
+# - 문자열 컬럼(name, address, link, img, chunk_content): 오프셋(uint64) 배열 + UTF-8 바이트
+# - 스키마에 없는 키는 행별 JSON 문자열 컬럼(extra)에 보관해서 원본 딕셔너리를 그대로 복원합니다.
+# 파일은 메모리 맵으로 열고 행 번호로 필요한 값만 읽기 때문에, 시작 시 전체를 역직렬화하지 않고
+# uvicorn 워커 여러 개가 같은 파일을 열면 페이지 캐시 한 벌을 같이 씁니다.
+# 웹 앱(app/vectorRouter)과 DBMgr(Good DBMgr/creator_api)가 이 모듈 하나로 같은 형식을 읽고 씁니다.
+# 기존 pkl 변환 (프로젝트 루트에서): python -m spot_store.metadataStore "Good DBMgr/vdb_data/spot_metadata.pkl"
+
+COLUMNS_MAGIC = b"SPOTCOLS"
+COLUMNS_VERSION = 1
+INT_COLUMNS = ("data_id", "chunk_index")
+STRING_COLUMNS = ("name", "address", "link", "img", "chunk_content")
+EXTRA_COLUMN = "extra"  # 스키마에 없는 키들 (JSON)
+
+# 값 상태: 있음 / 값이 None / 키 자체가 없음 (원본 딕셔너리를 그대로 복원하기 위해 구분)
+VALUE_PRESENT, VALUE_NONE, VALUE_ABSENT = 0, 1, 2
+MISSING_DATA_ID = -1  # data_id가 없는 행
+
+HEADER = np.dtype([("magic", "S8"), ("version", "<u4"), ("column_count", "<u4"), ("count", "<u8")])
+# 컬럼 목록: 이름, 종류(0: int64, 1: 문자열), 상태 배열/값 배열/오프셋 배열 위치(파일 내 바이트 오프셋)
+COLUMN_ENTRY = np.dtype([("name", "S16"), ("kind", "<u4"), ("reserved", "<u4"),
+                         ("states", "<u8"), ("values", "<u8"), ("offsets", "<u8")])
+KIND_INT, KIND_STRING = 0, 1
+
+
+def columnar_metadata_path(metadata_file):
+    """
+    spot_metadata.pkl -> spot_metadata.cols (이미 .cols면 그대로)
+    """
+    if metadata_file.endswith(".cols"):
+        return metadata_file
+    return f"{os.path.splitext(metadata_file)[0]}.cols"
+
+
+def legacy_metadata_path(metadata_file):
+    if metadata_file.endswith(".cols"):
+        return f"{os.path.splitext(metadata_file)[0]}.pkl"
+    return metadata_file
+
+
+def metadata_exists(metadata_file):
+    return os.path.exists(columnar_metadata_path(metadata_file)) or os.path.exists(legacy_metadata_path(metadata_file))
+
+
+def _fits_column(name, value):
+    """
+    컬럼 타입에 맞는 값인지 확인합니다. 맞지 않는 값(예: 문자열 data_id)은 extra에 그대로 보관합니다.
+    """
+    if value is None:
+        return True
+    if name in INT_COLUMNS:
+        return isinstance(value, (int, np.integer)) and not isinstance(value, bool)
+    return isinstance(value, str)
+
+
+def _column_states(rows, name):
+    return np.array([VALUE_ABSENT if name not in row or not _fits_column(name, row[name])
+                     else VALUE_NONE if row[name] is None else VALUE_PRESENT
+                     for row in rows], dtype=np.uint8)
+
+
+def _encode_strings(values):
+    encoded = [value.encode("utf-8") if value else b"" for value in values]
+    offsets = np.zeros(len(encoded) + 1, dtype="<u8")
+    np.cumsum([len(value) for value in encoded], out=offsets[1:])
+    return offsets, b"".join(encoded)
+
+
+def write_columnar_metadata(path, rows):
+    """
+    메타데이터 딕셔너리 리스트를 컬럼 파일로 저장합니다. (임시 파일에 쓴 뒤 교체)
+    :param path: 저장할 .cols 파일 경로
+    :param rows: 메타데이터 딕셔너리 리스트
+    """
+    known = set(INT_COLUMNS) | set(STRING_COLUMNS)
+    columns = []  # (이름, 종류, 상태 배열, 값 바이트, 오프셋 배열)
+    for name in INT_COLUMNS:
+        states = _column_states(rows, name)
+        values = np.array([row[name] if state == VALUE_PRESENT else MISSING_DATA_ID
+                           for row, state in zip(rows, states)], dtype="<i8")
+        columns.append((name, KIND_INT, states, values.tobytes(), None))
+    for name in STRING_COLUMNS:
+        states = _column_states(rows, name)
+        offsets, blob = _encode_strings(row[name] if state == VALUE_PRESENT else "" for row, state in zip(rows, states))
+        columns.append((name, KIND_STRING, states, blob, offsets))
+    extras = [{key: value for key, value in row.items() if key not in known or not _fits_column(key, value)}
+              for row in rows]
+    offsets, blob = _encode_strings(json.dumps(extra, ensure_ascii=False, default=str) if extra else "" for extra in extras)
+    states = np.array([VALUE_PRESENT if extra else VALUE_ABSENT for extra in extras], dtype=np.uint8)
+    columns.append((EXTRA_COLUMN, KIND_STRING, states, blob, offsets))
+
+    header = np.zeros(1, dtype=HEADER)
+    header["magic"] = COLUMNS_MAGIC
+    header["version"] = COLUMNS_VERSION
+    header["column_count"] = len(columns)
+    header["count"] = len(rows)
+    entries = np.zeros(len(columns), dtype=COLUMN_ENTRY)
+
+    # 배열이 8바이트 경계에 오도록 위치를 맞춰서 np.frombuffer로 바로 읽을 수 있게 함
+    position = HEADER.itemsize + entries.nbytes
+    chunks = []
+    for entry, (name, kind, states, values, offsets) in zip(entries, columns):
+        entry["name"] = name.encode("ascii")
+        entry["kind"] = kind
+        for field, data in (("states", states.tobytes()), ("offsets", None if offsets is None else offsets.tobytes()),
+                            ("values", values)):
+            if data is None:
+                continue
+            padding = -position % 8
+            chunks.append(b"\0" * padding)
+            position += padding
+            entry[field] = position
+            chunks.append(data)
+            position += len(data)
+
+    tmp_path = f"{path}.{os.getpid()}.tmp"  # 워커 여러 개가 동시에 만들어도 서로 덮어쓰지 않도록
+    with open(tmp_path, "wb") as f:
+        f.write(header.tobytes())
+        f.write(entries.tobytes())
+        for chunk in chunks:
+            f.write(chunk)
+    os.replace(tmp_path, path)
+
+
+def merge_columnar_metadata(path, sources, int_offsets=None, block_size=65536, keep=None):
+    """
+    여러 컬럼 메타데이터를 행 딕셔너리로 풀지 않고 컬럼 배열/바이트를 블록 단위로 그대로 이어 붙여 저장합니다.
+    (메모리에는 블록 하나만 올라감, 임시 파일에 쓴 뒤 교체)
+    :param path: 저장할 .cols 파일 경로
+    :param sources: 같은 컬럼 구성의 ColumnarMetadata 리스트 (순서대로 이어 붙임)
+    :param int_offsets: {정수 컬럼 이름: 소스별로 더할 값 리스트} (값이 있는 행에만 더함, 예: data_id 조정)
+    :param block_size: 한 번에 복사하는 행 수
+    :param keep: 소스별로 남길 행의 bool 배열 리스트 (None이면 전부 남김, 예: 중복 제거)
+    """
+    int_offsets = int_offsets or {}
+    keep = keep or [None] * len(sources)
+    names = list(sources[0].columns)
+    for source in sources[1:]:
+        if list(source.columns) != names:
+            raise ValueError(f"메타데이터 컬럼 구성이 다릅니다: {source.path}")
+    count = sum(len(source) if mask is None else int(np.count_nonzero(mask)) for source, mask in zip(sources, keep))
+    entries = np.zeros(len(names), dtype=COLUMN_ENTRY)
+
+    def blocks(source, mask):
+        """
+        (시작 행, 끝 행, 블록 안에서 남길 행 bool 배열 또는 None)
+        """
+        for start in range(0, len(source), block_size):
+            stop = min(start + block_size, len(source))
+            yield start, stop, None if mask is None else mask[start:stop]
+
+    def select(array, kept):
+        return array if kept is None else array[kept]
+
+    def align(f):
+        f.write(b"\0" * (-f.tell() % 8))
+        return f.tell()
+
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(b"\0" * (HEADER.itemsize + entries.nbytes))  # 헤더/컬럼 목록은 위치가 정해진 뒤 마지막에 씀
+        for entry, name in zip(entries, names):
+            kind = sources[0].columns[name][0]
+            entry["name"] = name.encode("ascii")
+            entry["kind"] = kind
+
+            entry["states"] = align(f)
+            for source, mask in zip(sources, keep):
+                states = source.columns[name][1]
+                for start, stop, kept in blocks(source, mask):
+                    f.write(select(states[start:stop], kept).tobytes())
+
+            if kind == KIND_INT:
+                entry["values"] = align(f)
+                for source, mask, offset in zip(sources, keep, int_offsets.get(name, [0] * len(sources))):
+                    _, states, values, _ = source.columns[name]
+                    for start, stop, kept in blocks(source, mask):
+                        block = values[start:stop]
+                        if offset:
+                            block = np.where(states[start:stop] == VALUE_PRESENT, block + offset, block)
+                        f.write(select(block, kept).astype("<i8").tobytes())
+                continue
+
+            # 문자열 컬럼: 오프셋은 앞 소스들의 바이트 길이만큼 밀고, 바이트는 메모리 맵에서 그대로 복사
+            # (빠지는 행이 있는 소스는 남길 행의 길이로 오프셋을 다시 계산하고 그 행의 바이트만 복사)
+            entry["offsets"] = align(f)
+            shift = 0
+            for source, mask in zip(sources, keep):
+                offsets = source.columns[name][3]
+                if mask is None:
+                    for start, stop, _ in blocks(source, None):
+                        block = offsets[start:stop]  # 마지막 오프셋(끝 위치)은 맨 끝에 한 번만
+                        f.write((block + np.uint64(shift)).astype("<u8").tobytes())
+                    shift += int(offsets[len(source)])
+                    continue
+                for start, stop, kept in blocks(source, mask):
+                    lengths = np.diff(offsets[start:stop + 1].astype(np.int64))[kept]
+                    starts = np.cumsum(lengths) - lengths + shift
+                    f.write(starts.astype("<u8").tobytes())
+                    shift += int(lengths.sum())
+            f.write(np.array([shift], dtype="<u8").tobytes())
+
+            entry["values"] = align(f)
+            for source, mask in zip(sources, keep):
+                _, _, values, offsets = source.columns[name]
+                if mask is None:
+                    end = values + int(offsets[len(source)])
+                    for start in range(values, end, block_size * 64):
+                        f.write(source.mmap[start:min(start + block_size * 64, end)])
+                    continue
+                for start, stop, kept in blocks(source, mask):
+                    f.write(b"".join(source.mmap[values + int(offsets[position]):values + int(offsets[position + 1])]
+                                     for position in start + np.flatnonzero(kept)))
+
+        header = np.zeros(1, dtype=HEADER)
+        header["magic"] = COLUMNS_MAGIC
+        header["version"] = COLUMNS_VERSION
+        header["column_count"] = len(names)
+        header["count"] = count
+        f.seek(0)
+        f.write(header.tobytes())
+        f.write(entries.tobytes())
+    os.replace(tmp_path, path)
+
+
+class StringColumn:
+    def __init__(self, metadata, name, default=None):
+        """
+        문자열 컬럼 하나를 행 번호로 읽는 시퀀스 (필요한 행만 디코딩)
+        """
+        self.metadata = metadata
+        self.name = name
+        self.default = default
+
+    def __len__(self):
+        return len(self.metadata)
+
+    def __getitem__(self, position):
+        return self.metadata.get_value(position, self.name, self.default)
+
+    def __iter__(self):
+        for position in range(len(self.metadata)):
+            yield self.metadata.get_value(position, self.name, self.default)
+
+
+class ColumnarMetadata:
+    def __init__(self, path):
+        """
+        메모리 맵으로 연 컬럼 메타데이터. 리스트처럼 len(), 인덱스 접근(딕셔너리 반환), 순회를 지원하고
+        get_value / int_column / string_column으로 필요한 컬럼만 읽을 수 있습니다.
+        :param path: write_columnar_metadata로 만든 .cols 파일 경로
+        """
+        self.path = path
+        with open(path, "rb") as f:
+            self.mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        header = np.frombuffer(self.mmap, dtype=HEADER, count=1)[0]
+        if header["magic"] != COLUMNS_MAGIC or header["version"] != COLUMNS_VERSION:
+            self.close()
+            raise ValueError(f"메타데이터 파일 형식이 올바르지 않습니다: {path}")
+        self.count = int(header["count"])
+        entries = np.frombuffer(self.mmap, dtype=COLUMN_ENTRY, count=int(header["column_count"]), offset=HEADER.itemsize)
+
+        self.columns = dict()  # 이름 -> (종류, 상태 배열, 값 배열 또는 바이트 시작 위치, 오프셋 배열)
+        for entry in entries:
+            name = entry["name"].decode("ascii")
+            states = np.frombuffer(self.mmap, dtype=np.uint8, count=self.count, offset=int(entry["states"]))
+            if entry["kind"] == KIND_INT:
+                values = np.frombuffer(self.mmap, dtype="<i8", count=self.count, offset=int(entry["values"]))
+                self.columns[name] = (KIND_INT, states, values, None)
+            else:
+                offsets = np.frombuffer(self.mmap, dtype="<u8", count=self.count + 1, offset=int(entry["offsets"]))
+                self.columns[name] = (KIND_STRING, states, int(entry["values"]), offsets)
+        self.names = [name for name in self.columns if name != EXTRA_COLUMN]
+
+    @property
+    def data_ids(self):
+        return self.columns["data_id"][2]
+
+    def int_column(self, name):
+        """
+        정수 컬럼 전체를 int64 배열(메모리 맵 그대로)로 반환합니다. 값이 없는 행은 -1
+        """
+        return self.columns[name][2]
+
+    def string_column(self, name, default=None):
+        return StringColumn(self, name, default)
+
+    def get_value(self, position, name, default=None):
+        """
+        행 하나의 컬럼 값 하나만 읽습니다.
+        """
+        kind, states, values, offsets = self.columns[name]
+        state = states[position]
+        if state == VALUE_ABSENT:
+            return default
+        if state == VALUE_NONE:
+            return None
+        if kind == KIND_INT:
+            return int(values[position])
+        start = values + int(offsets[position])
+        end = values + int(offsets[position + 1])
+        return self.mmap[start:end].decode("utf-8")
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, position):
+        if isinstance(position, slice):
+            return [self[i] for i in range(*position.indices(self.count))]
+        if position < 0:
+            position += self.count
+        if not 0 <= position < self.count:
+            raise IndexError("메타데이터 범위를 벗어났습니다.")
+        row = dict()
+        for name in self.names:
+            if self.columns[name][1][position] != VALUE_ABSENT:
+                row[name] = self.get_value(position, name)
+        extra = self.get_value(position, EXTRA_COLUMN)
+        if extra:
+            row.update(json.loads(extra))
+        return row
+
+    def __iter__(self):
+        for position in range(self.count):
+            yield self[position]
+
+    def close(self):
+        # np.frombuffer 배열이 버퍼를 잡고 있으면 mmap을 닫을 수 없으므로 먼저 놓아줌
+        self.columns = dict()
+        try:
+            self.mmap.close()
+        except BufferError:
+            pass
+
+
+class ChainedMetadata:
+    def __init__(self, parts):
+        """
+        여러 메타데이터(기본 세그먼트 + 추가 세그먼트)를 이어 붙여서 하나의 리스트처럼 보여줍니다.
+        행 번호는 세그먼트 순서대로 이어지므로 세그먼트별 FAISS 인덱스 번호에 앞 세그먼트 행 수를 더한 값과 같습니다.
+        :param parts: ColumnarMetadata 또는 딕셔너리 리스트의 리스트
+        """
+        self.parts = list(parts)
+        self.starts = np.cumsum([0] + [len(part) for part in self.parts])  # 세그먼트별 시작 행 번호 (+ 전체 행 수)
+
+    def locate(self, position):
+        """
+        전체 행 번호 -> (세그먼트, 세그먼트 안의 행 번호)
+        """
+        part = int(np.searchsorted(self.starts, position, side="right")) - 1
+        return self.parts[part], position - int(self.starts[part])
+
+    @property
+    def data_ids(self):
+        return np.concatenate([data_id_column(part) for part in self.parts]) if self.parts else np.zeros(0, dtype=np.int64)
+
+    def get_value(self, position, name, default=None):
+        part, offset = self.locate(position)
+        if isinstance(part, ColumnarMetadata):
+            return part.get_value(offset, name, default)
+        return part[offset].get(name, default)
+
+    def string_column(self, name, default=None):
+        return StringColumn(self, name, default)
+
+    def __len__(self):
+        return int(self.starts[-1])
+
+    def __getitem__(self, position):
+        if isinstance(position, slice):
+            return [self[i] for i in range(*position.indices(len(self)))]
+        if position < 0:
+            position += len(self)
+        if not 0 <= position < len(self):
+            raise IndexError("메타데이터 범위를 벗어났습니다.")
+        part, offset = self.locate(position)
+        return part[offset]
+
+    def __iter__(self):
+        for part in self.parts:
+            yield from part
+
+    def close(self):
+        for part in self.parts:
+            if isinstance(part, ColumnarMetadata):
+                part.close()
+
+
+def data_id_column(metadata):
+    """
+    메타데이터의 data_id를 int64 배열로 반환합니다. (컬럼 파일이면 파일의 배열을 그대로 사용)
+    """
+    if isinstance(metadata, (ColumnarMetadata, ChainedMetadata)):
+        return metadata.data_ids
+    return np.array([meta.get("data_id") if isinstance(meta.get("data_id"), int) else MISSING_DATA_ID
+                     for meta in metadata], dtype=np.int64)
+
+
+def metadata_column(metadata, name, default=None):
+    """
+    메타데이터 한 필드를 순회할 때만 꺼내는 시퀀스를 반환합니다. (길이는 바로 알 수 있음)
+    """
+    if isinstance(metadata, (ColumnarMetadata, ChainedMetadata)):
+        return metadata.string_column(name, default)
+    return [meta.get(name, default) for meta in metadata]
+
+
+def convert_pickle(metadata_file, output_path=None):
+    """
+    기존 pkl 메타데이터를 컬럼 파일로 변환합니다.
+    :return: 만든 .cols 파일 경로
+    """
+    with open(legacy_metadata_path(metadata_file), 'rb') as f:
+        rows = pickle.load(f)
+    output_path = output_path or columnar_metadata_path(metadata_file)
+    write_columnar_metadata(output_path, rows)
+    return output_path
+
+
+def load_metadata(metadata_file, use_mmap=True):
+    """
+    메타데이터를 로드합니다. .cols 파일이 없거나 pkl보다 오래됐으면 pkl에서 새로 변환합니다.
+    :param use_mmap: False면 딕셔너리 리스트로 전부 읽어서 반환 (수정 후 다시 저장할 때)
+    :return: ColumnarMetadata 또는 딕셔너리 리스트
+    """
+    path = columnar_metadata_path(metadata_file)
+    legacy_path = legacy_metadata_path(metadata_file)
+    if os.path.exists(legacy_path) and (not os.path.exists(path) or
+                                        os.stat(legacy_path).st_mtime_ns > os.stat(path).st_mtime_ns):
+        try:
+            convert_pickle(legacy_path, path)
+            logging.info(f"pkl 메타데이터를 컬럼 파일로 변환했습니다: {path}")
+        except OSError as e:
+            logging.warning(f"컬럼 메타데이터를 만들지 못해 pkl을 그대로 사용합니다: {str(e)}")
+            with open(legacy_path, 'rb') as f:
+                return pickle.load(f)
+
+    metadata = ColumnarMetadata(path)
+    if use_mmap:
+        return metadata
+    rows = list(metadata)
+    metadata.close()
+    return rows
+
+
+def metadata_source_path(metadata_file):
+    """
+    실제로 읽는 메타데이터 파일 경로 (캐시 서명 계산용)
+    """
+    path = columnar_metadata_path(metadata_file)
+    return path if os.path.exists(path) else legacy_metadata_path(metadata_file)
+
+
+if __name__ == "__main__":
+    for pickle_file in sys.argv[1:]:
+        print(f"{pickle_file} -> {convert_pickle(pickle_file)}")
@@ -0,0 +1,67 @@
+# segmentStore.py
+import os
+import json
+
+# 코드 설명 요약:
+# 세그먼트 저장소(기본 세그먼트 + 추가 세그먼트 + 매니페스트 + 로그)의 파일 이름과 읽기 함수입니다.
+# 매니페스트(<인덱스 이름>.manifest.json)에 올라간 세그먼트만 유효합니다.
+# 쓰기/로그 재생/복구/합치기는 DBMgr(Good DBMgr/creator_api/segmentStore.py)만 하고, 웹 앱은 이 함수들로 읽기만 합니다.
+
+
+def manifest_path(index_file):
+    return f"{os.path.splitext(index_file)[0]}.manifest.json"
+
+
+def wal_path(index_file):
+    return f"{os.path.splitext(index_file)[0]}.wal.jsonl"
+
+
+def segments_dir(index_file):
+    return f"{os.path.splitext(index_file)[0]}.segments"
+
+
+def segment_files(index_file, name):
+    """
+    :return: (세그먼트 인덱스 파일, 세그먼트 메타데이터 파일)
+    """
+    directory = segments_dir(index_file)
+    return os.path.join(directory, f"{name}.bin"), os.path.join(directory, f"{name}.cols")
+
+
+def read_manifest(index_file):
+    """
+    :return: 매니페스트 딕셔너리 (세그먼트 이전에 만든 저장소라서 없으면 None)
+    """
+    path = manifest_path(index_file)
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def read_wal(index_file):
+    """
+    로그 기록 리스트. 쓰다가 중단된 마지막 줄은 무시합니다.
+    """
+    path = wal_path(index_file)
+    if not os.path.exists(path):
+        return []
+    records = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                break
+    return records
+
+
+def base_update_pending(index_file, manifest):
+    """
+    DBMgr가 기본 세그먼트를 교체하다가 중단돼서 (로그에 매니페스트보다 새 세대의 base_commit이 남음)
+    기본 파일과 매니페스트가 어긋나 있을 수 있는지 확인합니다. DBMgr가 다시 열면 복구됩니다.
+    """
+    if manifest is None:
+        return False
+    return any(record.get("op") == "base_commit" and record["generation"] > manifest["generation"]
+               for record in read_wal(index_file))